@@ -0,0 +1,136 @@
+"""
+Load test server NLQ: banyak client bersamaan ke endpoint `/conversations/{id}/ask`.
+
+Default server dijalankan in-process dengan LLM provider `fake`, sehingga tidak butuh
+API key maupun jaringan. Gunakan `--url` untuk menguji server yang sudah berjalan.
+
+Contoh:
+    python benchmarks/load_server.py --clients 32 --requests 200 --max-workers 4
+    python benchmarks/load_server.py --llm-latency 0.2 --max-queue 8
+    python benchmarks/load_server.py --url http://127.0.0.1:8000 --clients 16
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+from typing import Any, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+from src.server import ServerConfig, create_app
+
+CITIES = ["Jakarta", "Surabaya", "Bandung", "Medan", "Makassar"]
+
+
+def write_dataset(directory: str, rows: int = 1000):
+    with open(os.path.join(directory, "customers.csv"), "w") as file:
+        file.write("CustomerID,Kota,TotalPengeluaran\n")
+        for index in range(rows):
+            file.write(f"{index},{CITIES[index % len(CITIES)]},{index * 1000}\n")
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run_load(
+    client: httpx.AsyncClient, args: argparse.Namespace
+) -> dict[str, Any]:
+    latencies: list[float] = []
+    statuses: Counter[int] = Counter()
+    counter = iter(range(args.requests))
+
+    async def worker(client_index: int):
+        for index in counter:
+            # setiap client memakai beberapa percakapan agar history tidak terus membesar
+            conversation_id = f"client-{client_index}-{index % args.conversations}"
+            start = time.perf_counter()
+            response = await client.post(
+                f"/conversations/{conversation_id}/ask",
+                json={
+                    "message": f"Berapa jumlah customer di {CITIES[index % len(CITIES)]}?"
+                },
+                timeout=args.timeout,
+            )
+            statuses[response.status_code] += 1
+            if response.status_code == 200:
+                latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(index) for index in range(args.clients)))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "requests": args.requests,
+        "clients": args.clients,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(statuses[200] / elapsed, 2) if elapsed else 0.0,
+        "p50_s": round(percentile(latencies, 0.5), 3),
+        "p95_s": round(percentile(latencies, 0.95), 3),
+        "status_codes": dict(statuses),
+    }
+
+
+async def run_in_process(args: argparse.Namespace) -> dict[str, Any]:
+    os.environ["FAKE_LLM_LATENCY"] = str(args.llm_latency)
+    with tempfile.TemporaryDirectory() as directory:
+        write_dataset(directory)
+        app = create_app(
+            ServerConfig(
+                dataset_dir=directory,
+                llm_provider="fake",
+                llm_model="fake",
+                max_workers=args.max_workers,
+                max_queue=args.max_queue,
+            )
+        )
+        await app.startup()
+        try:
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(
+                transport=transport, base_url="http://nlq"
+            ) as client:
+                return await run_load(client, args)
+        finally:
+            await app.shutdown()
+
+
+async def run_remote(args: argparse.Namespace) -> dict[str, Any]:
+    limits = httpx.Limits(max_connections=args.clients)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits) as client:
+        return await run_load(client, args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", help="Base URL server yang sudah berjalan")
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--conversations", type=int, default=4)
+    parser.add_argument("--max-workers", type=int, default=4)
+    parser.add_argument("--max-queue", type=int, default=32)
+    parser.add_argument("--llm-latency", type=float, default=0.05)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    args = parser.parse_args()
+
+    result: Optional[dict[str, Any]]
+    if args.url:
+        result = asyncio.run(run_remote(args))
+    else:
+        result = asyncio.run(run_in_process(args))
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
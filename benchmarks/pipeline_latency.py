@@ -0,0 +1,453 @@
+"""
+Benchmark latency end-to-end pipeline NLQ tanpa jaringan (provider LLM `replay`).
+
+Dataset sintetis `sales` dibuat dengan DuckDB untuk setiap ukuran (default 10K dan 1M
+baris, tambahkan 10000000 untuk 10M). Setiap pertanyaan di corpus dijalankan lewat
+`AgentNLQ.execute` dan `RetrieveDatasetTool.read_dataset`. Yang dilaporkan: p50/p95
+latency total dan per node, waktu DuckDB (eksekusi dan validasi SQL), waktu membangun
+prompt, waktu warm-up, dan memori (RSS).
+
+Respons LLM diambil dari file replay: default dibuat dari corpus (query SQL per
+pertanyaan), atau rekaman LLM asli lewat `--replay` (lihat `REPLAY_LLM_RECORD` di README).
+Setiap ukuran dataset dijalankan di proses terpisah agar angka memori tidak tercampur.
+
+Contoh:
+    python benchmarks/pipeline_latency.py
+    python benchmarks/pipeline_latency.py --rows 10000,1000000,10000000 --output baseline.json
+    python benchmarks/pipeline_latency.py --baseline baseline.json --max-regression 0.25
+    python benchmarks/pipeline_latency.py --llm-latency 0.5 --workflow-mode fast
+
+Format file corpus (JSON): [{"question": "...", "sql": "SELECT ... FROM sales ..."}]
+"""
+
+import argparse
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+from typing import Any, Callable, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import duckdb
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.tracers.context import register_configure_hook
+
+from src.agent import AgentNLQ
+from src.base import BaseAgentStateModel
+from src.schema import DatasetDetailInformation
+
+DEFAULT_CORPUS: list[dict[str, str]] = [
+    {
+        "question": "Total penjualan per kota",
+        "sql": "SELECT Kota, SUM(Jumlah * Harga) AS total_penjualan FROM sales GROUP BY Kota ORDER BY total_penjualan DESC",
+    },
+    {
+        "question": "Rata-rata harga per kategori produk",
+        "sql": "SELECT Kategori, AVG(Harga) AS rata_rata_harga FROM sales GROUP BY Kategori",
+    },
+    {
+        "question": "Jumlah transaksi per bulan di tahun 2024",
+        "sql": "SELECT month(Tanggal) AS bulan, COUNT(*) AS jumlah_transaksi FROM sales WHERE year(Tanggal) = 2024 GROUP BY bulan ORDER BY bulan",
+    },
+    {
+        "question": "10 transaksi dengan nilai terbesar di Jakarta",
+        "sql": "SELECT OrderID, Tanggal, Kategori, Jumlah * Harga AS nilai FROM sales WHERE Kota = 'Jakarta' ORDER BY nilai DESC LIMIT 10",
+    },
+    {
+        "question": "Kategori terlaris di setiap kota berdasarkan jumlah barang",
+        "sql": "SELECT Kota, arg_max(Kategori, total) AS kategori_terlaris FROM (SELECT Kota, Kategori, SUM(Jumlah) AS total FROM sales GROUP BY Kota, Kategori) GROUP BY Kota",
+    },
+]
+
+_node_timer: ContextVar[Optional["NodeTimer"]] = ContextVar(
+    "benchmark_node_timer", default=None
+)
+# handler dipasang ke seluruh run LangChain (agent dan subgraph tool) lewat context var
+register_configure_hook(_node_timer, inheritable=True)
+
+
+class NodeTimer(BaseCallbackHandler):
+    """Catat durasi setiap node LangGraph berdasarkan event start/end chain."""
+
+    run_inline = True
+
+    def __init__(self):
+        self.samples: dict[str, list[float]] = defaultdict(list)
+        self._starts: dict[Any, tuple[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def on_chain_start(self, serialized, inputs, *, run_id, tags=None, **kwargs):
+        node = (kwargs.get("metadata") or {}).get("langgraph_node")
+        # hanya run level node graph, bukan runnable di dalam node
+        if node is None or kwargs.get("name") != node:
+            return
+        if not any(tag.startswith("graph:step:") for tag in tags or []):
+            return
+        with self._lock:
+            self._starts[run_id] = (node, time.perf_counter())
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        with self._lock:
+            started = self._starts.pop(run_id, None)
+            if started is not None:
+                self.samples[started[0]].append(time.perf_counter() - started[1])
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self.on_chain_end(None, run_id=run_id)
+
+
+class Timings:
+    """Durasi method yang dibungkus (prompt builder, query DuckDB) per kategori."""
+
+    def __init__(self):
+        self.samples: dict[str, list[float]] = defaultdict(list)
+
+    def wrap(self, obj: Any, name: str, bucket: str):
+        original: Callable = getattr(obj, name)
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                self.samples[bucket].append(time.perf_counter() - start)
+
+        setattr(obj, name, timed)
+
+    def reset(self):
+        self.samples.clear()
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(samples: list[float]) -> dict[str, float]:
+    if not samples:
+        return {"count": 0, "p50_ms": 0.0, "p95_ms": 0.0, "total_ms": 0.0}
+    return {
+        "count": len(samples),
+        "p50_ms": round(percentile(samples, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(samples, 0.95) * 1000, 2),
+        "total_ms": round(sum(samples) * 1000, 2),
+    }
+
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as file:
+            pages = int(file.read().split()[1])
+        return round(pages * os.sysconf("SC_PAGE_SIZE") / 1024**2, 1)
+    except OSError:
+        return peak_rss_mb()
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss dalam byte di macOS, kilobyte di Linux
+    return round(peak / (1024**2 if sys.platform == "darwin" else 1024), 1)
+
+
+def make_dataset(data_dir: str, rows: int) -> str:
+    directory = os.path.join(data_dir, f"rows_{rows}")
+    path = os.path.join(directory, "sales.parquet")
+    if not os.path.exists(path):
+        os.makedirs(directory, exist_ok=True)
+        duckdb.sql(f"""
+            COPY (
+                SELECT
+                    i AS OrderID,
+                    DATE '2024-01-01' + CAST(i % 730 AS INTEGER) AS Tanggal,
+                    ['Jakarta', 'Surabaya', 'Bandung', 'Medan', 'Makassar'][i % 5 + 1] AS Kota,
+                    ['Elektronik', 'Fashion', 'Makanan', 'Otomotif'][i % 4 + 1] AS Kategori,
+                    i % 10 + 1 AS Jumlah,
+                    (i * 7919) % 100000 * 10 AS Harga
+                FROM range({int(rows)}) t(i)
+            ) TO '{path}' (FORMAT PARQUET)
+            """)
+    # catalog (hasil ingest dan profil) dibuat ulang agar warm-up selalu diukur dari awal
+    shutil.rmtree(os.path.join(directory, ".catalog"), ignore_errors=True)
+    return directory
+
+
+def write_replay(path: str, corpus: list[dict[str, str]]):
+    """
+    Rekaman LLM sintetis: analisis dan query SQL per pertanyaan (dicocokkan lewat `match`).
+    Node lain memakai respons default `FakeChatModel`.
+    """
+    entries = []
+    for case in corpus:
+        query_needed = {
+            # problem berisi pertanyaan agar prompt generate_query bisa dicocokkan
+            "problem": case["question"],
+            "problem_solving": "Ambil data dari table sales sesuai pertanyaan.",
+            "table_required": [{"table_name": "sales"}],
+        }
+        queries = [{"table_name": "sales", "query": case["sql"]}]
+        entries += [
+            {
+                "node": "analyst_query_needed",
+                "kind": "StructuredOutputQueryNeeded",
+                "match": case["question"],
+                "output": query_needed,
+            },
+            {
+                "node": "generate_query",
+                "kind": "StructuredOutputGenerateQuery",
+                "match": case["question"],
+                "output": {"list_queries": queries},
+            },
+            {
+                "node": "fast_query",
+                "kind": "StructuredOutputFastQuery",
+                "match": case["question"],
+                "output": {
+                    "is_table_exist": True,
+                    "description_analyst_result": "Table to query (exists): sales",
+                    "query_needed": query_needed,
+                    "list_queries": queries,
+                },
+            },
+        ]
+    with open(path, "w", encoding="utf-8") as file:
+        for entry in entries:
+            file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+
+def instrument(agent: AgentNLQ, timings: Timings):
+    tool = agent.retrieve_dataset_tool
+    for name in (
+        "analyst_table_exist",
+        "analyst_query_needed",
+        "generate_query",
+        "fast_query",
+        "validation_result",
+    ):
+        timings.wrap(tool.tool_prompt, name, "prompt_build")
+    timings.wrap(agent.prompts, "main_agent", "prompt_build")
+    for node in (agent.nodes, tool.tool_nodes):
+        timings.wrap(node, "get_prompt_setup", "prompt_build")
+    timings.wrap(agent.duckdb_manager, "execute_query", "duckdb_execute")
+    timings.wrap(agent.duckdb_manager, "validate_query", "duckdb_validate")
+
+
+def run_target(
+    corpus: list[dict[str, str]],
+    repeat: int,
+    call: Callable[[int, str], Any],
+    timings: Timings,
+) -> dict[str, Any]:
+    timer = NodeTimer()
+    token = _node_timer.set(timer)
+    timings.reset()
+    latencies = []
+    try:
+        for iteration in range(repeat):
+            for index, case in enumerate(corpus):
+                start = time.perf_counter()
+                call(iteration * len(corpus) + index, case["question"])
+                latencies.append(time.perf_counter() - start)
+    finally:
+        _node_timer.reset(token)
+
+    return {
+        "total": summarize(latencies),
+        "nodes": {
+            node: summarize(samples) for node, samples in sorted(timer.samples.items())
+        },
+        **{bucket: summarize(samples) for bucket, samples in timings.samples.items()},
+    }
+
+
+def run_size(rows: int, corpus: list[dict[str, str]], args: argparse.Namespace):
+    directory = make_dataset(args.data_dir, rows)
+    os.environ["REPLAY_LLM_FILE"] = args.replay
+    os.environ["REPLAY_LLM_LATENCY"] = str(args.llm_latency)
+
+    dataset = DatasetDetailInformation(
+        available_datasets=["sales"],
+        dataset_descriptions={"sales": "Data transaksi penjualan"},
+    )
+    agent = AgentNLQ(
+        dataset,
+        directory,
+        "replay",
+        args.model,
+        scan_mode=args.scan_mode,
+        workflow_mode=args.workflow_mode,
+        llm_validation=args.llm_validation,
+    )
+    tool = agent.retrieve_dataset_tool
+    if not args.cache:
+        # setiap request menjalankan workflow penuh
+        tool.answer_cache.max_entries = 0
+        tool.tool_nodes.query_plan_cache = None
+
+    result: dict[str, Any] = {"rows": rows, "rss_mb_start": rss_mb()}
+    try:
+        start = time.perf_counter()
+        agent.warm_up()
+        result["warm_up_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        result["rss_mb_after_warm_up"] = rss_mb()
+
+        timings = Timings()
+        instrument(agent, timings)
+        if args.target in ("agent", "both"):
+            result["agent"] = run_target(
+                corpus,
+                args.repeat,
+                lambda index, question: agent.execute(
+                    BaseAgentStateModel(user_message=question), f"bench-{index}"
+                ),
+                timings,
+            )
+        if args.target in ("tool", "both"):
+            result["tool"] = run_target(
+                corpus,
+                args.repeat,
+                lambda index, question: tool.read_dataset(question),
+                timings,
+            )
+        result["rss_mb_end"] = rss_mb()
+        result["peak_rss_mb"] = peak_rss_mb()
+    finally:
+        agent.close()
+    return result
+
+
+def flatten_p95(result: dict[str, Any], prefix: str = "") -> dict[str, float]:
+    metrics = {}
+    for key, value in result.items():
+        if not isinstance(value, dict):
+            continue
+        if "p95_ms" in value:
+            metrics[f"{prefix}{key}"] = value["p95_ms"]
+        else:
+            metrics.update(flatten_p95(value, f"{prefix}{key}."))
+    return metrics
+
+
+def find_regressions(
+    results: dict[str, Any], baseline: dict[str, Any], args: argparse.Namespace
+) -> list[str]:
+    current = flatten_p95(results)
+    previous = flatten_p95(baseline)
+    regressions = []
+    for key, value in current.items():
+        before = previous.get(key)
+        # metrik yang sangat kecil terlalu noisy untuk dibandingkan
+        if before is None or before < args.min_ms:
+            continue
+        if value > before * (1 + args.max_regression):
+            regressions.append(f"{key}: p95 {before} ms -> {value} ms")
+    return regressions
+
+
+def single_size_args(size: int, args: argparse.Namespace) -> list[str]:
+    return [
+        os.path.abspath(__file__),
+        "--rows",
+        str(size),
+        "--replay",
+        args.replay,
+        "--repeat",
+        str(args.repeat),
+        "--llm-latency",
+        str(args.llm_latency),
+        "--model",
+        args.model,
+        "--target",
+        args.target,
+        "--workflow-mode",
+        args.workflow_mode,
+        "--llm-validation",
+        args.llm_validation,
+        "--scan-mode",
+        args.scan_mode,
+        "--data-dir",
+        args.data_dir,
+        *(["--cache"] if args.cache else []),
+        *(["--corpus", args.corpus] if args.corpus else []),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", default="10000,1000000")
+    parser.add_argument("--corpus", help="File JSON pertanyaan dan SQL acuan")
+    parser.add_argument("--replay", help="File rekaman LLM (JSONL)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--llm-latency", type=float, default=0.0)
+    parser.add_argument("--model", default="gpt-4o-mini")
+    parser.add_argument("--target", choices=["agent", "tool", "both"], default="both")
+    parser.add_argument(
+        "--workflow-mode", choices=["multi_stage", "fast"], default="multi_stage"
+    )
+    parser.add_argument(
+        "--llm-validation", choices=["always", "auto"], default="always"
+    )
+    parser.add_argument(
+        "--scan-mode", choices=["materialize", "direct"], default="materialize"
+    )
+    parser.add_argument(
+        "--cache", action="store_true", help="Aktifkan cache jawaban dan query plan"
+    )
+    parser.add_argument(
+        "--data-dir",
+        default=os.path.join(tempfile.gettempdir(), "nlq_pipeline_benchmark"),
+    )
+    parser.add_argument("--output", help="Simpan hasil ke file JSON")
+    parser.add_argument("--baseline", help="Bandingkan p95 dengan hasil sebelumnya")
+    parser.add_argument("--max-regression", type=float, default=0.25)
+    parser.add_argument("--min-ms", type=float, default=1.0)
+    args = parser.parse_args()
+
+    corpus = DEFAULT_CORPUS
+    if args.corpus:
+        with open(args.corpus, encoding="utf-8") as file:
+            corpus = json.load(file)
+    if args.replay is None:
+        os.makedirs(args.data_dir, exist_ok=True)
+        args.replay = os.path.join(args.data_dir, "corpus_replay.jsonl")
+        write_replay(args.replay, corpus)
+
+    sizes = [int(size) for size in args.rows.split(",") if size.strip()]
+    results: dict[str, Any] = {}
+    if len(sizes) == 1:
+        results[str(sizes[0])] = run_size(sizes[0], corpus, args)
+    else:
+        # satu proses per ukuran dataset agar memori dan cache tidak saling memengaruhi
+        for size in sizes:
+            completed = subprocess.run(
+                [sys.executable, *single_size_args(size, args)],
+                check=True,
+                capture_output=True,
+                text=True,
+            )
+            results[str(size)] = json.loads(completed.stdout)[str(size)]
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            regressions = find_regressions(results, json.load(file), args)
+        if regressions:
+            print("Regresi latency:\n" + "\n".join(regressions), file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
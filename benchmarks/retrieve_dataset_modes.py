@@ -0,0 +1,169 @@
+"""
+Benchmark latency dan akurasi workflow retrieve dataset mode `multi_stage` vs `fast`.
+
+Setiap kasus berisi pertanyaan dan query SQL acuan. Sebuah jawaban dianggap benar
+jika salah satu query yang dijalankan workflow menghasilkan baris yang sama dengan
+query acuan (urutan baris diabaikan).
+
+Contoh:
+    python benchmarks/retrieve_dataset_modes.py --provider openai --model gpt-4o-mini
+    python benchmarks/retrieve_dataset_modes.py --cases cases.json --repeat 3
+
+Format file cases (JSON):
+    {
+        "datasets": {"customers": "Data customer"},
+        "cases": [{"question": "...", "expected_sql": "SELECT ..."}]
+    }
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from typing import Any, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+
+from src.infrastructure import DuckDbManager
+from src.schema import DatasetDetailInformation
+from src.tools import RetrieveDatasetTool
+from src.tools.retrieve_dataset.models import RetreiveDatasetModel
+
+DEFAULT_CASES: dict[str, Any] = {
+    "datasets": {"customers": "Data customer"},
+    "cases": [
+        {
+            "question": "Jumlah customer di setiap kota",
+            "expected_sql": "SELECT Kota, COUNT(*) FROM customers GROUP BY Kota",
+        },
+        {
+            "question": "Nama depan dan email 5 customer dengan total pengeluaran terbesar",
+            "expected_sql": "SELECT NamaDepan, Email FROM customers ORDER BY TotalPengeluaran DESC LIMIT 5",
+        },
+        {
+            "question": "Rata-rata total pengeluaran customer yang tinggal di Jakarta",
+            "expected_sql": "SELECT AVG(TotalPengeluaran) FROM customers WHERE Kota = 'Jakarta'",
+        },
+        {
+            "question": "Jumlah customer yang registrasi di tahun 2024 per bulan",
+            "expected_sql": "SELECT month(TanggalRegistrasi), COUNT(*) FROM customers WHERE year(TanggalRegistrasi) = 2024 GROUP BY 1",
+        },
+    ],
+}
+
+
+def fetch_rows(duckdb_manager: DuckDbManager, query: str) -> Optional[list[tuple]]:
+    try:
+        with duckdb_manager.catalog.pool.acquire() as cursor:
+            rows = cursor.execute(query).fetchall()
+    except Exception:
+        return None
+    return sorted((tuple(str(value) for value in row) for row in rows), key=repr)
+
+
+def is_correct(
+    duckdb_manager: DuckDbManager, state: RetreiveDatasetModel, expected: list[tuple]
+) -> bool:
+    if state.list_queries is None:
+        return False
+    for query_item in state.list_queries.list_queries:
+        if fetch_rows(duckdb_manager, query_item.query) == expected:
+            return True
+    return False
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run_mode(
+    mode: str,
+    config: dict[str, Any],
+    args: argparse.Namespace,
+) -> dict[str, Any]:
+    duckdb_manager = DuckDbManager(args.dataset_dir)
+    dataset = DatasetDetailInformation(
+        available_datasets=list(config["datasets"].keys()),
+        dataset_descriptions=config["datasets"],
+    )
+    tool = RetrieveDatasetTool(
+        dataset,
+        args.provider,
+        args.model,
+        duckdb_manager,
+        workflow_mode=mode,  # type: ignore[arg-type]
+    )
+    for table_name in dataset.available_datasets:
+        duckdb_manager.catalog.ensure_table(table_name)
+
+    latencies = []
+    correct = 0
+    fallbacks = 0
+    total = 0
+    for case in config["cases"]:
+        expected = fetch_rows(duckdb_manager, case["expected_sql"])
+        for _ in range(args.repeat):
+            # pastikan setiap run benar-benar memanggil LLM
+            tool.tool_nodes.query_plan_cache.invalidate(case["question"])
+            start = time.perf_counter()
+            try:
+                result = tool.tool_workflow.run(
+                    RetreiveDatasetModel(data_description_needed=case["question"])
+                )
+                state = RetreiveDatasetModel.model_validate(result)
+            except RuntimeError:
+                state = None
+            latencies.append(time.perf_counter() - start)
+            total += 1
+
+            if state is None:
+                continue
+            if mode == "fast" and not state.fast_path:
+                fallbacks += 1
+            if expected is not None and is_correct(duckdb_manager, state, expected):
+                correct += 1
+
+    tokens = tool.tool_nodes.get_total_token()
+    duckdb_manager.close()
+    return {
+        "mode": mode,
+        "runs": total,
+        "accuracy": round(correct / total, 4) if total else 0.0,
+        "p50_s": round(percentile(latencies, 0.5), 3),
+        "p95_s": round(percentile(latencies, 0.95), 3),
+        "mean_s": round(statistics.mean(latencies), 3),
+        "fallbacks": fallbacks,
+        "estimated_tokens": tokens,
+    }
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--provider", default="openai")
+    parser.add_argument("--model", default="gpt-4o-mini")
+    parser.add_argument("--dataset-dir", default="dataset")
+    parser.add_argument("--cases", help="Path file JSON berisi datasets dan cases")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument(
+        "--modes", nargs="+", default=["multi_stage", "fast"], help="Mode yang diuji"
+    )
+    args = parser.parse_args()
+
+    config = DEFAULT_CASES
+    if args.cases:
+        with open(args.cases) as file:
+            config = json.load(file)
+
+    results = [run_mode(mode, config, args) for mode in args.modes]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
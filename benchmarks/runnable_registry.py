@@ -0,0 +1,125 @@
+"""
+Micro-benchmark overhead membuat runnable LLM per panggilan node vs memakai `RunnableRegistry`.
+
+Yang diukur hanya pembuatan runnable (`bind_tools` / `with_structured_output`, termasuk
+konversi schema pydantic), tanpa request ke API LLM. Selain itu dicek jumlah HTTP client
+yang dibuat oleh node-node satu agent.
+
+Contoh:
+    python benchmarks/runnable_registry.py
+    python benchmarks/runnable_registry.py --provider openai --model gpt-4o-mini --iterations 2000
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from typing import Any, Callable
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.tools import StructuredTool
+
+from src.base import BaseNode, RunnableRegistry
+from src.tools.retrieve_dataset.models import (
+    StructuredOutputFastQuery,
+    StructuredOutputGenerateQuery,
+    StructuredOutputQueryNeeded,
+    StructuredOutputValidateTableExist,
+    StructuredOutputValidationResult,
+)
+
+OUTPUT_MODELS = [
+    StructuredOutputValidateTableExist,
+    StructuredOutputQueryNeeded,
+    StructuredOutputGenerateQuery,
+    StructuredOutputFastQuery,
+    StructuredOutputValidationResult,
+]
+
+
+def read_dataset(data_description_needed: str) -> str:
+    """Ambil data dari dataset sesuai deskripsi data yang dibutuhkan."""
+    return data_description_needed
+
+
+def measure(func: Callable[[], Any], iterations: int) -> dict[str, float]:
+    func()  # warm-up: import lazy dan cache internal library
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1e6)
+    samples.sort()
+    return {
+        "mean_us": round(statistics.fmean(samples), 2),
+        "p50_us": round(samples[len(samples) // 2], 2),
+        "p95_us": round(samples[int(len(samples) * 0.95) - 1], 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--provider", default="openai")
+    parser.add_argument("--model", default="gpt-4o-mini")
+    parser.add_argument("--iterations", type=int, default=1000)
+    parser.add_argument("--nodes", type=int, default=3)
+    args = parser.parse_args()
+
+    # client provider butuh API key saat dibuat; benchmark ini tidak mengirim request
+    for name in ("OPENAI_API_KEY", "ANTHROPIC_API_KEY", "GOOGLE_API_KEY"):
+        os.environ.setdefault(name, "benchmark")
+
+    tool = StructuredTool.from_function(func=read_dataset, name="read_dataset")
+
+    uncached = BaseNode(args.model, args.provider)
+    llm = uncached.llm
+    cached = BaseNode(args.model, args.provider)
+
+    results = {
+        "bind_tools": {
+            "per_call": measure(lambda: llm.bind_tools([tool]), args.iterations),
+            "registry": measure(lambda: cached._bind_tools([tool]), args.iterations),
+        },
+        "with_structured_output": {
+            "per_call": measure(
+                lambda: [
+                    llm.with_structured_output(model, include_raw=True)
+                    for model in OUTPUT_MODELS
+                ],
+                args.iterations,
+            ),
+            "registry": measure(
+                lambda: [
+                    cached._with_structured_output(model) for model in OUTPUT_MODELS
+                ],
+                args.iterations,
+            ),
+        },
+    }
+    for result in results.values():
+        result["saved_us_per_call"] = round(
+            result["per_call"]["mean_us"] - result["registry"]["mean_us"], 2
+        )
+
+    # satu registry per agent: seluruh node memakai instance LLM yang sama
+    registry = RunnableRegistry()
+    shared_nodes = [
+        BaseNode(args.model, args.provider, runnable_registry=registry)
+        for _ in range(args.nodes)
+    ]
+    separate_nodes = [BaseNode(args.model, args.provider) for _ in range(args.nodes)]
+    results["llm_instances"] = {
+        "nodes": args.nodes,
+        "shared_registry": len({id(node.llm) for node in shared_nodes}),
+        "per_node": len({id(node.llm) for node in separate_nodes}),
+    }
+    results["registry_stats"] = cached.runnables.get_stats()
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
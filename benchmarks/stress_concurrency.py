@@ -0,0 +1,231 @@
+"""
+Stress test konkurensi: satu instance `AgentNLQ` melayani banyak percakapan sekaligus.
+
+LLM diganti model deterministik, sehingga test tidak butuh API key dan setiap request
+bisa diverifikasi:
+- validasi pertama setiap request selalu gagal, sehingga setiap request harus
+  melakukan tepat satu retry (counter retry tidak boleh bocor antar request);
+- jawaban dan usage token setiap thread_id harus milik percakapan itu sendiri.
+
+Contoh:
+    python benchmarks/stress_concurrency.py --threads 16 --requests 64
+    python benchmarks/stress_concurrency.py --mode async --requests 64
+"""
+
+import argparse
+import asyncio
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.runnables import RunnableLambda
+
+from src.agent import AgentNLQ
+from src.base import BaseAgentStateModel, RunnableRegistry
+from src.schema import DatasetDetailInformation
+
+CITIES = ["Jakarta", "Surabaya", "Bandung", "Medan", "Makassar"]
+TAG_PATTERN = re.compile(r"req-\d+")
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Chat model deterministik: jawaban ditentukan oleh tag request di dalam prompt."""
+
+    validation_calls: dict[str, int] = {}
+    lock: Any = None
+
+    def model_post_init(self, __context: Any):
+        self.lock = threading.Lock()
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def _tag(self, messages: list[Any]) -> str:
+        for message in reversed(messages):
+            match = TAG_PATTERN.search(str(message.content))
+            if match:
+                return match.group(0)
+        return "req-unknown"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        last = messages[-1]
+        if kwargs.get("tools") and isinstance(last, HumanMessage):
+            message = AIMessage(
+                content="",
+                tool_calls=[
+                    {
+                        "name": "read_dataset",
+                        "args": {"data_description_needed": last.content},
+                        "id": f"call-{self._tag(messages)}",
+                    }
+                ],
+            )
+        else:
+            tool_output = next(
+                (m.content for m in reversed(messages) if isinstance(m, ToolMessage)),
+                "",
+            )
+            message = AIMessage(content=f"Jawaban untuk {tool_output}")
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def bind_tools(self, tools, **kwargs):
+        return self.bind(tools=[getattr(tool, "name", str(tool)) for tool in tools])
+
+    def with_structured_output(self, schema, **kwargs):
+        def respond(messages):
+            tag = self._tag(messages)
+            city = (
+                CITIES[int(tag.split("-")[1]) % len(CITIES)]
+                if tag[4:].isdigit()
+                else "Jakarta"
+            )
+            name = schema.__name__
+            if name == "StructuredOutputValidateTableExist":
+                return schema(
+                    is_table_exist=True,
+                    description_analyst_result="Table to query (exists): customers",
+                )
+            if name == "StructuredOutputQueryNeeded":
+                return schema(
+                    problem=f"jumlah customer {tag}",
+                    problem_solving=f"filter Kota = {city}",
+                    table_required=[
+                        {"table_name": "customers", "required_colums": ["Kota"]}
+                    ],
+                )
+            if name == "StructuredOutputGenerateQuery":
+                return schema(
+                    list_queries=[
+                        {
+                            "table_name": "customers",
+                            "query": f"SELECT '{tag}' AS tag, COUNT(*) AS n FROM customers WHERE Kota = '{city}'",
+                        }
+                    ]
+                )
+            if name == "StructuredOutputValidationResult":
+                with self.lock:
+                    self.validation_calls[tag] = self.validation_calls.get(tag, 0) + 1
+                    attempt = self.validation_calls[tag]
+                # validasi pertama selalu gagal agar setiap request melakukan satu retry
+                return schema(is_valid=attempt > 1, invalid_queries=[0])
+            raise ValueError(f"Unexpected schema: {name}")
+
+        return RunnableLambda(respond)
+
+
+def write_dataset(directory: str, rows: int = 500):
+    with open(os.path.join(directory, "customers.csv"), "w") as file:
+        file.write("CustomerID,Kota,TotalPengeluaran\n")
+        for index in range(rows):
+            file.write(f"{index},{CITIES[index % len(CITIES)]},{index * 1000}\n")
+
+
+def build_agent(directory: str, max_concurrent_queries: int) -> AgentNLQ:
+    dataset = DatasetDetailInformation(
+        available_datasets=["customers"],
+        dataset_descriptions={"customers": "Data customer"},
+    )
+    # seluruh node agent dan tool memakai LLM dari registry yang sama
+    registry = RunnableRegistry()
+    registry.get_llm("openai", "gpt-4o-mini", ScriptedChatModel)
+    agent = AgentNLQ(
+        dataset,
+        directory,
+        "openai",
+        "gpt-4o-mini",
+        max_concurrent_queries=max_concurrent_queries,
+        runnable_registry=registry,
+    )
+    # request unik, cache jawaban dimatikan agar setiap request menjalankan workflow penuh
+    agent.retrieve_dataset_tool.answer_cache.max_entries = 0
+    return agent
+
+
+def check(agent: AgentNLQ, tag: str, result: Any) -> Optional[str]:
+    response = result.get("response") or ""
+    tags = set(TAG_PATTERN.findall(response))
+    if tags != {tag}:
+        return f"{tag}: response berisi tag {sorted(tags)}"
+    if agent.get_response(tag) != response:
+        return f"{tag}: get_response(thread_id) bukan milik percakapan ini"
+    # detail percakapan dibaca dari checkpointer, bukan dari state yang disimpan agent
+    if tag not in agent.show_execute_detail(tag):
+        return f"{tag}: show_execute_detail(thread_id) bukan milik percakapan ini"
+    usage = agent.get_usage(tag)
+    calls = {node: item.calls for node, item in usage.by_node.items()}
+    # usage dicatat per percakapan, termasuk panggilan LLM di dalam tool
+    if calls.get("main_agent") != 1 or calls.get("validation_result") != 2:
+        return f"{tag}: usage percakapan tidak konsisten {calls}"
+    if agent.get_token_usage(tag) < result.get("total_token", 0):
+        return f"{tag}: token percakapan lebih kecil dari token node agent"
+    attempts = agent.nodes.llm.validation_calls.get(tag, 0)
+    if attempts != 2:
+        return f"{tag}: validasi dipanggil {attempts}x, seharusnya 2x (satu retry)"
+    return None
+
+
+def run_threads(agent: AgentNLQ, requests: int, threads: int) -> list[Optional[str]]:
+    def run(index: int) -> Optional[str]:
+        tag = f"req-{index}"
+        result = agent.execute(
+            BaseAgentStateModel(user_message=f"Hitung customer {tag}"), tag
+        )
+        return check(agent, tag, result)
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        return list(executor.map(run, range(requests)))
+
+
+async def run_async(agent: AgentNLQ, requests: int) -> list[Optional[str]]:
+    async def run(index: int) -> Optional[str]:
+        tag = f"req-{index}"
+        result = await agent.aexecute(
+            BaseAgentStateModel(user_message=f"Hitung customer {tag}"), tag
+        )
+        return check(agent, tag, result)
+
+    return await asyncio.gather(*(run(index) for index in range(requests)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--mode", choices=["threads", "async"], default="threads")
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--max-concurrent-queries", type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        write_dataset(directory)
+        agent = build_agent(directory, args.max_concurrent_queries)
+
+        start = time.perf_counter()
+        if args.mode == "threads":
+            errors = run_threads(agent, args.requests, args.threads)
+        else:
+            errors = asyncio.run(run_async(agent, args.requests))
+        elapsed = time.perf_counter() - start
+        agent.duckdb_manager.close()
+
+    failures = [error for error in errors if error]
+    print(
+        f"{args.mode}: {args.requests} request dalam {elapsed:.2f}s, {len(failures)} gagal"
+    )
+    for failure in failures[:20]:
+        print(f"  - {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
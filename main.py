@@ -1,30 +1,53 @@
-from src.agent import AgentNLQ
-from src.base import BaseAgentStateModel
-from src.schema import DatasetDetailInformation
+def main():
+    # diimpor di sini, bukan di level modul: worker process `spawn` (parse Excel)
+    # mengimpor ulang modul ini dan tidak perlu ikut memuat agent
+    from src.agent import AgentNLQ
+    from src.base import BaseAgentStateModel
+    from src.schema import DatasetDetailInformation
 
-dataset = DatasetDetailInformation(
-    available_datasets=["customers"],
-    dataset_descriptions={"customers": "Data customer"},
-)
+    dataset = DatasetDetailInformation(
+        available_datasets=["customers"],
+        dataset_descriptions={"customers": "Data customer"},
+    )
 
+    agent = AgentNLQ(dataset, "dataset", "openai", "gpt-4o-mini")
 
-agent = AgentNLQ(dataset, "dataset", "openai", "gpt-4o-mini")
+    response_times = []
+    try:
+        while True:
+            user_message = input("👤 User: ")
+            if user_message.lower() in ["exit", "e", "ex"]:
+                try:
+                    print("=========Conversation Detail==========")
+                    print(f"Response time: {sum(response_times) / len(response_times)}")
+                    print(f"Total token: {agent.get_token_usage()}")
+                    print(f"Total biaya: ${agent.get_usage().total.cost_usd:.6f}")
+                    print("======================================")
+                    print("\n========HISTORY CONVERSATION=========")
+                    print(agent.show_execute_detail())
+                except ZeroDivisionError:
+                    print("NO CONVERSATION")
+                break
 
-response_times = []
-while True:
-    user_message = input("👤 User: ")
-    if user_message.lower() in ["exit", "e", "ex"]:
-        try:
-            print("=========Conversation Detail==========")
-            print(f"Response time: {sum(response_times) / len(response_times)}")
-            print(f"Total token: {agent.get_token_usage()}")
-            print("======================================")
-            print("\n========HISTORY CONVERSATION=========")
-            print(agent.show_execute_detail())
-        except ZeroDivisionError:
-            print("NO CONVERSATION")
-        break
+            answer_started = False
+            for event in agent.stream(
+                BaseAgentStateModel(user_message=user_message), "default"
+            ):
+                if event.type == "progress":
+                    print(f"⏳ {event.message}")
+                elif event.type == "token":
+                    if not answer_started:
+                        print("🤖 AI: ", end="", flush=True)
+                        answer_started = True
+                    print(event.message, end="", flush=True)
+                elif event.type == "final" and not answer_started:
+                    print(f"🤖 AI: {event.message}", end="")
+            print()
+            response_times.append(agent.get_response_time())
+    finally:
+        # tutup loader, executor query, DuckDB, dan checkpointer meskipun keluar lewat Ctrl+C
+        agent.close()
 
-    agent.execute(BaseAgentStateModel(user_message=user_message), "default")
-    print(f"🤖 AI: {agent.get_response()}")
-    response_times.append(agent.get_response_time())
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,30 @@
-from langgraph.checkpoint.memory import MemorySaver
+from typing import Any, Optional
 
-from src.base import BaseAgent
-from src.infrastructure import DuckDbManager
+from langgraph.checkpoint.base import BaseCheckpointSaver
+
+from src.base import (
+    AgentStreamEvent,
+    BaseAgent,
+    RunnableRegistry,
+    Tracer,
+    UsageTracker,
+)
+from src.infrastructure import (
+    AnswerCache,
+    DatasetChanges,
+    DatasetLoader,
+    DuckDbManager,
+    QueryPlanCache,
+    ScanMode,
+    SqliteCheckpointSaver,
+)
 from src.schema import (
     DatasetDetailInformation,
 )
 from src.tools import (
+    LlmValidationMode,
     RetrieveDatasetTool,
+    WorkflowMode,
 )
 
 from .nodes import AgentNLQNode
@@ -14,31 +32,202 @@ from .prompts import AgentNLQPrompt
 from .workflow import AgentNLQWorkflow
 
 
+def _get_field(output: Any, key: str, default: Any = None) -> Any:
+    # output node bisa berupa dict atau pydantic model
+    if isinstance(output, dict):
+        return output.get(key, default)
+    return getattr(output, key, default)
+
+
 class AgentNLQ(BaseAgent):
+    answer_nodes = ("main_agent", "anwser_tool_message")
+
     def __init__(
         self,
         dataset_detail_information: DatasetDetailInformation,
         directory_datasets_path: str,
         llm_provider: str,
         llm_model: str,
+        scan_mode: ScanMode = "materialize",
+        max_concurrent_queries: int = 4,
+        answer_cache: Optional[AnswerCache] = None,
+        query_plan_cache: Optional[QueryPlanCache] = None,
+        workflow_mode: WorkflowMode = "multi_stage",
+        llm_validation: LlmValidationMode = "always",
+        checkpointer: Optional[BaseCheckpointSaver] = None,
+        max_history_tokens: int = 4000,
+        keep_recent_turns: int = 3,
+        usage_tracker: Optional[UsageTracker] = None,
+        runnable_registry: Optional[RunnableRegistry] = None,
+        tracer: Optional[Tracer] = None,
+        background_warm_up: bool = False,
+        watch_interval: Optional[float] = None,
+        warm_up_workers: Optional[int] = None,
     ):
-        self.checkpointer = MemorySaver()
+        self.dataset_detail_information = dataset_detail_information
+        # satu tracker untuk node agent dan node tool agar usage percakapan lengkap
+        self.usage_tracker = usage_tracker or UsageTracker()
+        # satu instance LLM (HTTP client + connection pool) untuk seluruh node agent dan tool
+        self.runnable_registry = runnable_registry or RunnableRegistry()
+        # history percakapan disimpan di disk (default: <dataset>/.catalog/checkpoints.sqlite)
+        self.checkpointer = checkpointer or SqliteCheckpointSaver.for_directory(
+            directory_datasets_path
+        )
         # Setup duckdb manager datasets
-        self.duckdb_manager = DuckDbManager(directory_datasets_path)
+        self.duckdb_manager = DuckDbManager(
+            directory_datasets_path,
+            max_connections=max(8, max_concurrent_queries),
+            scan_mode=scan_mode,
+        )
 
         # setup tool needed
         self.retrieve_dataset_tool = RetrieveDatasetTool(
-            dataset_detail_information, llm_provider, llm_model, self.duckdb_manager
+            dataset_detail_information,
+            llm_provider,
+            llm_model,
+            self.duckdb_manager,
+            max_concurrent_queries,
+            answer_cache,
+            query_plan_cache,
+            workflow_mode,
+            llm_validation,
+            self.usage_tracker,
+            self.runnable_registry,
         )
 
         # Setup agent prompt
         self.prompts = AgentNLQPrompt(self.retrieve_dataset_tool.tool_prompt)
         # Setup agent nodes
         self.nodes = AgentNLQNode(
-            self.prompts, self.retrieve_dataset_tool, llm_model, llm_provider
+            self.prompts,
+            self.retrieve_dataset_tool,
+            llm_model,
+            llm_provider,
+            max_history_tokens,
+            keep_recent_turns,
+            self.usage_tracker,
+            self.runnable_registry,
         )
 
         # Setup agent workflow
         self.workflow = AgentNLQWorkflow(self.checkpointer, self.nodes)
 
-        super().__init__(self.nodes, self.workflow)
+        super().__init__(self.nodes, self.workflow, tracer)
+
+        # warm-up paralel dan watcher directory dataset (polling setiap `watch_interval` detik)
+        self.dataset_loader = DatasetLoader(
+            self.duckdb_manager,
+            max_workers=warm_up_workers,
+            poll_interval=watch_interval,
+            on_change=self._apply_dataset_changes,
+        )
+        if background_warm_up or watch_interval is not None:
+            self.dataset_loader.start(warm_up=background_warm_up)
+
+    def _apply_dataset_changes(self, changes: DatasetChanges):
+        """Sinkronkan daftar dataset di prompt dengan file yang ditambah/dihapus watcher."""
+        info = self.dataset_detail_information
+        removed = set(changes.removed)
+        # objek baru di-assign sekaligus agar prompt yang sedang dibangun tidak terganggu
+        info.dataset_descriptions = {
+            **{
+                name: description
+                for name, description in info.dataset_descriptions.items()
+                if name not in removed
+            },
+            **{
+                name: name
+                for name in changes.added
+                if name not in info.dataset_descriptions
+            },
+        }
+        info.available_datasets = [
+            name for name in info.available_datasets if name not in removed
+        ] + [name for name in changes.added if name not in info.available_datasets]
+
+    def warm_up(self) -> list[str]:
+        """Load dan profil seluruh dataset terdaftar secara paralel sebelum request pertama masuk."""
+        with self.tracer.trace("warm_up"):
+            return self.dataset_loader.warm_up()
+
+    def close(self):
+        """Tutup executor query dan koneksi database. Panggil setelah semua request selesai."""
+        self.dataset_loader.stop()
+        self.retrieve_dataset_tool.close()
+        self.duckdb_manager.close()
+        if hasattr(self.checkpointer, "close"):
+            self.checkpointer.close()
+
+    def _progress_event(self, node: str, output: Any) -> Optional[AgentStreamEvent]:
+        def progress(message: str, **data: Any) -> AgentStreamEvent:
+            return AgentStreamEvent(
+                type="progress", node=node, message=message, data=data
+            )
+
+        if node == "main_agent":
+            messages = _get_field(output, "messages") or []
+            tool_calls = getattr(messages[-1], "tool_calls", None) if messages else None
+            if tool_calls:
+                return progress(
+                    "Mengambil data dari dataset",
+                    tool_calls=[call["args"] for call in tool_calls],
+                )
+            return None
+        if node == "plan_cache_lookup":
+            if _get_field(output, "plan_cache_hit"):
+                return progress(
+                    "Menggunakan query tersimpan untuk permintaan yang sama"
+                )
+            return None
+        if node == "analyst_table":
+            return progress(
+                "Analisis ketersediaan table selesai",
+                tables_description=_get_field(output, "tables_description", ""),
+            )
+        if node == "analyst_query_needed":
+            query_needed = _get_field(output, "analyst_query_needed_result")
+            return progress(
+                "Analisis kebutuhan query selesai",
+                problem=_get_field(query_needed, "problem", ""),
+            )
+        if node in ("fast_query", "generate_query"):
+            statuses = _get_field(output, "query_statuses") or []
+            return progress(
+                "Query SQL dibuat",
+                queries=[
+                    _get_field(_get_field(status, "query"), "query")
+                    for status in statuses
+                ],
+            )
+        if node == "validate_query":
+            errors = _get_field(output, "sql_errors") or []
+            if errors:
+                return progress(
+                    f"Validasi SQL menemukan {len(errors)} error, query diperbaiki",
+                    errors=errors,
+                )
+            return progress("Validasi SQL lokal lolos")
+        if node == "query_to_db":
+            statuses = _get_field(output, "query_statuses") or []
+            queries = [
+                {
+                    "query": _get_field(_get_field(status, "query"), "query"),
+                    "status": _get_field(status, "status"),
+                    "total_rows": _get_field(status, "total_rows", 0),
+                }
+                for status in statuses
+            ]
+            total_rows = sum(query["total_rows"] for query in queries)
+            return progress(
+                f"{len(queries)} query dijalankan, total {total_rows} baris",
+                queries=queries,
+            )
+        if node in ("validation_result", "accept_result"):
+            is_valid = bool(_get_field(output, "is_valid"))
+            return progress(
+                "Hasil query valid" if is_valid else "Hasil query belum sesuai",
+                is_valid=is_valid,
+            )
+        if node == "read_file":
+            return progress("Data berhasil diambil, menyusun jawaban")
+        return None
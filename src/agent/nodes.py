@@ -1,6 +1,8 @@
-from langchain_core.messages import HumanMessage
+from typing import Optional
 
-from src.base import BaseAgentStateModel, BaseNode
+from langchain_core.messages import BaseMessage, HumanMessage
+
+from src.base import BaseAgentStateModel, BaseNode, RunnableRegistry, UsageTracker
 from src.tools import RetrieveDatasetTool
 
 from .prompts import AgentNLQPrompt
@@ -13,38 +15,72 @@ class AgentNLQNode(BaseNode):
         retrieve_dataset_tool: RetrieveDatasetTool,
         llm_model: str,
         llm_provider: str,
+        max_history_tokens: int = 4000,
+        keep_recent_turns: int = 3,
+        usage_tracker: Optional[UsageTracker] = None,
+        runnable_registry: Optional[RunnableRegistry] = None,
     ):
-        super().__init__(llm_model, llm_provider)
+        super().__init__(llm_model, llm_provider, usage_tracker, runnable_registry)
+        self.history.max_history_tokens = max_history_tokens
+        self.history.keep_recent_turns = max(1, keep_recent_turns)
         self.prompts = prompt
         self.retrieve_dataset_tool = retrieve_dataset_tool
 
+    def _main_agent_update(
+        self, state: BaseAgentStateModel, prompt: list[BaseMessage], response
+    ):
+        tokens = self.get_response_tokens(response)
+
+        # reducer add_messages menambahkan pesan baru ke history yang tersimpan
+        return {
+            "messages": [HumanMessage(content=state.user_message), response],
+            "response": response.content,
+            "total_token": tokens,
+        }
+
     def main_agent(self, state: BaseAgentStateModel):
-        prompt = self.prompts.main_agent(state.user_message)
+        prompt = self.prompts.main_agent(state.user_message, state.messages)
         messages = self.get_prompt_setup(prompt, state.messages)
 
         response = self.call_llm_with_tool(
             messages,
             [
-                self.retrieve_dataset_tool.read_dataset,
+                self.retrieve_dataset_tool.read_dataset_tool,
             ],
         )
+        return self._main_agent_update(state, prompt, response)
 
-        self.estimate_total_tokens(prompt, state.user_message, response.content)
+    async def amain_agent(self, state: BaseAgentStateModel):
+        prompt = self.prompts.main_agent(state.user_message, state.messages)
+        messages = self.get_prompt_setup(prompt, state.messages)
+
+        response = await self.acall_llm_with_tool(
+            messages,
+            [
+                self.retrieve_dataset_tool.read_dataset_tool,
+            ],
+        )
+        return self._main_agent_update(state, prompt, response)
+
+    def _answer_tool_message_update(
+        self, state: BaseAgentStateModel, prompt: list[BaseMessage], response
+    ):
+        tokens = self.get_response_tokens(response)
 
         return {
-            "messages": list(state.messages)
-            + [HumanMessage(content=state.user_message)]
-            + [response],
+            "messages": [response],
             "response": response.content,
+            "total_token": tokens,
         }
 
     def answer_tool_message(self, state: BaseAgentStateModel):
-        prompt = self.prompts.main_agent(state.user_message)
+        prompt = self.prompts.main_agent(state.user_message, state.messages)
         messages = self.get_prompt_setup(prompt, state.messages)
         response = self.call_llm(messages)
-        self.estimate_total_tokens(prompt, state.user_message, response.content)
+        return self._answer_tool_message_update(state, prompt, response)
 
-        return {
-            "messages": list(state.messages) + [response],
-            "response": response.content,
-        }
+    async def aanswer_tool_message(self, state: BaseAgentStateModel):
+        prompt = self.prompts.main_agent(state.user_message, state.messages)
+        messages = self.get_prompt_setup(prompt, state.messages)
+        response = await self.acall_llm(messages)
+        return self._answer_tool_message_update(state, prompt, response)
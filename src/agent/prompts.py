@@ -1,14 +1,38 @@
+from typing import Sequence
+
 from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
 
 from src.tools.retrieve_dataset.prompts import RetrieveDatasetPrompt
 
 
 class AgentNLQPrompt:
-    def __init__(self, retrieve_dataset_prompt: RetrieveDatasetPrompt):
+    def __init__(
+        self,
+        retrieve_dataset_prompt: RetrieveDatasetPrompt,
+        schema_history_turns: int = 3,
+    ):
         self.dataset_prompt = retrieve_dataset_prompt
-
-    def main_agent(self, user_message: str) -> list[BaseMessage]:
-        detail_data_parts = self.dataset_prompt._get_detail_data_parts()
+        self.schema_history_turns = schema_history_turns
+
+    def _schema_query(self, user_message: str, history: Sequence[BaseMessage]) -> str:
+        """
+        Query pencarian schema: pesan user terbaru ditambah beberapa pesan user
+        sebelumnya, agar pertanyaan lanjutan (mis. "kalau per bulan?") tetap menemukan
+        table yang dibahas sebelumnya.
+        """
+        previous = [
+            str(message.content)
+            for message in history
+            if isinstance(message, HumanMessage) and message.content != user_message
+        ]
+        return "\n".join(previous[-self.schema_history_turns :] + [user_message])
+
+    def main_agent(
+        self, user_message: str, history: Sequence[BaseMessage] = ()
+    ) -> list[BaseMessage]:
+        detail_data_parts = self.dataset_prompt._get_detail_data_parts(
+            self._schema_query(user_message, history)
+        )
         data_desc = self.dataset_prompt._get_data_descriptions()
         return [
             SystemMessage(
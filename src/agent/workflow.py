@@ -1,9 +1,11 @@
+from typing import Any, AsyncIterator
+
 from langgraph.checkpoint.base import BaseCheckpointSaver
 from langgraph.graph import END, START, StateGraph
 from langgraph.graph.state import CompiledStateGraph
 from langgraph.prebuilt import ToolNode
 
-from src.base import BaseAgentStateModel, BaseWorkflow
+from src.base import BaseAgentStateModel, BaseWorkflow, traced_runnable
 
 from .nodes import AgentNLQNode
 
@@ -23,16 +25,28 @@ class AgentNLQWorkflow(BaseWorkflow):
     ) -> CompiledStateGraph[BaseAgentStateModel]:
         graph = StateGraph(BaseAgentStateModel)
 
-        # Main nodes
-        graph.add_node("main_agent", self.nodes.main_agent)
-        graph.add_node("anwser_tool_message", self.nodes.answer_tool_message)
+        # Main nodes (sync dan async, untuk invoke maupun ainvoke/astream)
+        graph.add_node(
+            "main_agent",
+            traced_runnable(
+                "main_agent", self.nodes.main_agent, self.nodes.amain_agent
+            ),
+        )
+        graph.add_node(
+            "anwser_tool_message",
+            traced_runnable(
+                "anwser_tool_message",
+                self.nodes.answer_tool_message,
+                self.nodes.aanswer_tool_message,
+            ),
+        )
 
         # Tool node
         graph.add_node(
             "read_file",
             ToolNode(
                 tools=[
-                    self.nodes.retrieve_dataset_tool.read_dataset,
+                    self.nodes.retrieve_dataset_tool.read_dataset_tool,
                 ]
             ),
         )
@@ -55,5 +69,38 @@ class AgentNLQWorkflow(BaseWorkflow):
             config={"configurable": {"thread_id": thread_id}},
         )
 
+    async def arun(self, state: BaseAgentStateModel, thread_id: str):
+        return await self.build.ainvoke(
+            state,
+            config={"configurable": {"thread_id": thread_id}},
+        )
+
+    async def astream(
+        self,
+        state: BaseAgentStateModel,
+        thread_id: str,
+        stream_mode: str = "updates",
+    ) -> AsyncIterator[Any]:
+        async for chunk in self.build.astream(
+            state,
+            config={"configurable": {"thread_id": thread_id}},
+            stream_mode=stream_mode,
+        ):
+            yield chunk
+
+    async def astream_events(
+        self, state: BaseAgentStateModel, thread_id: str
+    ) -> AsyncIterator[dict[str, Any]]:
+        async for event in self.build.astream_events(
+            state,
+            config={"configurable": {"thread_id": thread_id}},
+            version="v2",
+        ):
+            yield event
+
+    def get_state(self, thread_id: str) -> dict[str, Any] | None:
+        snapshot = self.build.get_state({"configurable": {"thread_id": thread_id}})
+        return snapshot.values or None
+
     def show(self):
         pass
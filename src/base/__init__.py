@@ -1,6 +1,44 @@
 from .base_agent import BaseAgent
-from .base_model import BaseAgentStateModel
+from .base_model import AgentStreamEvent, BaseAgentStateModel
 from .base_node import BaseNode
 from .base_workflow import BaseWorkflow
+from .fake_llm import FakeChatModel
+from .history_manager import HistoryManager, HistoryWindow
+from .replay_llm import ReplayChatModel
+from .runnable_registry import RunnableRegistry
+from .tracing import (
+    Span,
+    SpanExporter,
+    Tracer,
+    current_span,
+    render_trace,
+    trace_span,
+    traced,
+    traced_runnable,
+)
+from .usage_tracker import MODEL_PRICES, TokenUsage, UsageReport, UsageTracker
 
-__all__ = ["BaseNode", "BaseWorkflow", "BaseAgent", "BaseAgentStateModel"]
+__all__ = [
+    "BaseNode",
+    "BaseWorkflow",
+    "BaseAgent",
+    "BaseAgentStateModel",
+    "AgentStreamEvent",
+    "HistoryManager",
+    "HistoryWindow",
+    "FakeChatModel",
+    "ReplayChatModel",
+    "RunnableRegistry",
+    "UsageTracker",
+    "UsageReport",
+    "TokenUsage",
+    "MODEL_PRICES",
+    "Tracer",
+    "Span",
+    "SpanExporter",
+    "trace_span",
+    "traced",
+    "traced_runnable",
+    "current_span",
+    "render_trace",
+]
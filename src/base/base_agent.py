@@ -1,23 +1,76 @@
+import asyncio
+import queue
+import threading
 import time
-from typing import Any, Dict
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, Iterator, Optional
 
-from .base_model import BaseAgentStateModel
+from .base_model import AgentStreamEvent, BaseAgentStateModel
 from .base_node import BaseNode
 from .base_workflow import BaseWorkflow
+from .tracing import Span, Tracer, render_trace
+from .usage_tracker import UsageReport
 
 
 class BaseAgent:
-    def __init__(self, agent_node: BaseNode, workflow: BaseWorkflow):
+    # node yang output LLM-nya merupakan jawaban akhir untuk user (di-stream per token)
+    answer_nodes: tuple[str, ...] = ()
+
+    def __init__(
+        self,
+        agent_node: BaseNode,
+        workflow: BaseWorkflow,
+        tracer: Optional[Tracer] = None,
+        max_conversations: int = 10_000,
+    ):
         self.workflow = workflow
         self.agent_node = agent_node
-        self._response_time = 0
-        self._result = None
+        # span per request: node, panggilan LLM, query DuckDB, dan load dataset
+        self.tracer = tracer or Tracer()
+        # hanya jawaban dan response time terakhir per thread_id (LRU), state lengkap
+        # dibaca dari checkpointer saat dibutuhkan
+        self.max_conversations = max_conversations
+        self._responses: OrderedDict[str, tuple[Optional[str], float]] = OrderedDict()
+        self._last_thread_id: Optional[str] = None
+        self._lock = threading.Lock()
+        self._stream_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _store_result(self, thread_id: str, result: Any, response_time: float):
+        response = result.get("response") if isinstance(result, dict) else None
+        with self._lock:
+            self._responses[thread_id] = (response, response_time)
+            self._responses.move_to_end(thread_id)
+            while len(self._responses) > self.max_conversations:
+                self._responses.popitem(last=False)
+            self._last_thread_id = thread_id
+
+    def _resolve_thread_id(self, thread_id: Optional[str]) -> str:
+        with self._lock:
+            return thread_id or self._last_thread_id or ""
 
-    def get_response_time(self):
-        return self._response_time
+    def _get_result(self, thread_id: Optional[str] = None) -> Any:
+        thread_id = self._resolve_thread_id(thread_id)
+        return self.workflow.get_state(thread_id) if thread_id else None
 
-    def get_token_usage(self):
-        return self.agent_node.get_total_token()
+    def get_response_time(self, thread_id: Optional[str] = None):
+        thread_id = self._resolve_thread_id(thread_id)
+        with self._lock:
+            return self._responses.get(thread_id, (None, 0))[1]
+
+    def get_token_usage(self, thread_id: Optional[str] = None):
+        """
+        Total token satu percakapan jika `thread_id` diberikan, selain itu total seluruh
+        percakapan. Termasuk panggilan LLM di dalam tool.
+        """
+        return self.agent_node.usage_tracker.get_total_tokens(thread_id)
+
+    def get_usage(self, thread_id: Optional[str] = None) -> UsageReport:
+        """Rincian token dan biaya per node, model, dan percakapan."""
+        return self.agent_node.usage_tracker.get_report(thread_id)
+
+    def get_trace(self, thread_id: Optional[str] = None) -> list[Span]:
+        """Span request terakhir pada percakapan `thread_id`, urut waktu mulai."""
+        return self.tracer.get_trace(self._resolve_thread_id(thread_id))
 
     def get_llm_model(self):
         return self.agent_node.llm_model
@@ -26,25 +79,144 @@ class BaseAgent:
         self, state: BaseAgentStateModel, thread_id: str
     ) -> Dict[str, Any] | Any:
         start_time = time.perf_counter()
-        result = self.workflow.run(state, thread_id)
-        self._result = result
+        with self.tracer.trace("agent.execute", thread_id=thread_id):
+            result = self.workflow.run(state, thread_id)
         end_time = time.perf_counter()
-        self._response_time = round(end_time - start_time, 2)
+        self._store_result(thread_id, result, round(end_time - start_time, 2))
         return result
 
-    def show_execute_detail(self):
+    async def aexecute(
+        self, state: BaseAgentStateModel, thread_id: str
+    ) -> Dict[str, Any] | Any:
+        start_time = time.perf_counter()
+        with self.tracer.trace("agent.execute", thread_id=thread_id):
+            result = await self.workflow.arun(state, thread_id)
+        end_time = time.perf_counter()
+        self._store_result(thread_id, result, round(end_time - start_time, 2))
+        return result
+
+    def _progress_event(self, node: str, output: Any) -> Optional[AgentStreamEvent]:
+        """Ubah output node menjadi event progress. Override di agent turunan."""
+        return AgentStreamEvent(type="progress", node=node, message=f"{node} selesai")
+
+    async def astream(
+        self, state: BaseAgentStateModel, thread_id: str
+    ) -> AsyncIterator[AgentStreamEvent]:
+        """
+        Jalankan workflow sambil mengirim event progress per node, lalu jawaban akhir
+        per token, dan terakhir event `final`.
+        """
+        start_time = time.perf_counter()
+        yield AgentStreamEvent(type="progress", message="Memproses pertanyaan")
+
+        streamed_runs: set[str] = set()
+        result: Any = None
+        with self.tracer.trace("agent.stream", thread_id=thread_id):
+            async for event in self.workflow.astream_events(state, thread_id):
+                kind = event["event"]
+                metadata = event.get("metadata", {})
+                node = metadata.get("langgraph_node")
+                data = event.get("data", {})
+
+                if kind == "on_chat_model_stream" and node in self.answer_nodes:
+                    content = getattr(data.get("chunk"), "content", "")
+                    if isinstance(content, str) and content:
+                        streamed_runs.add(event["run_id"])
+                        yield AgentStreamEvent(type="token", node=node, message=content)
+
+                elif kind == "on_chat_model_end" and node in self.answer_nodes:
+                    # model yang tidak mendukung streaming: kirim jawaban sekaligus
+                    output = data.get("output")
+                    content = getattr(output, "content", "")
+                    if (
+                        event["run_id"] not in streamed_runs
+                        and isinstance(content, str)
+                        and content
+                        and not getattr(output, "tool_calls", None)
+                    ):
+                        yield AgentStreamEvent(type="token", node=node, message=content)
+
+                elif kind == "on_chain_end":
+                    if not event.get("parent_ids"):
+                        result = data.get("output")
+                        continue
+                    # hanya event level node graph (bukan fungsi/runnable di dalam node)
+                    if event["name"] != node or not any(
+                        tag.startswith("graph:step:") for tag in event.get("tags", [])
+                    ):
+                        continue
+                    progress = self._progress_event(node, data.get("output"))
+                    if progress is not None:
+                        yield progress
+
+        response_time = round(time.perf_counter() - start_time, 2)
+        self._store_result(thread_id, result, response_time)
+        yield AgentStreamEvent(
+            type="final",
+            message=self.get_response(thread_id) or "",
+            data={
+                "total_token": self.get_token_usage(thread_id),
+                "cost_usd": self.get_usage(thread_id).total.cost_usd,
+                "response_time": response_time,
+            },
+        )
+
+    def _get_stream_loop(self) -> asyncio.AbstractEventLoop:
+        # satu event loop permanen agar client async LLM bisa dipakai ulang antar panggilan
+        with self._lock:
+            if self._stream_loop is None:
+                self._stream_loop = asyncio.new_event_loop()
+                threading.Thread(
+                    target=self._stream_loop.run_forever,
+                    name="agent-stream-loop",
+                    daemon=True,
+                ).start()
+            return self._stream_loop
+
+    def stream(
+        self, state: BaseAgentStateModel, thread_id: str
+    ) -> Iterator[AgentStreamEvent]:
+        """Versi sync dari `astream`; workflow dijalankan di event loop pada thread background."""
+        events: queue.Queue = queue.Queue()
+        done = object()
+
+        async def produce():
+            try:
+                async for event in self.astream(state, thread_id):
+                    events.put(event)
+            except BaseException as e:
+                events.put(e)
+            finally:
+                events.put(done)
+
+        future = asyncio.run_coroutine_threadsafe(produce(), self._get_stream_loop())
+        while True:
+            item = events.get()
+            if item is done:
+                break
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+        future.result()
+
+    def show_execute_detail(
+        self, thread_id: Optional[str] = None, include_trace: bool = False
+    ):
         """
         Return a neat, human-readable summary of messages from the last execution result,
         with emoji decorations to make the output more readable.
 
         If an AI message has an empty string (""), it's treated as a tool call / processing
         indicator and replaced with a suitable emoji/text so it doesn't appear blank.
+
+        With `include_trace`, a per-step timing breakdown (nodes, LLM calls, DuckDB
+        queries, dataset loads) of the last request is appended.
         """
-        if self._result is None:
+        state = self._get_result(thread_id)
+        if state is None:
             return "No execution result available."
 
         # locate messages in possible shapes
-        state = self._result
         messages = None
         if isinstance(state, dict):
             messages = (
@@ -129,13 +301,15 @@ class BaseAgent:
             else:
                 lines.append(f"{idx}. {label} {content}")
 
+        if include_trace:
+            lines.extend(["", "⏱️ Timing:", render_trace(self.get_trace(thread_id))])
+
         return "\n".join(lines)
 
     def show_workflow(self):
         return self.workflow.show()
 
-    def get_response(self):
-        if self._result is None:
-            return None
-
-        return self._result.get("response")
+    def get_response(self, thread_id: Optional[str] = None):
+        thread_id = self._resolve_thread_id(thread_id)
+        with self._lock:
+            return self._responses.get(thread_id, (None, 0))[0]
@@ -1,4 +1,5 @@
-from typing import Annotated, Optional, Sequence
+import operator
+from typing import Annotated, Any, Literal, Optional, Sequence
 
 from langchain_core.messages import BaseMessage
 from langgraph.graph import add_messages
@@ -9,3 +10,20 @@ class BaseAgentStateModel(BaseModel):
     messages: Annotated[Sequence[BaseMessage], add_messages] = []
     user_message: str = ""
     response: Optional[str] = "none"
+    # akumulasi token per percakapan (thread), dijumlahkan oleh reducer LangGraph
+    total_token: Annotated[int, operator.add] = 0
+
+
+class AgentStreamEvent(BaseModel):
+    """
+    Event yang dikirim oleh `BaseAgent.stream`/`astream`.
+
+    - `progress`: satu node selesai dijalankan (analisis table, generate query, eksekusi SQL, validasi, dll).
+    - `token`: potongan jawaban akhir dari LLM.
+    - `final`: jawaban lengkap beserta total token dan waktu respon.
+    """
+
+    type: Literal["progress", "token", "final"]
+    node: Optional[str] = None
+    message: str = ""
+    data: dict[str, Any] = {}
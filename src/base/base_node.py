@@ -1,4 +1,7 @@
 import asyncio
+import json
+import os
+import threading
 import time
 from typing import (
     Any,
@@ -6,6 +9,7 @@ from typing import (
     Callable,
     List,
     Literal,
+    Optional,
     Sequence,
     TypeVar,
     Union,
@@ -15,11 +19,18 @@ import tiktoken
 from dotenv import load_dotenv
 from langchain_anthropic import ChatAnthropic
 from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.runnables import ensure_config
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_openai import ChatOpenAI
 from pydantic import BaseModel
 
 from .base_model import BaseAgentStateModel
+from .fake_llm import FakeChatModel
+from .history_manager import HistoryManager, merge_summary
+from .replay_llm import ReplayChatModel
+from .tracing import current_span, trace_span
+from .runnable_registry import RunnableRegistry
+from .usage_tracker import UsageTracker
 
 R = TypeVar("R")
 load_dotenv()
@@ -30,28 +41,51 @@ class BaseNode:
         self,
         llm_model: str,
         provider: str,
+        usage_tracker: Optional[UsageTracker] = None,
+        runnable_registry: Optional[RunnableRegistry] = None,
     ):
         self.llm_model = llm_model
         self.provider = provider.lower()
-        self._llm = None  # lazy init
+        # LLM (lazy init) dan binding tool/structured output; dibagi ke seluruh node agent
+        self.runnables = runnable_registry or RunnableRegistry()
+        # total token seluruh request pada instance ini; token per percakapan ada di state
         self._total_token: int = 0
+        self._token_lock = threading.Lock()
+        # usage per percakapan/node/model; dibagi ke seluruh node dalam satu agent
+        self.usage_tracker = usage_tracker or UsageTracker()
+        self._token_estimates: dict[tuple[int, int], int] = {}
 
         try:
             self.tokenizer = tiktoken.encoding_for_model(llm_model)
         except KeyError:
-            self.tokenizer = tiktoken.get_encoding("cl100k_base")
+            self.tokenizer = self._get_default_tokenizer()
+        except Exception:
+            # file encoding tiktoken tidak bisa diunduh (offline), pakai estimasi karakter
+            self.tokenizer = None
+
+        # history yang dikirim ke LLM dibatasi budget token, lihat `HistoryManager`
+        self.history = HistoryManager(self._estimate_tokens)
+
+    def _get_default_tokenizer(self):
+        try:
+            return tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            return None
 
     @property
     def llm(self):
         """Lazy initialization of LLM instance"""
-        if self._llm is None:
-            self._llm = self._get_llm_provider(self.provider, self.llm_model)
-        return self._llm
+        return self.runnables.get_llm(
+            self.provider,
+            self.llm_model,
+            lambda: self._get_llm_provider(self.provider, self.llm_model),
+        )
 
     def _get_llm_provider(self, provider: str, model: str):
         """Return the appropriate LLM instance based on provider."""
         if provider == "openai":
-            return ChatOpenAI(model=model)
+            # stream_usage: usage_metadata tetap dikirim saat response di-stream
+            return ChatOpenAI(model=model, stream_usage=True)
         elif provider == "anthropic":
             return ChatAnthropic(
                 model_name=model,
@@ -61,26 +95,77 @@ class BaseNode:
             )
         elif provider == "google":
             return ChatGoogleGenerativeAI(model=model)
+        elif provider == "fake":
+            # LLM lokal untuk development dan load test offline
+            return FakeChatModel(latency=float(os.getenv("FAKE_LLM_LATENCY", "0")))
+        elif provider == "replay":
+            # respons LLM hasil rekaman; REPLAY_LLM_RECORD=<provider> merekam dari LLM asli
+            record_provider = os.getenv("REPLAY_LLM_RECORD")
+            latency = os.getenv("REPLAY_LLM_LATENCY", "0")
+            return ReplayChatModel(
+                path=os.getenv("REPLAY_LLM_FILE", "llm_replay.jsonl"),
+                latency=0.0 if latency == "recorded" else float(latency),
+                recorded_latency=latency == "recorded",
+                strict=os.getenv("REPLAY_LLM_STRICT", "0") == "1",
+                record_model=(
+                    self._get_llm_provider(record_provider.lower(), model)
+                    if record_provider
+                    else None
+                ),
+            )
         else:
             raise ValueError(f"Unsupported provider: {provider}")
 
     def call_llm(self, messages: Any) -> Any:
-        """Generalized method to call LLM (async or sync safe)."""
+        """Generalized method to call LLM (sync)."""
         try:
             llm = self.llm
 
-            # if hasattr(llm, "ainvoke") and asyncio.iscoroutinefunction(llm.ainvoke):
-            #     response = await llm.ainvoke(messages)
-            if hasattr(llm, "invoke"):
-                response = llm.invoke(messages)
-            else:
-                raise TypeError("Provided LLM does not support invoke/ainvoke.")
+            with self._llm_span("chat"):
+                if hasattr(llm, "invoke"):
+                    response = llm.invoke(messages)
+                else:
+                    raise TypeError("Provided LLM does not support invoke/ainvoke.")
 
+                self._record_usage(messages, response)
             return response
 
         except Exception as e:
             raise e
 
+    async def acall_llm(self, messages: Any) -> Any:
+        """Generalized method to call LLM (async)."""
+        try:
+            llm = self.llm
+
+            with self._llm_span("chat"):
+                if hasattr(llm, "ainvoke"):
+                    response = await llm.ainvoke(messages)
+                else:
+                    raise TypeError("Provided LLM does not support invoke/ainvoke.")
+
+                self._record_usage(messages, response)
+            return response
+
+        except Exception as e:
+            raise e
+
+    def _llm_span(self, call_type: str):
+        return trace_span(
+            f"llm.{call_type}",
+            "llm",
+            **{"gen_ai.system": self.provider, "gen_ai.request.model": self.llm_model},
+        )
+
+    def _bind_tools(self, tools: Sequence[Any]) -> Any:
+        # Bind tools to LLM (dibuat sekali per kombinasi tools, lihat `RunnableRegistry`)
+        return self.runnables.bind_tools(self.provider, self.llm_model, self.llm, tools)
+
+    def _with_structured_output(self, output_model: type[BaseModel]) -> Any:
+        return self.runnables.with_structured_output(
+            self.provider, self.llm_model, self.llm, output_model, include_raw=True
+        )
+
     def call_llm_with_tool(self, messages: Any, tools: Sequence[Any]) -> Any:
         """
         Call LLM with tools bound to it.
@@ -97,21 +182,148 @@ class BaseNode:
             Exception: If error occurs during LLM invocation
         """
         try:
-            llm = self.llm
+            llm_with_tools = self._bind_tools(tools)
 
-            # Bind tools to LLM
-            if not hasattr(llm, "bind_tools"):
-                raise TypeError("Provided LLM does not support bind_tools method.")
+            with self._llm_span("tools"):
+                if hasattr(llm_with_tools, "invoke"):
+                    response = llm_with_tools.invoke(messages)
+                else:
+                    raise TypeError("LLM with tools does not support invoke/ainvoke.")
+
+                self._record_usage(messages, response)
+            return response
 
-            llm_with_tools = llm.bind_tools(tools)
+        except Exception as e:
+            raise e
+
+    async def acall_llm_with_tool(self, messages: Any, tools: Sequence[Any]) -> Any:
+        """Async version of `call_llm_with_tool`."""
+        try:
+            llm_with_tools = self._bind_tools(tools)
+
+            with self._llm_span("tools"):
+                if hasattr(llm_with_tools, "ainvoke"):
+                    response = await llm_with_tools.ainvoke(messages)
+                else:
+                    raise TypeError("LLM with tools does not support invoke/ainvoke.")
+
+                self._record_usage(messages, response)
+            return response
+
+        except Exception as e:
+            raise e
+
+    def _text_of(self, value: Any) -> str:
+        if isinstance(value, str):
+            return value
+        if isinstance(value, BaseMessage):
+            text = (
+                value.content if isinstance(value.content, str) else str(value.content)
+            )
+            if isinstance(value, AIMessage) and value.tool_calls:
+                text += json.dumps(
+                    [call["args"] for call in value.tool_calls], default=str
+                )
+            return text
+        if isinstance(value, BaseModel):
+            return value.model_dump_json()
+        if isinstance(value, (list, tuple)):
+            return " ".join(self._text_of(item) for item in value)
+        return json.dumps(value, default=str) if isinstance(value, dict) else str(value)
+
+    def _record_usage(self, messages: Any, response: Any, raw: Any = None) -> int:
+        """
+        Catat token satu panggilan LLM ke `usage_tracker`. Memakai `usage_metadata` dari
+        provider; jika tidak ada, token diestimasi dengan tokenizer dan ditulis ke response.
+        """
+        source = raw if raw is not None else response
+        usage = getattr(source, "usage_metadata", None)
+        estimated = not usage
+        if usage:
+            input_tokens = usage.get("input_tokens", 0)
+            output_tokens = usage.get("output_tokens", 0)
+        else:
+            # estimasi per pesan agar system prompt yang berulang memakai cache
+            parts = messages if isinstance(messages, (list, tuple)) else [messages]
+            input_tokens = sum(
+                self._estimate_tokens(self._text_of(part)) for part in parts
+            )
+            output_tokens = self._estimate_tokens(self._text_of(source))
+            if isinstance(source, AIMessage):
+                source.usage_metadata = {
+                    "input_tokens": input_tokens,
+                    "output_tokens": output_tokens,
+                    "total_tokens": input_tokens + output_tokens,
+                }
+
+        span = current_span()
+        if span is not None and span.kind == "llm":
+            span.set(
+                **{
+                    "gen_ai.usage.input_tokens": input_tokens,
+                    "gen_ai.usage.output_tokens": output_tokens,
+                    "gen_ai.usage.estimated": estimated,
+                }
+            )
 
-            if hasattr(llm_with_tools, "invoke"):
-                response = llm_with_tools.invoke(messages)
-            else:
-                raise TypeError("LLM with tools does not support invoke/ainvoke.")
+        # node dan percakapan diambil dari config run LangGraph yang sedang berjalan
+        config = ensure_config()
+        self.usage_tracker.record(
+            config.get("configurable", {}).get("thread_id"),
+            config.get("metadata", {}).get("langgraph_node"),
+            self.llm_model,
+            input_tokens,
+            output_tokens,
+            estimated,
+        )
+        self._sum_token(input_tokens + output_tokens)
+        return input_tokens + output_tokens
+
+    def _parse_structured_output(self, messages: Any, response: Any) -> Any:
+        # with_structured_output(include_raw=True): {"raw", "parsed", "parsing_error"}
+        if isinstance(response, dict) and "raw" in response and "parsed" in response:
+            if response.get("parsing_error") is not None:
+                raise response["parsing_error"]
+            if response["parsed"] is None:
+                raise ValueError("LLM tidak mengembalikan structured output")
+            self._record_usage(messages, response["parsed"], response["raw"])
+            return response["parsed"]
+
+        self._record_usage(messages, response)
+        return response
+
+    def get_response_tokens(self, response: Any) -> int:
+        usage = getattr(response, "usage_metadata", None) or {}
+        return usage.get("total_tokens", 0)
+
+    def _format_structured_output(
+        self,
+        response: Any,
+        output_model: type[BaseModel],
+        output_type: Literal["base", "dict"],
+    ):
+        if output_type == "base":
+            return response
 
+        # If the LLM already returned a dict, return it directly
+        if isinstance(response, dict):
             return response
 
+        # If the LLM returned a BaseModel instance, convert to dict (supports pydantic v1 & v2)
+        if isinstance(response, BaseModel):
+            try:
+                if hasattr(response, "model_dump"):
+                    return response.model_dump()  # pydantic v2
+                return response.dict()  # pydantic v1
+            except Exception as e:
+                raise e
+
+        # Otherwise, attempt to parse the raw response into the provided pydantic model then convert to dict
+        try:
+            parsed = output_model.parse_obj(response)  # type: ignore[arg-type]
+            if hasattr(parsed, "model_dump"):
+                return parsed.model_dump()
+            return parsed.dict()
         except Exception as e:
             raise e
 
@@ -123,37 +335,38 @@ class BaseNode:
     ):
         """Call LLM and return a parsed pydantic model instance as a dictionary (structured output)."""
         try:
-            llm = self.llm.with_structured_output(output_model)
+            llm = self._with_structured_output(output_model)
 
-            if hasattr(llm, "invoke"):
-                response = llm.invoke(messages)
-            else:
-                raise TypeError("Provided LLM does not support invoke/ainvoke.")
+            with self._llm_span("structured_output"):
+                if hasattr(llm, "invoke"):
+                    response = llm.invoke(messages)
+                else:
+                    raise TypeError("Provided LLM does not support invoke/ainvoke.")
 
-            if output_type == "base":
-                return response
+                response = self._parse_structured_output(messages, response)
+            return self._format_structured_output(response, output_model, output_type)
+
+        except Exception as e:
+            raise e
 
-            # If the LLM already returned a dict, return it directly
-            if isinstance(response, dict):
-                return response
+    async def acall_llm_with_structured_output(
+        self,
+        messages: Any,
+        output_model: type[BaseModel],
+        output_type: Literal["base", "dict"] = "base",
+    ):
+        """Async version of `call_llm_with_structured_output`."""
+        try:
+            llm = self._with_structured_output(output_model)
 
-            # If the LLM returned a BaseModel instance, convert to dict (supports pydantic v1 & v2)
-            if isinstance(response, BaseModel):
-                try:
-                    if hasattr(response, "model_dump"):
-                        return response.model_dump()  # pydantic v2
-                    return response.dict()  # pydantic v1
-                except Exception as e:
-                    raise e
+            with self._llm_span("structured_output"):
+                if hasattr(llm, "ainvoke"):
+                    response = await llm.ainvoke(messages)
+                else:
+                    raise TypeError("Provided LLM does not support invoke/ainvoke.")
 
-            # Otherwise, attempt to parse the raw response into the provided pydantic model then convert to dict
-            try:
-                parsed = output_model.parse_obj(response)  # type: ignore[arg-type]
-                if hasattr(parsed, "model_dump"):
-                    return parsed.model_dump()
-                return parsed.dict()
-            except Exception as e:
-                raise e
+                response = self._parse_structured_output(messages, response)
+            return self._format_structured_output(response, output_model, output_type)
 
         except Exception as e:
             raise e
@@ -203,33 +416,26 @@ class BaseNode:
         return self._total_token
 
     def _sum_token(self, token: int):
-        self._total_token += token
+        with self._token_lock:
+            self._total_token += token
 
     def _estimate_tokens(self, text: str) -> int:
         """Estimate token count for text using tiktoken"""
+        if self.tokenizer is None:
+            return len(text) // 4
+        # system prompt yang sama dikirim berulang kali: cache hasil tokenisasi
+        key = (hash(text), len(text))
+        cached = self._token_estimates.get(key)
+        if cached is not None:
+            return cached
         try:
             token = len(self.tokenizer.encode(text))
-            return token
         except Exception as e:
             return len(text) // 4  # fallback
-
-    def _handle_prompt_token(self, prompts: List[BaseMessage]) -> str:
-        list_prompt = []
-        for prompt in prompts:
-            list_prompt.append(prompt.content)
-
-        return " ".join(list_prompt)
-
-    def estimate_total_tokens(
-        self, prompts: List[BaseMessage], user_message: str, response_llm: str
-    ):
-        tokens = (
-            self._estimate_tokens(self._handle_prompt_token(prompts))
-            + self._estimate_tokens(user_message)
-            + self._estimate_tokens(response_llm)
-        )
-        self._sum_token(tokens)
-        return tokens
+        if len(self._token_estimates) > 4096:
+            self._token_estimates.clear()
+        self._token_estimates[key] = token
+        return token
 
     def estimate_structured_output_tokens(
         self, prompt: str, response_content: str = ""
@@ -245,15 +451,16 @@ class BaseNode:
             return 100
 
     def get_all_previous_messages(self, messages: Sequence[BaseMessage]):
-        all_previous_messages = messages
-        return all_previous_messages
+        return self.history.select(messages).messages
 
     def get_prompt_setup(
         self, agent_prompt: List[BaseMessage], state_messages: Sequence[BaseMessage]
     ) -> List[Any]:
-        all_previous_messages = self.get_all_previous_messages(state_messages)
+        window = self.history.select(state_messages)
         setup_prompt: list[Any] = (
-            [agent_prompt[0]] + list(all_previous_messages) + [agent_prompt[1]]
+            [merge_summary(agent_prompt[0], window.summary)]
+            + list(window.messages)
+            + [agent_prompt[1]]
         )
         return setup_prompt
 
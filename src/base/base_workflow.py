@@ -1,6 +1,7 @@
 from abc import ABC, abstractmethod
 from typing import (
     Any,
+    AsyncIterator,
     Dict,
 )
 
@@ -10,6 +11,25 @@ class BaseWorkflow(ABC):
     def run(self, state, thread_id: str) -> Dict[str, Any] | Any:
         pass
 
+    @abstractmethod
+    async def arun(self, state, thread_id: str) -> Dict[str, Any] | Any:
+        pass
+
+    @abstractmethod
+    def astream(
+        self, state, thread_id: str, stream_mode: str = "updates"
+    ) -> AsyncIterator[Any]:
+        pass
+
+    @abstractmethod
+    def astream_events(self, state, thread_id: str) -> AsyncIterator[Dict[str, Any]]:
+        pass
+
+    @abstractmethod
+    def get_state(self, thread_id: str) -> Dict[str, Any] | None:
+        """State terakhir percakapan `thread_id` dari checkpointer."""
+        pass
+
     @abstractmethod
     def show(self):
         pass
@@ -0,0 +1,185 @@
+import asyncio
+import json
+import re
+import time
+import types
+import typing
+from typing import Any, Iterator, Optional, Sequence
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import (
+    AIMessage,
+    AIMessageChunk,
+    BaseMessage,
+    HumanMessage,
+    ToolMessage,
+)
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import RunnableLambda
+from pydantic import BaseModel
+
+_TABLE_PATTERN = re.compile(r"Table name: \*\*([^*]+)\*\*")
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Chat model lokal tanpa API untuk development dan load test offline (provider "fake").
+
+    - Dengan tools: pesan user langsung diteruskan sebagai tool call pertama.
+    - Structured output: field diisi otomatis; query SQL dibuat dari table pertama di prompt.
+    - `latency` mensimulasikan waktu respon LLM (detik per panggilan).
+    """
+
+    latency: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake"
+
+    def _find_table(self, messages: Sequence[BaseMessage]) -> Optional[str]:
+        for message in messages:
+            match = _TABLE_PATTERN.search(str(message.content))
+            if match:
+                return match.group(1)
+        return None
+
+    def _respond(self, messages: Sequence[BaseMessage], tools: Any) -> AIMessage:
+        last = messages[-1]
+        if tools and isinstance(last, HumanMessage):
+            return AIMessage(
+                content="",
+                tool_calls=[
+                    {
+                        "name": tools[0],
+                        "args": {"data_description_needed": str(last.content)},
+                        "id": f"call_{abs(hash(str(last.content)))}",
+                    }
+                ],
+            )
+
+        tool_output = next(
+            (str(m.content) for m in reversed(messages) if isinstance(m, ToolMessage)),
+            "",
+        )
+        if tool_output:
+            return AIMessage(
+                content=f"Berikut data yang ditemukan: {tool_output[:500]}"
+            )
+        return AIMessage(content="Halo, apakah ada data yang perlu saya query?")
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        message = self._respond(messages, kwargs.get("tools"))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        message = self._respond(messages, kwargs.get("tools"))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(
+        self, messages, stop=None, run_manager=None, **kwargs
+    ) -> Iterator[ChatGenerationChunk]:
+        if self.latency:
+            time.sleep(self.latency)
+        message = self._respond(messages, kwargs.get("tools"))
+        yield from self._stream_message(message, run_manager)
+
+    def _stream_message(
+        self, message: AIMessage, run_manager: Any = None
+    ) -> Iterator[ChatGenerationChunk]:
+        if message.tool_calls:
+            yield ChatGenerationChunk(
+                message=AIMessageChunk(
+                    content="",
+                    tool_call_chunks=[
+                        {
+                            "name": call["name"],
+                            "args": json.dumps(call["args"]),
+                            "id": call["id"],
+                            "index": index,
+                        }
+                        for index, call in enumerate(message.tool_calls)
+                    ],
+                    usage_metadata=message.usage_metadata,
+                )
+            )
+            return
+
+        words = str(message.content).split(" ")
+        for index, word in enumerate(words):
+            chunk = ChatGenerationChunk(
+                message=AIMessageChunk(
+                    content=f"{word} ",
+                    # usage dikirim di chunk terakhir seperti provider asli
+                    usage_metadata=(
+                        message.usage_metadata if index == len(words) - 1 else None
+                    ),
+                )
+            )
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any):
+        return self.bind(tools=[getattr(tool, "name", str(tool)) for tool in tools])
+
+    def _fake_value(self, annotation: Any, name: str, table: str) -> Any:
+        origin = typing.get_origin(annotation)
+        args = [arg for arg in typing.get_args(annotation) if arg is not type(None)]
+        if origin in (typing.Union, types.UnionType):
+            return self._fake_value(args[0], name, table)
+        if origin is list:
+            return [self._fake_value(args[0], name, table)] if args else []
+        if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+            return self._fake_model(annotation, table)
+        if annotation is bool:
+            return True
+        if annotation is int:
+            return 0
+        if name == "table_name":
+            return table
+        if name == "query":
+            return f'SELECT * FROM "{table}" LIMIT 10'
+        return f"{name} (fake)"
+
+    def _fake_model(self, schema: type[BaseModel], table: str) -> BaseModel:
+        values = {}
+        for name, field in schema.model_fields.items():
+            origin = typing.get_origin(field.annotation)
+            item = (typing.get_args(field.annotation) or [None])[0]
+            builds_models = (
+                origin is list
+                and isinstance(item, type)
+                and issubclass(item, BaseModel)
+            )
+            # field opsional memakai default, kecuali daftar model (mis. list query)
+            if not field.is_required() and not builds_models:
+                continue
+            values[name] = self._fake_value(field.annotation, name, table)
+        return schema.model_validate(values)
+
+    def _structured_output(self, schema: Any, messages: Any, include_raw: bool) -> Any:
+        table = self._find_table(messages if isinstance(messages, list) else [])
+        parsed = self._fake_model(schema, table or "unknown")
+        if include_raw:
+            raw = AIMessage(content=parsed.model_dump_json())
+            return {"raw": raw, "parsed": parsed, "parsing_error": None}
+        return parsed
+
+    def with_structured_output(
+        self, schema: Any, *, include_raw: bool = False, **kwargs: Any
+    ):
+        def respond(messages: Any) -> Any:
+            if self.latency:
+                time.sleep(self.latency)
+            return self._structured_output(schema, messages, include_raw)
+
+        async def arespond(messages: Any) -> Any:
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            return self._structured_output(schema, messages, include_raw)
+
+        return RunnableLambda(respond, afunc=arespond)
@@ -0,0 +1,147 @@
+from typing import Callable, Optional, Sequence
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+from pydantic import BaseModel
+
+
+class HistoryWindow(BaseModel):
+    messages: list[BaseMessage]
+    # ringkasan turn lama yang tidak lagi dikirim utuh ke LLM
+    summary: str = ""
+    total_tokens: int = 0
+
+
+class HistoryManager:
+    """
+    Memilih history percakapan yang dikirim ke LLM berdasarkan budget token.
+
+    - `keep_recent_turns` turn terakhir dikirim utuh.
+    - Pada turn yang lebih lama, output tool (hasil query) diganti ringkasan pendek.
+    - Jika masih melebihi `max_history_tokens`, turn paling lama diringkas menjadi
+      teks singkat (pertanyaan user dan potongan jawaban) yang disisipkan ke system prompt.
+
+    Ringkasan dibuat tanpa panggilan LLM sehingga tidak menambah latency.
+    """
+
+    def __init__(
+        self,
+        estimate_tokens: Callable[[str], int],
+        max_history_tokens: int = 4000,
+        keep_recent_turns: int = 3,
+        digest_chars: int = 300,
+        max_summary_tokens: int = 500,
+    ):
+        self.estimate_tokens = estimate_tokens
+        self.max_history_tokens = max_history_tokens
+        self.keep_recent_turns = max(1, keep_recent_turns)
+        self.digest_chars = digest_chars
+        self.max_summary_tokens = max_summary_tokens
+        self._token_cache: dict[tuple[str, int], int] = {}
+
+    def _count(self, message: BaseMessage) -> int:
+        content = (
+            message.content
+            if isinstance(message.content, str)
+            else str(message.content)
+        )
+        if isinstance(message, AIMessage) and message.tool_calls:
+            content += str(message.tool_calls)
+        if message.id is None:
+            return self.estimate_tokens(content)
+
+        key = (message.id, len(content))
+        if key not in self._token_cache:
+            if len(self._token_cache) > 10_000:
+                self._token_cache.clear()
+            self._token_cache[key] = self.estimate_tokens(content)
+        return self._token_cache[key]
+
+    def _split_turns(self, messages: Sequence[BaseMessage]) -> list[list[BaseMessage]]:
+        turns: list[list[BaseMessage]] = []
+        for message in messages:
+            if isinstance(message, HumanMessage) or not turns:
+                turns.append([])
+            turns[-1].append(message)
+        return turns
+
+    def _digest(self, message: ToolMessage) -> ToolMessage:
+        content = str(message.content)
+        if len(content) <= self.digest_chars:
+            return message
+        digest = content[: self.digest_chars].rsplit("\n", 1)[0]
+        return message.model_copy(
+            update={
+                "content": f"{digest}\n... (output tool diringkas, {len(content)} karakter)",
+                # id berbeda agar cache token tidak tertukar dengan pesan aslinya
+                "id": f"{message.id}-digest" if message.id else None,
+            }
+        )
+
+    def _summarize_turn(self, turn: list[BaseMessage]) -> str:
+        question = next(
+            (str(m.content) for m in turn if isinstance(m, HumanMessage)), ""
+        )
+        answers = [
+            str(m.content)
+            for m in turn
+            if isinstance(m, AIMessage) and isinstance(m.content, str) and m.content
+        ]
+        answer = answers[-1] if answers else ""
+        queried = any(isinstance(m, ToolMessage) for m in turn)
+
+        line = f"- User: {' '.join(question.split())[:200]}"
+        if queried:
+            line += " (data diambil dengan read_dataset)"
+        if answer:
+            line += f" | AI: {' '.join(answer.split())[:200]}"
+        return line
+
+    def select(self, messages: Sequence[BaseMessage]) -> HistoryWindow:
+        turns = self._split_turns(messages)
+        recent = turns[-self.keep_recent_turns :]
+        older = [
+            [self._digest(m) if isinstance(m, ToolMessage) else m for m in turn]
+            for turn in turns[: -self.keep_recent_turns]
+        ]
+
+        recent_tokens = sum(self._count(m) for turn in recent for m in turn)
+        older_tokens = [sum(self._count(m) for m in turn) for turn in older]
+
+        # turn lama dipindah ke ringkasan, mulai dari yang paling lama, sampai muat budget
+        summarized = 0
+        while (
+            summarized < len(older)
+            and recent_tokens + sum(older_tokens[summarized:]) > self.max_history_tokens
+        ):
+            summarized += 1
+
+        summary_lines: list[str] = []
+        summary_tokens = 0
+        # turn terbaru di ringkasan diprioritaskan jika ringkasan melebihi budget
+        for turn in reversed(older[:summarized]):
+            line = self._summarize_turn(turn)
+            line_tokens = self.estimate_tokens(line)
+            if summary_tokens + line_tokens > self.max_summary_tokens:
+                break
+            summary_lines.insert(0, line)
+            summary_tokens += line_tokens
+
+        kept = [m for turn in older[summarized:] + recent for m in turn]
+        return HistoryWindow(
+            messages=kept,
+            summary="\n".join(summary_lines),
+            total_tokens=recent_tokens
+            + sum(older_tokens[summarized:])
+            + summary_tokens,
+        )
+
+
+def merge_summary(prompt: BaseMessage, summary: Optional[str]) -> BaseMessage:
+    """Tambahkan ringkasan percakapan lama ke akhir system prompt."""
+    if not summary:
+        return prompt
+    return prompt.model_copy(
+        update={
+            "content": f"{prompt.content}\n#Ringkasan percakapan sebelumnya:\n{summary}\n"
+        }
+    )
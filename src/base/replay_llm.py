@@ -0,0 +1,321 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Iterator, Optional, Sequence
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import (
+    AIMessage,
+    BaseMessage,
+    HumanMessage,
+    convert_to_messages,
+)
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import RunnableLambda, ensure_config
+from pydantic import BaseModel, PrivateAttr
+
+from .fake_llm import FakeChatModel
+
+
+class ReplayChatModel(FakeChatModel):
+    """
+    Chat model yang memutar ulang respons LLM hasil rekaman (provider "replay").
+
+    Rekaman disimpan di file JSONL, satu baris per panggilan LLM: node LangGraph, jenis
+    panggilan (`chat`, `tools`, atau nama schema structured output), fingerprint prompt,
+    dan output (pesan beserta tool call, atau hasil structured output).
+
+    - Dengan `record_model`, panggilan diteruskan ke LLM asli lalu hasilnya direkam.
+    - Tanpa `record_model`, rekaman dicari berdasarkan fingerprint prompt, lalu field
+      `match` (potongan teks yang harus ada di prompt), lalu rekaman default node tersebut
+      (tanpa fingerprint dan `match`). Jika tidak ada rekaman, respons `FakeChatModel`
+      dipakai (atau ValueError jika `strict`).
+    - `latency` mensimulasikan waktu respon; `recorded_latency` memakai durasi rekaman.
+    """
+
+    path: str
+    record_model: Optional[BaseChatModel] = None
+    strict: bool = False
+    recorded_latency: bool = False
+
+    _index: dict[tuple[str, str], list[dict]] = PrivateAttr(default_factory=dict)
+    _cursors: dict[tuple[str, str, str], int] = PrivateAttr(default_factory=dict)
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+
+    def model_post_init(self, context: Any):
+        super().model_post_init(context)
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding="utf-8") as file:
+            for line in file:
+                if line.strip():
+                    self._add_entry(json.loads(line))
+
+    @property
+    def _llm_type(self) -> str:
+        return "replay"
+
+    def _add_entry(self, entry: dict):
+        self._index.setdefault((entry["node"], entry["kind"]), []).append(entry)
+
+    def _as_messages(self, value: Any) -> list[BaseMessage]:
+        if hasattr(value, "to_messages"):
+            return value.to_messages()
+        if isinstance(value, str):
+            return [HumanMessage(content=value)]
+        return convert_to_messages(value)
+
+    def _call_info(self, messages: Sequence[BaseMessage], kind: str) -> dict:
+        digest = hashlib.sha256()
+        for message in messages:
+            digest.update(f"{message.type}\0{message.content}\0".encode())
+        return {
+            # node diambil dari config run LangGraph yang sedang berjalan
+            "node": ensure_config().get("metadata", {}).get("langgraph_node", ""),
+            "kind": kind,
+            "fingerprint": digest.hexdigest()[:16],
+        }
+
+    def _find(self, info: dict, messages: Sequence[BaseMessage]) -> Optional[dict]:
+        same_call = self._index.get((info["node"], info["kind"]), [])
+        candidates = [
+            entry
+            for entry in same_call
+            if entry.get("fingerprint") == info["fingerprint"]
+        ]
+        if not candidates:
+            text = "\n".join(str(message.content) for message in messages)
+            matched = [
+                entry
+                for entry in same_call
+                if entry.get("match") and entry["match"] in text
+            ]
+            # potongan teks terpanjang paling spesifik
+            longest = max((len(entry["match"]) for entry in matched), default=0)
+            candidates = [entry for entry in matched if len(entry["match"]) == longest]
+        # rekaman tanpa fingerprint dan `match` menjadi default untuk node tersebut
+        candidates = candidates or [
+            entry
+            for entry in same_call
+            if not entry.get("fingerprint") and not entry.get("match")
+        ]
+
+        if not candidates:
+            if self.strict:
+                raise ValueError(
+                    f"Rekaman LLM tidak ditemukan untuk node '{info['node']}' ({info['kind']})"
+                )
+            return None
+
+        # rekaman dengan prompt yang sama dipakai bergiliran (mis. retry validasi)
+        key = (info["node"], info["kind"], info["fingerprint"])
+        with self._lock:
+            index = self._cursors.get(key, 0)
+            self._cursors[key] = index + 1
+        return candidates[index % len(candidates)]
+
+    def _delay(self, entry: Optional[dict]) -> float:
+        if self.recorded_latency and entry is not None:
+            return float(entry.get("latency", 0))
+        return self.latency
+
+    def _record(
+        self,
+        info: dict,
+        messages: Sequence[BaseMessage],
+        latency: float,
+        **output: Any,
+    ):
+        entry = {
+            **info,
+            "prompt": str(messages[-1].content)[:200] if messages else "",
+            "latency": round(latency, 4),
+            **output,
+        }
+        with self._lock:
+            self._add_entry(entry)
+            with open(self.path, "a", encoding="utf-8") as file:
+                file.write(json.dumps(entry, ensure_ascii=False, default=str) + "\n")
+
+    def _dump_message(self, message: AIMessage) -> dict:
+        return {
+            "message": {
+                "content": message.content,
+                "tool_calls": [
+                    {"name": call["name"], "args": call["args"], "id": call["id"]}
+                    for call in message.tool_calls
+                ],
+            },
+            "usage": message.usage_metadata,
+        }
+
+    def _load_message(self, entry: dict) -> AIMessage:
+        message = entry["message"]
+        return AIMessage(
+            content=message.get("content", ""),
+            tool_calls=message.get("tool_calls", []),
+            usage_metadata=entry.get("usage"),
+        )
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any):
+        names = [getattr(tool, "name", str(tool)) for tool in tools]
+        if self.record_model is None:
+            return self.bind(tools=names)
+        # tool asli dibutuhkan untuk bind_tools pada LLM yang direkam
+        return self.bind(tools=names, record_tools=list(tools))
+
+    def _recorded_llm(self, kwargs: dict) -> Any:
+        tools = kwargs.get("record_tools")
+        return self.record_model.bind_tools(tools) if tools else self.record_model
+
+    def _replay(self, messages: Sequence[BaseMessage], kwargs: dict):
+        info = self._call_info(messages, "tools" if kwargs.get("tools") else "chat")
+        entry = self._find(info, messages)
+        if entry is None:
+            return self._respond(messages, kwargs.get("tools")), self._delay(None)
+        return self._load_message(entry), self._delay(entry)
+
+    def _invoke_recorded(self, messages: Sequence[BaseMessage], kwargs: dict):
+        info = self._call_info(messages, "tools" if kwargs.get("tools") else "chat")
+        start = time.perf_counter()
+        message = self._recorded_llm(kwargs).invoke(messages)
+        self._record(
+            info, messages, time.perf_counter() - start, **self._dump_message(message)
+        )
+        return message
+
+    async def _ainvoke_recorded(self, messages: Sequence[BaseMessage], kwargs: dict):
+        info = self._call_info(messages, "tools" if kwargs.get("tools") else "chat")
+        start = time.perf_counter()
+        message = await self._recorded_llm(kwargs).ainvoke(messages)
+        self._record(
+            info, messages, time.perf_counter() - start, **self._dump_message(message)
+        )
+        return message
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        if self.record_model is not None:
+            message = self._invoke_recorded(messages, kwargs)
+        else:
+            message, delay = self._replay(messages, kwargs)
+            if delay:
+                time.sleep(delay)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        if self.record_model is not None:
+            message = await self._ainvoke_recorded(messages, kwargs)
+        else:
+            message, delay = self._replay(messages, kwargs)
+            if delay:
+                await asyncio.sleep(delay)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(
+        self, messages, stop=None, run_manager=None, **kwargs
+    ) -> Iterator[ChatGenerationChunk]:
+        if self.record_model is not None:
+            message = self._invoke_recorded(messages, kwargs)
+        else:
+            message, delay = self._replay(messages, kwargs)
+            if delay:
+                time.sleep(delay)
+        yield from self._stream_message(message, run_manager)
+
+    def _replay_structured(
+        self, schema: type[BaseModel], info: dict, messages: Sequence[BaseMessage]
+    ) -> tuple[BaseModel, AIMessage, float]:
+        entry = self._find(info, messages)
+        if entry is None:
+            parsed = self._fake_model(schema, self._find_table(messages) or "unknown")
+            return (
+                parsed,
+                AIMessage(content=parsed.model_dump_json()),
+                self._delay(None),
+            )
+        parsed = schema.model_validate(entry["output"])
+        raw = AIMessage(
+            content=json.dumps(entry["output"], ensure_ascii=False),
+            usage_metadata=entry.get("usage"),
+        )
+        return parsed, raw, self._delay(entry)
+
+    def _record_structured(
+        self,
+        info: dict,
+        messages: Sequence[BaseMessage],
+        result: dict,
+        latency: float,
+    ):
+        parsed = result.get("parsed")
+        if parsed is None:
+            return
+        self._record(
+            info,
+            messages,
+            latency,
+            output=(
+                parsed.model_dump(mode="json")
+                if isinstance(parsed, BaseModel)
+                else parsed
+            ),
+            usage=getattr(result.get("raw"), "usage_metadata", None),
+        )
+
+    def _structured_result(self, result: dict, include_raw: bool) -> Any:
+        if include_raw:
+            return result
+        if result.get("parsing_error") is not None:
+            raise result["parsing_error"]
+        return result["parsed"]
+
+    def with_structured_output(
+        self, schema: Any, *, include_raw: bool = False, **kwargs: Any
+    ):
+        kind = getattr(schema, "__name__", "structured_output")
+        recorder = (
+            self.record_model.with_structured_output(schema, include_raw=True, **kwargs)
+            if self.record_model is not None
+            else None
+        )
+
+        def respond(value: Any) -> Any:
+            messages = self._as_messages(value)
+            info = self._call_info(messages, kind)
+            if recorder is not None:
+                start = time.perf_counter()
+                result = recorder.invoke(value)
+                self._record_structured(
+                    info, messages, result, time.perf_counter() - start
+                )
+                return self._structured_result(result, include_raw)
+
+            parsed, raw, delay = self._replay_structured(schema, info, messages)
+            if delay:
+                time.sleep(delay)
+            return self._structured_result(
+                {"raw": raw, "parsed": parsed, "parsing_error": None}, include_raw
+            )
+
+        async def arespond(value: Any) -> Any:
+            messages = self._as_messages(value)
+            info = self._call_info(messages, kind)
+            if recorder is not None:
+                start = time.perf_counter()
+                result = await recorder.ainvoke(value)
+                self._record_structured(
+                    info, messages, result, time.perf_counter() - start
+                )
+                return self._structured_result(result, include_raw)
+
+            parsed, raw, delay = self._replay_structured(schema, info, messages)
+            if delay:
+                await asyncio.sleep(delay)
+            return self._structured_result(
+                {"raw": raw, "parsed": parsed, "parsing_error": None}, include_raw
+            )
+
+        return RunnableLambda(respond, afunc=arespond)
@@ -0,0 +1,96 @@
+import threading
+from typing import Any, Callable, Hashable, Sequence
+
+from pydantic import BaseModel
+
+
+class RunnableRegistry:
+    """
+    Cache instance LLM dan runnable turunannya (`bind_tools`, `with_structured_output`).
+
+    Satu instance LLM per (provider, model) sehingga HTTP client dan connection pool
+    dipakai bersama oleh seluruh node yang memakai registry yang sama. Binding tool dan
+    structured output (konversi schema pydantic ke JSON schema) hanya dibuat sekali per
+    kombinasi tools / output model, lalu dipakai ulang di setiap panggilan node.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._llms: dict[tuple[str, str], Any] = {}
+        self._runnables: dict[Hashable, Any] = {}
+        # referensi tool disimpan agar id() pada key tidak dipakai ulang oleh objek lain
+        self._tool_refs: dict[Hashable, tuple[Any, ...]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get_llm(self, provider: str, model: str, factory: Callable[[], Any]) -> Any:
+        key = (provider, model)
+        llm = self._llms.get(key)
+        if llm is None:
+            with self._lock:
+                llm = self._llms.get(key)
+                if llm is None:
+                    llm = factory()
+                    self._llms[key] = llm
+        return llm
+
+    def get_or_create(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        runnable = self._runnables.get(key)
+        if runnable is not None:
+            self.hits += 1
+            return runnable
+        with self._lock:
+            runnable = self._runnables.get(key)
+            if runnable is None:
+                self.misses += 1
+                runnable = factory()
+                self._runnables[key] = runnable
+            else:
+                self.hits += 1
+        return runnable
+
+    def bind_tools(
+        self, provider: str, model: str, llm: Any, tools: Sequence[Any], **kwargs: Any
+    ) -> Any:
+        if not hasattr(llm, "bind_tools"):
+            raise TypeError("Provided LLM does not support bind_tools method.")
+
+        tools = tuple(tools)
+        key = (
+            "tools",
+            provider,
+            model,
+            tuple(id(tool) for tool in tools),
+            tuple(sorted(kwargs.items())),
+        )
+        runnable = self.get_or_create(key, lambda: llm.bind_tools(tools, **kwargs))
+        self._tool_refs.setdefault(key, tools)
+        return runnable
+
+    def with_structured_output(
+        self,
+        provider: str,
+        model: str,
+        llm: Any,
+        output_model: type[BaseModel],
+        **kwargs: Any,
+    ) -> Any:
+        key = (
+            "structured_output",
+            provider,
+            model,
+            output_model,
+            tuple(sorted(kwargs.items())),
+        )
+        return self.get_or_create(
+            key, lambda: llm.with_structured_output(output_model, **kwargs)
+        )
+
+    def get_stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "llms": len(self._llms),
+                "runnables": len(self._runnables),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
@@ -0,0 +1,251 @@
+import asyncio
+import functools
+import logging
+import random
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Iterator, Literal, Optional, Sequence
+
+from langchain_core.runnables import RunnableLambda
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+SpanKind = Literal["request", "node", "tool", "llm", "duckdb", "file_load", "profile"]
+
+
+class Span(BaseModel):
+    """Satu span trace, field mengikuti penamaan OpenTelemetry (id dalam hex)."""
+
+    trace_id: str
+    span_id: str
+    parent_span_id: Optional[str] = None
+    name: str
+    kind: SpanKind
+    start_time_unix_nano: int
+    end_time_unix_nano: int = 0
+    attributes: dict[str, Any] = {}
+    status: Literal["ok", "error"] = "ok"
+    error: Optional[str] = None
+
+    @property
+    def duration_ms(self) -> float:
+        return max(0, self.end_time_unix_nano - self.start_time_unix_nano) / 1e6
+
+    def set(self, **attributes: Any):
+        self.attributes.update(attributes)
+
+
+class SpanExporter:
+    """Tujuan ekspor span. Dipanggil sekali per trace setelah root span selesai."""
+
+    def export(self, spans: Sequence[Span]):
+        raise NotImplementedError
+
+
+# (tracer, span aktif) pada request yang sedang berjalan; ikut ke node, tool, dan thread
+_active: ContextVar[Optional[tuple["Tracer", Span]]] = ContextVar(
+    "nlq_active_span", default=None
+)
+
+
+class Tracer:
+    """
+    Mencatat span per request: node LangGraph, panggilan LLM, query DuckDB, load file,
+    dan profiling schema. Trace terakhir setiap `thread_id` disimpan di memori
+    (maksimal `max_traces`), lalu diekspor ke `exporters`.
+    """
+
+    def __init__(
+        self,
+        exporters: Optional[Sequence[SpanExporter]] = None,
+        max_traces: int = 1000,
+        enabled: bool = True,
+    ):
+        self.exporters = list(exporters or [])
+        self.max_traces = max_traces
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._pending: dict[str, list[Span]] = {}
+        self._traces: OrderedDict[str, list[Span]] = OrderedDict()
+
+    def _new_span(
+        self,
+        name: str,
+        kind: SpanKind,
+        parent: Optional[Span],
+        attributes: dict[str, Any],
+    ) -> Span:
+        return Span(
+            trace_id=parent.trace_id if parent else f"{random.getrandbits(128):032x}",
+            span_id=f"{random.getrandbits(64):016x}",
+            parent_span_id=parent.span_id if parent else None,
+            name=name,
+            kind=kind,
+            start_time_unix_nano=time.time_ns(),
+            attributes=attributes,
+        )
+
+    @contextmanager
+    def _run(
+        self, name: str, kind: SpanKind, parent: Optional[Span], **attributes: Any
+    ) -> Iterator[Span]:
+        span = self._new_span(name, kind, parent, attributes)
+        token = _active.set((self, span))
+        start = time.perf_counter_ns()
+        try:
+            yield span
+        except BaseException as e:
+            span.status = "error"
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.end_time_unix_nano = (
+                span.start_time_unix_nano + time.perf_counter_ns() - start
+            )
+            try:
+                _active.reset(token)
+            except ValueError:
+                # generator async ditutup dari context lain
+                pass
+            self._finish(span)
+
+    @contextmanager
+    def trace(
+        self, name: str, kind: SpanKind = "request", **attributes: Any
+    ) -> Iterator[Optional[Span]]:
+        """Mulai trace baru (root span). Span di dalamnya menjadi child secara otomatis."""
+        if not self.enabled:
+            yield None
+            return
+        with self._run(name, kind, None, **attributes) as span:
+            yield span
+
+    def _finish(self, span: Span):
+        with self._lock:
+            spans = self._pending.setdefault(span.trace_id, [])
+            spans.append(span)
+            if span.parent_span_id is not None:
+                return
+            del self._pending[span.trace_id]
+            key = span.attributes.get("thread_id") or span.trace_id
+            self._traces[key] = spans
+            self._traces.move_to_end(key)
+            while len(self._traces) > self.max_traces:
+                self._traces.popitem(last=False)
+
+        for exporter in self.exporters:
+            try:
+                exporter.export(spans)
+            except Exception:
+                # trace tidak boleh menggagalkan request
+                logger.exception(
+                    "Gagal mengekspor trace ke %s", type(exporter).__name__
+                )
+
+    def get_trace(self, key: str) -> list[Span]:
+        """Span trace terakhir untuk `thread_id` (atau `trace_id`), urut waktu mulai."""
+        with self._lock:
+            spans = list(self._traces.get(key, []))
+        return sorted(spans, key=lambda span: span.start_time_unix_nano)
+
+
+@contextmanager
+def trace_span(
+    name: str, kind: SpanKind, **attributes: Any
+) -> Iterator[Optional[Span]]:
+    """Child span dari span aktif. Tanpa trace aktif (mis. di luar request), tidak mencatat apa pun."""
+    active = _active.get()
+    if active is None:
+        yield None
+        return
+    tracer, parent = active
+    with tracer._run(name, kind, parent, **attributes) as span:
+        yield span
+
+
+def current_span() -> Optional[Span]:
+    active = _active.get()
+    return active[1] if active else None
+
+
+def traced(name: str, func: Callable, kind: SpanKind = "node") -> Callable:
+    """Bungkus fungsi node (sync atau async) agar setiap eksekusinya tercatat sebagai span."""
+    if asyncio.iscoroutinefunction(func):
+
+        @functools.wraps(func)
+        async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+            with trace_span(name, kind):
+                return await func(*args, **kwargs)
+
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        with trace_span(name, kind):
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+def traced_runnable(name: str, func: Callable, afunc: Callable) -> RunnableLambda:
+    """Node graph (sync dan async) yang setiap eksekusinya tercatat sebagai span `node`."""
+    return RunnableLambda(traced(name, func), afunc=traced(name, afunc))
+
+
+def render_trace(spans: Sequence[Span]) -> str:
+    """Tampilkan span sebagai pohon dengan durasi, untuk `show_execute_detail`."""
+    if not spans:
+        return "No trace available."
+
+    children: dict[Optional[str], list[Span]] = {}
+    span_ids = {span.span_id for span in spans}
+    for span in sorted(spans, key=lambda span: span.start_time_unix_nano):
+        parent = span.parent_span_id if span.parent_span_id in span_ids else None
+        children.setdefault(parent, []).append(span)
+
+    icons = {
+        "request": "📨",
+        "node": "🔷",
+        "tool": "🛠️",
+        "llm": "🤖",
+        "duckdb": "🦆",
+        "file_load": "📂",
+        "profile": "📊",
+    }
+    detail_keys = {
+        "tool": ("answer_cache_hit",),
+        "llm": (
+            "gen_ai.request.model",
+            "gen_ai.usage.input_tokens",
+            "gen_ai.usage.output_tokens",
+        ),
+        "duckdb": ("db.rows", "db.result_bytes"),
+        "file_load": ("file.size", "scan_mode"),
+        "profile": ("rows",),
+    }
+
+    lines: list[str] = []
+
+    def render(span: Span, depth: int):
+        details = [
+            f"{key.rsplit('.', 1)[-1]}={span.attributes[key]}"
+            for key in detail_keys.get(span.kind, ())
+            if span.attributes.get(key) is not None
+        ]
+        line = f"{'  ' * depth}{icons[span.kind]} {span.name} {span.duration_ms:.1f} ms"
+        if details:
+            line += f" ({', '.join(details)})"
+        if span.status == "error":
+            # baris pertama saja agar pohon tetap rapi
+            line += f" ❌ {(span.error or '').splitlines()[0]}"
+        lines.append(line)
+        for child in children.get(span.span_id, []):
+            render(child, depth + 1)
+
+    for root in children.get(None, []):
+        render(root, 0)
+    return "\n".join(lines)
@@ -0,0 +1,132 @@
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from pydantic import BaseModel
+
+# harga USD per 1 juta token (input, output); sesuaikan jika harga provider berubah
+MODEL_PRICES: dict[str, tuple[float, float]] = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1": (2.00, 8.00),
+    "claude-3-5-haiku": (0.80, 4.00),
+    "claude-3-5-sonnet": (3.00, 15.00),
+    "claude-sonnet-4": (3.00, 15.00),
+    "gemini-1.5-flash": (0.075, 0.30),
+    "gemini-2.0-flash": (0.10, 0.40),
+    "gemini-2.5-flash": (0.30, 2.50),
+    "fake": (0.0, 0.0),
+}
+
+
+class TokenUsage(BaseModel):
+    calls: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    total_tokens: int = 0
+    # panggilan yang tokennya diestimasi karena provider tidak mengirim usage_metadata
+    estimated_calls: int = 0
+    cost_usd: float = 0.0
+
+    def add(self, other: "TokenUsage"):
+        self.calls += other.calls
+        self.input_tokens += other.input_tokens
+        self.output_tokens += other.output_tokens
+        self.total_tokens += other.total_tokens
+        self.estimated_calls += other.estimated_calls
+        self.cost_usd = round(self.cost_usd + other.cost_usd, 8)
+
+
+class UsageReport(BaseModel):
+    total: TokenUsage
+    by_node: dict[str, TokenUsage] = {}
+    by_model: dict[str, TokenUsage] = {}
+    by_conversation: dict[str, TokenUsage] = {}
+
+
+class UsageTracker:
+    """
+    Mencatat token dan biaya setiap panggilan LLM per percakapan, node, dan model.
+
+    Dipakai bersama oleh seluruh node dalam satu agent (node agent dan node tool),
+    sehingga total satu percakapan mencakup panggilan LLM di dalam tool.
+    Hanya `max_conversations` percakapan terakhir yang disimpan rinciannya.
+    """
+
+    def __init__(
+        self,
+        prices: Optional[dict[str, tuple[float, float]]] = None,
+        max_conversations: int = 10_000,
+    ):
+        self.prices = {**MODEL_PRICES, **(prices or {})}
+        self.max_conversations = max_conversations
+        self._lock = threading.Lock()
+        # thread_id -> (node, model) -> usage
+        self._usage: OrderedDict[str, dict[tuple[str, str], TokenUsage]] = OrderedDict()
+
+    def get_price(self, model: str) -> tuple[float, float]:
+        if model in self.prices:
+            return self.prices[model]
+        # nama model bertanggal, mis. gpt-4o-mini-2024-07-18: pakai prefix terpanjang
+        matches = [name for name in self.prices if model.startswith(name)]
+        if matches:
+            return self.prices[max(matches, key=len)]
+        return (0.0, 0.0)
+
+    def record(
+        self,
+        thread_id: Optional[str],
+        node: Optional[str],
+        model: str,
+        input_tokens: int,
+        output_tokens: int,
+        estimated: bool = False,
+    ) -> TokenUsage:
+        input_price, output_price = self.get_price(model)
+        usage = TokenUsage(
+            calls=1,
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            total_tokens=input_tokens + output_tokens,
+            estimated_calls=1 if estimated else 0,
+            cost_usd=round(
+                (input_tokens * input_price + output_tokens * output_price) / 1e6, 8
+            ),
+        )
+
+        thread_key = thread_id or ""
+        with self._lock:
+            conversation = self._usage.setdefault(thread_key, {})
+            self._usage.move_to_end(thread_key)
+            conversation.setdefault((node or "", model), TokenUsage()).add(usage)
+            while len(self._usage) > self.max_conversations:
+                self._usage.popitem(last=False)
+        return usage
+
+    def get_total_tokens(self, thread_id: Optional[str] = None) -> int:
+        return self.get_report(thread_id).total.total_tokens
+
+    def get_report(self, thread_id: Optional[str] = None) -> UsageReport:
+        """Rincian usage satu percakapan, atau seluruh percakapan jika `thread_id` None."""
+        with self._lock:
+            if thread_id is None:
+                items = [
+                    (key, node_model, usage.model_copy())
+                    for key, conversation in self._usage.items()
+                    for node_model, usage in conversation.items()
+                ]
+            else:
+                items = [
+                    (thread_id, node_model, usage.model_copy())
+                    for node_model, usage in self._usage.get(thread_id, {}).items()
+                ]
+
+        report = UsageReport(total=TokenUsage())
+        for key, (node, model), usage in items:
+            report.total.add(usage)
+            report.by_node.setdefault(node, TokenUsage()).add(usage)
+            report.by_model.setdefault(model, TokenUsage()).add(usage)
+            if thread_id is None:
+                report.by_conversation.setdefault(key, TokenUsage()).add(usage)
+        return report
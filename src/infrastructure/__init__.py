@@ -1,3 +1,39 @@
+from .answer_cache import AnswerCache, AnswerCacheEntry, normalize_text
+from .checkpoint_store import SqliteCheckpointSaver
+from .connection_pool import DuckDbConnectionPool
+from .dataset_catalog import CatalogEntry, DatasetCatalog, ScanMode
+from .dataset_loader import DatasetChanges, DatasetLoader
 from .duckdb_manager import DuckDbManager
+from .excel_cache import ExcelCache
+from .profile_store import ColumnProfile, ProfileStore, TableProfile
+from .query_plan_cache import QueryPlan, QueryPlanCache
+from .query_result import QueryResult, QueryResultShaper, SqlValidationResult
+from .schema_index import SchemaIndex, SchemaMatch
+from .tracing import JsonlSpanExporter, OpenTelemetrySpanExporter
 
-__all__ = ["DuckDbManager"]
+__all__ = [
+    "AnswerCache",
+    "AnswerCacheEntry",
+    "normalize_text",
+    "SqliteCheckpointSaver",
+    "DuckDbManager",
+    "DuckDbConnectionPool",
+    "DatasetCatalog",
+    "CatalogEntry",
+    "DatasetChanges",
+    "DatasetLoader",
+    "ExcelCache",
+    "ScanMode",
+    "ProfileStore",
+    "TableProfile",
+    "ColumnProfile",
+    "QueryPlan",
+    "QueryPlanCache",
+    "QueryResult",
+    "QueryResultShaper",
+    "SchemaIndex",
+    "SchemaMatch",
+    "SqlValidationResult",
+    "JsonlSpanExporter",
+    "OpenTelemetrySpanExporter",
+]
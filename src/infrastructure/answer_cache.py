@@ -0,0 +1,160 @@
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Iterable, Optional, Union
+
+from pydantic import BaseModel
+
+DatasetVersions = dict[str, Optional[tuple[int, int]]]
+VersionProvider = Callable[[Iterable[str]], DatasetVersions]
+EmbeddingFunction = Callable[[str], list[float]]
+
+
+def normalize_text(text: str) -> str:
+    """Normalisasi teks permintaan: huruf kecil, tanpa tanda baca, spasi tunggal."""
+    text = re.sub(r"[^\w\s]", " ", text.lower())
+    return " ".join(text.split())
+
+
+class AnswerCacheEntry(BaseModel):
+    key: str
+    description: str
+    dataset_versions: DatasetVersions
+    queries: list[str] = []
+    result: list[str] = []
+    created_at: float
+    embedding: Optional[list[float]] = None
+
+
+class AnswerCache:
+    """
+    Cache jawaban retrieve dataset berdasarkan deskripsi data yang diminta.
+
+    Key cache adalah deskripsi yang sudah dinormalisasi; setiap entry menyimpan
+    versi file (mtime, size) dari table yang dipakai query-nya, sehingga entry
+    otomatis tidak berlaku saat file dataset berubah. Jika `embedding` diberikan
+    (callable atau object LangChain `Embeddings`), deskripsi yang mirip secara
+    semantik juga dianggap hit selama melewati `similarity_threshold`.
+    """
+
+    def __init__(
+        self,
+        version_provider: VersionProvider,
+        max_entries: int = 256,
+        ttl_seconds: Optional[float] = 900,
+        embedding: Optional[Union[EmbeddingFunction, Any]] = None,
+        similarity_threshold: float = 0.92,
+    ):
+        self.version_provider = version_provider
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self._embed = self._resolve_embedding(embedding)
+        self._entries: OrderedDict[str, AnswerCacheEntry] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _resolve_embedding(self, embedding) -> Optional[EmbeddingFunction]:
+        if embedding is None:
+            return None
+        if hasattr(embedding, "embed_query"):
+            return embedding.embed_query
+        return embedding
+
+    @staticmethod
+    def _cosine_similarity(a: list[float], b: list[float]) -> float:
+        dot = sum(x * y for x, y in zip(a, b))
+        norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+        return dot / norm if norm else 0.0
+
+    def _is_valid(self, entry: AnswerCacheEntry, now: float) -> bool:
+        if self.ttl_seconds is not None and now - entry.created_at > self.ttl_seconds:
+            return False
+        current = self.version_provider(entry.dataset_versions.keys())
+        return current == entry.dataset_versions
+
+    def get(self, description: str) -> Optional[AnswerCacheEntry]:
+        if self.max_entries <= 0:
+            return None
+
+        key = normalize_text(description)
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if self._is_valid(entry, now):
+                    self._entries.move_to_end(key)
+                    return entry
+                self._entries.pop(key, None)
+
+            if self._embed is None or not self._entries:
+                return None
+
+            candidates = list(self._entries.values())
+
+        # Embedding dihitung di luar lock karena bisa memanggil model/API
+        query_embedding = self._embed(key)
+        best_entry, best_score = None, self.similarity_threshold
+        for candidate in candidates:
+            if candidate.embedding is None:
+                continue
+            score = self._cosine_similarity(query_embedding, candidate.embedding)
+            if score >= best_score:
+                best_entry, best_score = candidate, score
+
+        if best_entry is None:
+            return None
+
+        with self._lock:
+            if best_entry.key not in self._entries:
+                return None
+            if not self._is_valid(best_entry, now):
+                self._entries.pop(best_entry.key, None)
+                return None
+            self._entries.move_to_end(best_entry.key)
+            return best_entry
+
+    def put(
+        self,
+        description: str,
+        table_names: Iterable[str],
+        queries: list[str],
+        result: list[str],
+    ) -> Optional[AnswerCacheEntry]:
+        if self.max_entries <= 0:
+            return None
+
+        key = normalize_text(description)
+        entry = AnswerCacheEntry(
+            key=key,
+            description=description,
+            dataset_versions=self.version_provider(table_names),
+            queries=queries,
+            result=result,
+            created_at=time.time(),
+            embedding=self._embed(key) if self._embed is not None else None,
+        )
+
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, table_name: Optional[str] = None):
+        with self._lock:
+            if table_name is None:
+                self._entries.clear()
+                return
+            for key in [
+                key
+                for key, entry in self._entries.items()
+                if table_name in entry.dataset_versions
+            ]:
+                self._entries.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,557 @@
+import asyncio
+import hashlib
+import os
+import random
+import sqlite3
+import threading
+import time
+from typing import Any, AsyncIterator, Iterator, Optional, Sequence
+
+from langchain_core.messages import ToolMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+
+from .dataset_catalog import CATALOG_DIRECTORY
+
+# penanda di additional_kwargs: isi ToolMessage disimpan di table payloads
+CONTENT_REF_KEY = "_nlq_content_ref"
+
+
+class SqliteCheckpointSaver(BaseCheckpointSaver[str]):
+    """
+    Checkpointer LangGraph di file SQLite, pengganti `MemorySaver`.
+
+    - History percakapan tidak disimpan di RAM dan tetap ada setelah restart.
+    - Isi ToolMessage yang besar (hasil query) disimpan sekali per konten di table
+      `payloads`; checkpoint hanya menyimpan referensi hash-nya.
+    - Hanya `max_checkpoints_per_thread` checkpoint terakhir per thread yang disimpan.
+    - Thread yang tidak dipakai lebih dari `ttl_seconds` dihapus (`evict_expired`),
+      otomatis dicek paling sering setiap `eviction_interval` detik saat `put`.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        ttl_seconds: Optional[float] = 7 * 24 * 3600,
+        max_checkpoints_per_thread: int = 20,
+        inline_limit: int = 1024,
+        eviction_interval: float = 60.0,
+    ):
+        super().__init__()
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_checkpoints_per_thread = max(1, max_checkpoints_per_thread)
+        self.inline_limit = inline_limit
+        self.eviction_interval = eviction_interval
+        self._last_eviction = 0.0
+        self._lock = threading.RLock()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._connection = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None
+        )
+        # hanya berlaku untuk file baru; halaman kosong dikembalikan setelah eviction
+        self._connection.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.executescript("""
+            CREATE TABLE IF NOT EXISTS threads (
+                thread_id TEXT PRIMARY KEY,
+                last_used_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS checkpoints (
+                thread_id TEXT NOT NULL,
+                checkpoint_ns TEXT NOT NULL,
+                checkpoint_id TEXT NOT NULL,
+                parent_checkpoint_id TEXT,
+                type TEXT NOT NULL,
+                checkpoint BLOB NOT NULL,
+                metadata_type TEXT NOT NULL,
+                metadata BLOB NOT NULL,
+                PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+            );
+            CREATE TABLE IF NOT EXISTS blobs (
+                thread_id TEXT NOT NULL,
+                checkpoint_ns TEXT NOT NULL,
+                channel TEXT NOT NULL,
+                version TEXT NOT NULL,
+                type TEXT NOT NULL,
+                blob BLOB,
+                PRIMARY KEY (thread_id, checkpoint_ns, channel, version)
+            );
+            CREATE TABLE IF NOT EXISTS writes (
+                thread_id TEXT NOT NULL,
+                checkpoint_ns TEXT NOT NULL,
+                checkpoint_id TEXT NOT NULL,
+                task_id TEXT NOT NULL,
+                idx INTEGER NOT NULL,
+                channel TEXT NOT NULL,
+                type TEXT NOT NULL,
+                value BLOB,
+                task_path TEXT NOT NULL DEFAULT '',
+                PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+            );
+            CREATE TABLE IF NOT EXISTS payloads (
+                hash TEXT PRIMARY KEY,
+                content TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS payload_refs (
+                thread_id TEXT NOT NULL,
+                hash TEXT NOT NULL,
+                PRIMARY KEY (thread_id, hash)
+            );
+            """)
+
+    @classmethod
+    def for_directory(
+        cls, directory_path: str, **kwargs: Any
+    ) -> "SqliteCheckpointSaver":
+        """Checkpointer di folder catalog dataset (`<directory>/.catalog/checkpoints.sqlite`)."""
+        return cls(
+            os.path.join(directory_path, CATALOG_DIRECTORY, "checkpoints.sqlite"),
+            **kwargs,
+        )
+
+    def _externalize(self, thread_id: str, value: Any) -> Any:
+        if isinstance(value, list):
+            return [self._externalize(thread_id, item) for item in value]
+        if (
+            not isinstance(value, ToolMessage)
+            or not isinstance(value.content, str)
+            or len(value.content) <= self.inline_limit
+        ):
+            return value
+
+        content_hash = hashlib.sha256(value.content.encode()).hexdigest()
+        self._connection.execute(
+            "INSERT OR IGNORE INTO payloads (hash, content) VALUES (?, ?)",
+            (content_hash, value.content),
+        )
+        self._connection.execute(
+            "INSERT OR IGNORE INTO payload_refs (thread_id, hash) VALUES (?, ?)",
+            (thread_id, content_hash),
+        )
+        return value.model_copy(
+            update={
+                "content": "",
+                "additional_kwargs": {
+                    **value.additional_kwargs,
+                    CONTENT_REF_KEY: content_hash,
+                },
+            }
+        )
+
+    def _internalize(self, value: Any) -> Any:
+        if isinstance(value, list):
+            return [self._internalize(item) for item in value]
+        if (
+            not isinstance(value, ToolMessage)
+            or CONTENT_REF_KEY not in value.additional_kwargs
+        ):
+            return value
+
+        additional_kwargs = dict(value.additional_kwargs)
+        content_hash = additional_kwargs.pop(CONTENT_REF_KEY)
+        row = self._connection.execute(
+            "SELECT content FROM payloads WHERE hash = ?", (content_hash,)
+        ).fetchone()
+        return value.model_copy(
+            update={
+                "content": row[0] if row else "",
+                "additional_kwargs": additional_kwargs,
+            }
+        )
+
+    def _dumps(self, thread_id: str, value: Any) -> tuple[str, bytes]:
+        return self.serde.dumps_typed(self._externalize(thread_id, value))
+
+    def _loads(self, type_: str, data: Optional[bytes]) -> Any:
+        return self._internalize(self.serde.loads_typed((type_, data or b"")))
+
+    def _load_tuple(
+        self,
+        thread_id: str,
+        checkpoint_ns: str,
+        row: tuple,
+    ) -> CheckpointTuple:
+        checkpoint_id, parent_id, type_, data, metadata_type, metadata = row
+        checkpoint: Checkpoint = self.serde.loads_typed((type_, data))
+
+        channel_values = {}
+        for channel, version in checkpoint["channel_versions"].items():
+            blob = self._connection.execute(
+                "SELECT type, blob FROM blobs WHERE thread_id = ? AND checkpoint_ns = ? AND channel = ? AND version = ?",
+                (thread_id, checkpoint_ns, channel, str(version)),
+            ).fetchone()
+            if blob is None or blob[0] == "empty":
+                continue
+            channel_values[channel] = self._loads(blob[0], blob[1])
+
+        writes = self._connection.execute(
+            """
+            SELECT task_id, channel, type, value FROM writes
+            WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?
+            ORDER BY task_path, task_id, idx
+            """,
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchall()
+
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            checkpoint={**checkpoint, "channel_values": channel_values},
+            metadata=self.serde.loads_typed((metadata_type, metadata)),
+            pending_writes=[
+                (task_id, channel, self._loads(value_type, value))
+                for task_id, channel, value_type, value in writes
+            ],
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": parent_id,
+                    }
+                }
+                if parent_id
+                else None
+            ),
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        columns = "checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata"
+        with self._lock:
+            if checkpoint_id := get_checkpoint_id(config):
+                row = self._connection.execute(
+                    f"SELECT {columns} FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                    (thread_id, checkpoint_ns, checkpoint_id),
+                ).fetchone()
+            else:
+                row = self._connection.execute(
+                    f"SELECT {columns} FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? ORDER BY checkpoint_id DESC LIMIT 1",
+                    (thread_id, checkpoint_ns),
+                ).fetchone()
+            if row is None:
+                return None
+            return self._load_tuple(thread_id, checkpoint_ns, row)
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        query = "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata FROM checkpoints"
+        conditions: list[str] = []
+        params: list[Any] = []
+        if config:
+            conditions.append("thread_id = ?")
+            params.append(config["configurable"]["thread_id"])
+            if config["configurable"].get("checkpoint_ns") is not None:
+                conditions.append("checkpoint_ns = ?")
+                params.append(config["configurable"]["checkpoint_ns"])
+            if checkpoint_id := get_checkpoint_id(config):
+                conditions.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        if before and (before_id := get_checkpoint_id(before)):
+            conditions.append("checkpoint_id < ?")
+            params.append(before_id)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY checkpoint_id DESC"
+
+        with self._lock:
+            rows = self._connection.execute(query, params).fetchall()
+
+        for thread_id, checkpoint_ns, *row in rows:
+            if limit is not None and limit <= 0:
+                break
+            with self._lock:
+                checkpoint_tuple = self._load_tuple(
+                    thread_id, checkpoint_ns, tuple(row)
+                )
+            if filter and not all(
+                checkpoint_tuple.metadata.get(key) == value
+                for key, value in filter.items()
+            ):
+                continue
+            if limit is not None:
+                limit -= 1
+            yield checkpoint_tuple
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        values = dict(checkpoint["channel_values"])
+        stored = {
+            key: value for key, value in checkpoint.items() if key != "channel_values"
+        }
+        stored["channel_values"] = {}
+
+        with self._lock:
+            self._connection.execute("BEGIN")
+            try:
+                for channel, version in new_versions.items():
+                    if channel in values:
+                        type_, blob = self._dumps(thread_id, values[channel])
+                    else:
+                        type_, blob = "empty", None
+                    self._connection.execute(
+                        "INSERT OR REPLACE INTO blobs VALUES (?, ?, ?, ?, ?, ?)",
+                        (thread_id, checkpoint_ns, channel, str(version), type_, blob),
+                    )
+
+                type_, data = self.serde.dumps_typed(stored)
+                metadata_type, metadata_data = self.serde.dumps_typed(
+                    get_checkpoint_metadata(config, metadata)
+                )
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        thread_id,
+                        checkpoint_ns,
+                        checkpoint["id"],
+                        config["configurable"].get("checkpoint_id"),
+                        type_,
+                        data,
+                        metadata_type,
+                        metadata_data,
+                    ),
+                )
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO threads VALUES (?, ?)",
+                    (thread_id, time.time()),
+                )
+                self._prune_thread(thread_id, checkpoint_ns)
+                self._connection.execute("COMMIT")
+            except Exception as e:
+                self._connection.execute("ROLLBACK")
+                raise e
+
+        self._maybe_evict()
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+
+        with self._lock:
+            self._connection.execute("BEGIN")
+            try:
+                for index, (channel, value) in enumerate(writes):
+                    idx = WRITES_IDX_MAP.get(channel, index)
+                    # write khusus (error, interrupt, dll) selalu ditimpa, write biasa tidak
+                    verb = "INSERT OR REPLACE" if idx < 0 else "INSERT OR IGNORE"
+                    type_, data = self._dumps(thread_id, value)
+                    self._connection.execute(
+                        f"{verb} INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (
+                            thread_id,
+                            checkpoint_ns,
+                            checkpoint_id,
+                            task_id,
+                            idx,
+                            channel,
+                            type_,
+                            data,
+                            task_path,
+                        ),
+                    )
+                self._connection.execute("COMMIT")
+            except Exception as e:
+                self._connection.execute("ROLLBACK")
+                raise e
+
+    def _prune_thread(self, thread_id: str, checkpoint_ns: str):
+        stale = self._connection.execute(
+            """
+            SELECT checkpoint_id FROM checkpoints
+            WHERE thread_id = ? AND checkpoint_ns = ?
+            ORDER BY checkpoint_id DESC LIMIT -1 OFFSET ?
+            """,
+            (thread_id, checkpoint_ns, self.max_checkpoints_per_thread),
+        ).fetchall()
+        if not stale:
+            return
+
+        for (checkpoint_id,) in stale:
+            for table in ("checkpoints", "writes"):
+                self._connection.execute(
+                    f"DELETE FROM {table} WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                    (thread_id, checkpoint_ns, checkpoint_id),
+                )
+
+        # hapus blob yang tidak lagi dipakai checkpoint tersisa
+        used: set[tuple[str, str]] = set()
+        for type_, data in self._connection.execute(
+            "SELECT type, checkpoint FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?",
+            (thread_id, checkpoint_ns),
+        ).fetchall():
+            versions = self.serde.loads_typed((type_, data))["channel_versions"]
+            used.update(
+                (channel, str(version)) for channel, version in versions.items()
+            )
+        for channel, version in self._connection.execute(
+            "SELECT channel, version FROM blobs WHERE thread_id = ? AND checkpoint_ns = ?",
+            (thread_id, checkpoint_ns),
+        ).fetchall():
+            if (channel, version) not in used:
+                self._connection.execute(
+                    "DELETE FROM blobs WHERE thread_id = ? AND checkpoint_ns = ? AND channel = ? AND version = ?",
+                    (thread_id, checkpoint_ns, channel, version),
+                )
+
+    def _delete_threads(self, thread_ids: Sequence[str]):
+        for thread_id in thread_ids:
+            for table in ("checkpoints", "blobs", "writes", "payload_refs", "threads"):
+                self._connection.execute(
+                    f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,)
+                )
+        self._connection.execute(
+            "DELETE FROM payloads WHERE hash NOT IN (SELECT hash FROM payload_refs)"
+        )
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            self._connection.execute("BEGIN")
+            try:
+                self._delete_threads([thread_id])
+                self._connection.execute("COMMIT")
+            except Exception as e:
+                self._connection.execute("ROLLBACK")
+                raise e
+
+    def evict_expired(self) -> int:
+        """Hapus thread yang tidak dipakai lebih dari `ttl_seconds`; kembalikan jumlahnya."""
+        if self.ttl_seconds is None:
+            return 0
+
+        with self._lock:
+            self._last_eviction = time.time()
+            expired = [
+                row[0]
+                for row in self._connection.execute(
+                    "SELECT thread_id FROM threads WHERE last_used_at < ?",
+                    (time.time() - self.ttl_seconds,),
+                ).fetchall()
+            ]
+            if not expired:
+                return 0
+            self._connection.execute("BEGIN")
+            try:
+                self._delete_threads(expired)
+                self._connection.execute("COMMIT")
+            except Exception as e:
+                self._connection.execute("ROLLBACK")
+                raise e
+            self._connection.execute("PRAGMA incremental_vacuum")
+        return len(expired)
+
+    def _maybe_evict(self):
+        if time.time() - self._last_eviction >= self.eviction_interval:
+            self.evict_expired()
+
+    def get_stats(self) -> dict[str, int]:
+        with self._lock:
+            counts = {
+                table: self._connection.execute(
+                    f"SELECT COUNT(*) FROM {table}"
+                ).fetchone()[0]
+                for table in ("threads", "checkpoints", "blobs", "writes", "payloads")
+            }
+        counts["file_bytes"] = (
+            os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        )
+        return counts
+
+    def get_next_version(self, current: Optional[str], channel: None = None) -> str:
+        # format sama dengan MemorySaver: versi monoton yang bisa dibandingkan sebagai string
+        if current is None:
+            current_version = 0
+        elif isinstance(current, int):
+            current_version = current
+        else:
+            current_version = int(current.split(".")[0])
+        return f"{current_version + 1:032}.{random.random():016}"
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        items = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for item in items:
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await asyncio.to_thread(
+            self.put, config, checkpoint, metadata, new_versions
+        )
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
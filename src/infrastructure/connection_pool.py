@@ -0,0 +1,75 @@
+import queue
+import threading
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+import duckdb
+
+
+class DuckDbConnectionPool:
+    """
+    Pool cursor DuckDB di atas satu database bersama.
+
+    Setiap cursor adalah koneksi terpisah ke database yang sama sehingga aman
+    dipakai dari thread berbeda, dan buffer cache DuckDB tetap hangat antar query.
+    """
+
+    def __init__(
+        self,
+        connection: duckdb.DuckDBPyConnection,
+        max_cursors: int = 8,
+        timeout: Optional[float] = 30.0,
+    ):
+        if max_cursors < 1:
+            raise ValueError("max_cursors must be at least 1")
+
+        self._connection = connection
+        self.max_cursors = max_cursors
+        self.timeout = timeout
+        self._idle: queue.LifoQueue[duckdb.DuckDBPyConnection] = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _get_cursor(self) -> duckdb.DuckDBPyConnection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Connection pool is closed")
+            if self._created < self.max_cursors:
+                self._created += 1
+                return self._connection.cursor()
+
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TimeoutError(
+                f"Timed out waiting for a DuckDB cursor (max_cursors={self.max_cursors})"
+            )
+
+    def _release_cursor(self, cursor: duckdb.DuckDBPyConnection):
+        if self._closed:
+            cursor.close()
+            return
+        self._idle.put(cursor)
+
+    @contextmanager
+    def acquire(self) -> Iterator[duckdb.DuckDBPyConnection]:
+        cursor = self._get_cursor()
+        try:
+            yield cursor
+        finally:
+            self._release_cursor(cursor)
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
@@ -0,0 +1,388 @@
+import os
+import threading
+from typing import Any, Iterable, Literal, Optional
+
+import duckdb
+from pydantic import BaseModel
+
+from src.base import trace_span
+
+from .connection_pool import DuckDbConnectionPool
+from .excel_cache import EXCEL_EXTENSIONS, SHEET_SEPARATOR, ExcelCache
+
+SUPPORTED_EXTENSIONS = (".csv", ".parquet", ".arrow", ".feather", ".xls", ".xlsx")
+# Format yang bisa dibaca langsung oleh reader native DuckDB
+NATIVE_SCAN_EXTENSIONS = (".csv", ".parquet")
+ARROW_IPC_EXTENSIONS = (".arrow", ".feather")
+CATALOG_DIRECTORY = ".catalog"
+CATALOG_META_TABLE = "_nlq_catalog"
+
+ScanMode = Literal["materialize", "direct"]
+
+
+def quote_identifier(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def quote_literal(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def read_arrow(source_path: str) -> Any:
+    """Baca file Arrow IPC, format yang belum didukung reader native DuckDB."""
+    try:
+        import pyarrow as pa
+        import pyarrow.ipc as ipc
+    except ImportError:
+        raise ValueError(
+            "Error while getting dataframe: pyarrow is required to read Arrow IPC datasets"
+        )
+    # memory-mapped, sehingga data tidak di-copy ke memory Python
+    with pa.memory_map(source_path, "r") as source:
+        return ipc.open_file(source).read_all()
+
+
+def discover_sources(
+    directory_path: str, excel_cache: Optional[ExcelCache] = None
+) -> dict[str, str]:
+    """
+    Seluruh dataset yang didukung di directory: nama table -> path file. Workbook Excel
+    dengan lebih dari satu sheet muncul sebagai satu table per sheet (`workbook__sheet`).
+    """
+    excel_cache = excel_cache or ExcelCache(
+        os.path.join(directory_path, CATALOG_DIRECTORY, "excel")
+    )
+    sources: dict[str, str] = {}
+    seen_names: set[str] = set()
+    for file_name in sorted(os.listdir(directory_path)):
+        table_name, extension = os.path.splitext(file_name)
+        if (
+            table_name.startswith(".")
+            or extension not in SUPPORTED_EXTENSIONS
+            or table_name in seen_names
+        ):
+            continue
+        seen_names.add(table_name)
+        # urutan prioritas ekstensi sama dengan resolve_source
+        candidates = (
+            os.path.join(directory_path, f"{table_name}{candidate}")
+            for candidate in SUPPORTED_EXTENSIONS
+        )
+        source_path = next((path for path in candidates if os.path.exists(path)), None)
+        if source_path is None:
+            # file terhapus di antara listdir dan pengecekan
+            continue
+
+        sheets: dict[str, str] = {}
+        if source_path.endswith(EXCEL_EXTENSIONS):
+            try:
+                sheets = excel_cache.get_sheet_tables(source_path)
+            except Exception:
+                # workbook rusak: tetap didaftarkan agar error-nya terlihat saat load
+                sheets = {}
+        if len(sheets) > 1:
+            sources.update({sheet_table: source_path for sheet_table in sheets})
+        else:
+            sources[table_name] = source_path
+    return sources
+
+
+class CatalogEntry(BaseModel):
+    table_name: str
+    source_path: str
+    mtime_ns: int
+    size: int
+    scan_mode: ScanMode = "materialize"
+
+    def is_fresh(
+        self, source_path: str, mtime_ns: int, size: int, scan_mode: ScanMode
+    ) -> bool:
+        return (
+            self.source_path == source_path
+            and self.mtime_ns == mtime_ns
+            and self.size == size
+            and self.scan_mode == scan_mode
+        )
+
+
+class DatasetCatalog:
+    """
+    Menyimpan setiap dataset sebagai table native DuckDB di satu file catalog.
+
+    Dataset hanya di-ingest ulang jika path, mtime, atau ukuran file sumber berubah,
+    sehingga file dataset tidak perlu di-parse ulang di setiap pemanggilan.
+
+    Dengan `scan_mode="direct"`, file CSV/Parquet tidak di-copy ke catalog melainkan
+    didaftarkan sebagai view `read_csv_auto`/`read_parquet`, sehingga DuckDB membaca
+    langsung dari disk dengan projection dan filter pushdown.
+    """
+
+    def __init__(
+        self,
+        directory_path: str,
+        catalog_path: Optional[str] = None,
+        max_cursors: int = 8,
+        scan_mode: ScanMode = "materialize",
+        excel_workers: Optional[int] = None,
+    ):
+        self.directory_path = directory_path
+        self.catalog_path = catalog_path or os.path.join(
+            directory_path, CATALOG_DIRECTORY, "catalog.duckdb"
+        )
+        self.scan_mode: ScanMode = scan_mode
+        os.makedirs(os.path.dirname(self.catalog_path), exist_ok=True)
+        # hasil parse sheet Excel disimpan sebagai Parquet di samping folder dataset
+        self.excel_cache = ExcelCache(
+            os.path.join(directory_path, CATALOG_DIRECTORY, "excel"), excel_workers
+        )
+
+        self._connection = duckdb.connect(database=self.catalog_path)
+        self.pool = DuckDbConnectionPool(self._connection, max_cursors)
+        self._lock = threading.RLock()
+        # lock per table agar ingest table yang berbeda bisa berjalan paralel
+        self._table_locks: dict[str, threading.Lock] = {}
+        self._entries: dict[str, CatalogEntry] = {}
+        # table yang sudah dipastikan ada di database pada proses ini
+        self._verified: set[str] = set()
+        self._load_entries()
+
+    def _load_entries(self):
+        self._connection.execute(f"""
+            CREATE TABLE IF NOT EXISTS {CATALOG_META_TABLE} (
+                table_name VARCHAR PRIMARY KEY,
+                source_path VARCHAR,
+                mtime_ns BIGINT,
+                size BIGINT,
+                ingested_at TIMESTAMP DEFAULT current_timestamp
+            )
+            """)
+        self._connection.execute(
+            f"ALTER TABLE {CATALOG_META_TABLE} ADD COLUMN IF NOT EXISTS scan_mode VARCHAR DEFAULT 'materialize'"
+        )
+        rows = self._connection.execute(
+            f"SELECT table_name, source_path, mtime_ns, size, scan_mode FROM {CATALOG_META_TABLE}"
+        ).fetchall()
+        for table_name, source_path, mtime_ns, size, scan_mode in rows:
+            self._entries[table_name] = CatalogEntry(
+                table_name=table_name,
+                source_path=source_path,
+                mtime_ns=mtime_ns,
+                size=size,
+                scan_mode=scan_mode or "materialize",
+            )
+
+    def resolve_source(self, table_name: str) -> str:
+        for extension in SUPPORTED_EXTENSIONS:
+            path = os.path.join(self.directory_path, f"{table_name}{extension}")
+            if os.path.exists(path):
+                return path
+        workbook_path = self._resolve_workbook(table_name)
+        if workbook_path is not None:
+            return workbook_path
+        raise ValueError(
+            "Error while getting dataframe: Dataset file not found. Please enter the correct table name or directory folder path"
+        )
+
+    def _resolve_workbook(self, table_name: str) -> Optional[str]:
+        """Workbook Excel untuk table sheet `workbook__sheet`."""
+        parts = table_name.split(SHEET_SEPARATOR)
+        # nama workbook sendiri boleh mengandung pemisah
+        for index in range(1, len(parts)):
+            workbook_name = SHEET_SEPARATOR.join(parts[:index])
+            for extension in EXCEL_EXTENSIONS:
+                path = os.path.join(self.directory_path, f"{workbook_name}{extension}")
+                if not os.path.exists(path):
+                    continue
+                try:
+                    sheets = self.excel_cache.get_sheet_tables(path)
+                except Exception:
+                    # workbook tidak bisa dibuka, anggap table tidak ditemukan
+                    continue
+                if table_name in sheets:
+                    return path
+        return None
+
+    def _resolve_scan_mode(self, source_path: str) -> ScanMode:
+        # Arrow IPC dan Excel selalu di-materialize karena tidak punya reader native
+        if source_path.endswith(NATIVE_SCAN_EXTENSIONS):
+            return self.scan_mode
+        return "materialize"
+
+    def _native_scan_sql(self, source_path: str) -> str:
+        path = quote_literal(os.path.abspath(source_path))
+        if source_path.endswith(".parquet"):
+            return f"SELECT * FROM read_parquet({path})"
+        return f"SELECT * FROM read_csv_auto({path})"
+
+    def _excel_scan_sql(self, table_name: str, source_path: str) -> str:
+        cache_path = self.excel_cache.get_parquet(source_path, table_name)
+        return (
+            f"SELECT * FROM read_parquet({quote_literal(os.path.abspath(cache_path))})"
+        )
+
+    def _query_table_type(
+        self, cursor: duckdb.DuckDBPyConnection, table_name: str
+    ) -> Optional[str]:
+        result = cursor.execute(
+            "SELECT table_type FROM information_schema.tables WHERE table_schema = 'main' AND table_name = ?",
+            [table_name],
+        ).fetchone()
+        return result[0] if result else None
+
+    def _table_type(self, table_name: str) -> Optional[str]:
+        with self.pool.acquire() as cursor:
+            return self._query_table_type(cursor, table_name)
+
+    def _drop_existing(self, cursor: duckdb.DuckDBPyConnection, table_name: str):
+        table_type = self._query_table_type(cursor, table_name)
+        if table_type == "VIEW":
+            cursor.execute(f"DROP VIEW {quote_identifier(table_name)}")
+        elif table_type is not None:
+            cursor.execute(f"DROP TABLE {quote_identifier(table_name)}")
+
+    def _ingest(
+        self, table_name: str, source_path: str, mtime_ns: int, size: int
+    ) -> CatalogEntry:
+        target = quote_identifier(table_name)
+        scan_mode = self._resolve_scan_mode(source_path)
+        is_native = source_path.endswith(NATIVE_SCAN_EXTENSIONS)
+        is_excel = source_path.endswith(EXCEL_EXTENSIONS)
+        # Excel dibaca dari cache Parquet per sheet (di-parse hanya jika belum ter-cache)
+        scan_sql = self._excel_scan_sql(table_name, source_path) if is_excel else None
+        source = None if is_native or is_excel else read_arrow(source_path)
+
+        with self.pool.acquire() as cursor:
+            self._drop_existing(cursor, table_name)
+
+            if is_native and scan_mode == "direct":
+                cursor.execute(
+                    f"CREATE VIEW {target} AS {self._native_scan_sql(source_path)}"
+                )
+            elif is_native:
+                cursor.execute(
+                    f"CREATE TABLE {target} AS {self._native_scan_sql(source_path)}"
+                )
+            elif scan_sql is not None:
+                cursor.execute(f"CREATE TABLE {target} AS {scan_sql}")
+            else:
+                cursor.register("__nlq_ingest", source)
+                try:
+                    cursor.execute(
+                        f"CREATE TABLE {target} AS SELECT * FROM __nlq_ingest"
+                    )
+                finally:
+                    cursor.unregister("__nlq_ingest")
+
+            cursor.execute(
+                f"""
+                INSERT OR REPLACE INTO {CATALOG_META_TABLE}
+                    (table_name, source_path, mtime_ns, size, ingested_at, scan_mode)
+                VALUES (?, ?, ?, ?, current_timestamp, ?)
+                """,
+                [table_name, source_path, mtime_ns, size, scan_mode],
+            )
+
+        entry = CatalogEntry(
+            table_name=table_name,
+            source_path=source_path,
+            mtime_ns=mtime_ns,
+            size=size,
+            scan_mode=scan_mode,
+        )
+        self._entries[table_name] = entry
+        self._verified.add(table_name)
+        return entry
+
+    def _table_lock(self, table_name: str) -> threading.Lock:
+        with self._lock:
+            return self._table_locks.setdefault(table_name, threading.Lock())
+
+    def _fresh_entry(
+        self, table_name: str, source_path: str, stat: os.stat_result
+    ) -> Optional[CatalogEntry]:
+        entry = self._entries.get(table_name)
+        scan_mode = self._resolve_scan_mode(source_path)
+        if entry is None or not entry.is_fresh(
+            source_path, stat.st_mtime_ns, stat.st_size, scan_mode
+        ):
+            return None
+        if table_name in self._verified or self._table_type(table_name):
+            self._verified.add(table_name)
+            return entry
+        return None
+
+    def needs_ingest(self, table_name: str) -> bool:
+        """True jika table belum ada di catalog atau file sumbernya sudah berubah."""
+        source_path = self.resolve_source(table_name)
+        return self._fresh_entry(table_name, source_path, os.stat(source_path)) is None
+
+    def prepare_excel(self, table_names: Iterable[str]):
+        """
+        Parse paralel (process pool) seluruh sheet Excel yang belum ter-cache untuk
+        table-table ini, sehingga ingest berikutnya cukup membaca Parquet.
+        """
+        workbooks = set()
+        for table_name in table_names:
+            try:
+                source_path = self.resolve_source(table_name)
+                if source_path.endswith(EXCEL_EXTENSIONS) and self.needs_ingest(
+                    table_name
+                ):
+                    workbooks.add(source_path)
+            except ValueError:
+                continue
+        if workbooks:
+            self.excel_cache.convert(workbooks)
+
+    def ensure_table(self, table_name: str) -> CatalogEntry:
+        """Pastikan table tersedia dan sesuai dengan versi file sumber terbaru."""
+        source_path = self.resolve_source(table_name)
+        stat = os.stat(source_path)
+        scan_mode = self._resolve_scan_mode(source_path)
+
+        with self._table_lock(table_name):
+            entry = self._fresh_entry(table_name, source_path, stat)
+            if entry is not None:
+                return entry
+
+            with trace_span(
+                "dataset.load",
+                "file_load",
+                table_name=table_name,
+                scan_mode=scan_mode,
+                **{"file.path": source_path, "file.size": stat.st_size},
+            ):
+                return self._ingest(
+                    table_name, source_path, stat.st_mtime_ns, stat.st_size
+                )
+
+    def get_source_version(self, table_name: str) -> Optional[tuple[int, int]]:
+        """Versi file sumber (mtime, size) tanpa melakukan ingest."""
+        try:
+            stat = os.stat(self.resolve_source(table_name))
+        except (ValueError, OSError):
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def get_entry(self, table_name: str) -> Optional[CatalogEntry]:
+        return self._entries.get(table_name)
+
+    def discover_sources(self) -> dict[str, str]:
+        """Seluruh dataset yang didukung di directory: nama table -> path file."""
+        return discover_sources(self.directory_path, self.excel_cache)
+
+    def remove_table(self, table_name: str):
+        """Hapus table dan metadata-nya, mis. karena file sumber dihapus."""
+        with self._table_lock(table_name):
+            with self.pool.acquire() as cursor:
+                self._drop_existing(cursor, table_name)
+                cursor.execute(
+                    f"DELETE FROM {CATALOG_META_TABLE} WHERE table_name = ?",
+                    [table_name],
+                )
+            self._entries.pop(table_name, None)
+            self._verified.discard(table_name)
+
+    def close(self):
+        self.pool.close()
+        self._connection.close()
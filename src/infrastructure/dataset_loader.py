@@ -0,0 +1,181 @@
+import contextvars
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Optional
+
+from pydantic import BaseModel
+
+from .duckdb_manager import DuckDbManager
+
+logger = logging.getLogger(__name__)
+
+
+class DatasetChanges(BaseModel):
+    added: list[str] = []
+    changed: list[str] = []
+    removed: list[str] = []
+
+    def is_empty(self) -> bool:
+        return not (self.added or self.changed or self.removed)
+
+
+class DatasetLoader:
+    """
+    Warm-up catalog di background dan watcher directory dataset.
+
+    - `warm_up` meng-ingest dan memprofil dataset secara paralel di thread pool. Sheet
+      Excel yang belum ter-cache lebih dulu di-parse di process pool (lihat `ExcelCache`).
+    - `start` menjalankan warm-up di thread background, lalu jika `poll_interval` diisi,
+      memantau directory dataset secara polling. File yang ditambah, diubah, atau dihapus
+      diterapkan ke catalog dan profil tanpa restart, lalu `on_change` dipanggil.
+    """
+
+    def __init__(
+        self,
+        duckdb_manager: DuckDbManager,
+        max_workers: Optional[int] = None,
+        poll_interval: Optional[float] = None,
+        on_change: Optional[Callable[[DatasetChanges], None]] = None,
+    ):
+        self.duckdb_manager = duckdb_manager
+        self.catalog = duckdb_manager.catalog
+        self.max_workers = max_workers or min(8, os.cpu_count() or 1)
+        self.poll_interval = poll_interval
+        self.on_change = on_change
+
+        self._lock = threading.Lock()
+        # versi file (path, mtime, size) per table pada polling terakhir
+        self._snapshot: dict[str, tuple[str, int, int]] = {}
+        self._ready = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _scan(self) -> dict[str, tuple[str, int, int]]:
+        snapshot = {}
+        for table_name, source_path in self.catalog.discover_sources().items():
+            try:
+                stat = os.stat(source_path)
+            except OSError:
+                # file terhapus di antara listdir dan stat
+                continue
+            snapshot[table_name] = (source_path, stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def _load(self, table_name: str) -> bool:
+        try:
+            self.catalog.ensure_table(table_name)
+            self.duckdb_manager.profile_store.get_profile(table_name)
+        except Exception:
+            # dataset rusak tidak boleh menghentikan warm-up dataset lain
+            logger.exception("Gagal memuat dataset %s", table_name)
+            return False
+        return True
+
+    def warm_up(self, table_names: Optional[Iterable[str]] = None) -> list[str]:
+        """
+        Ingest dan profil dataset secara paralel. Dataset yang gagal di-load dilewati;
+        kembalikan table yang berhasil.
+        """
+        names = list(table_names or self.duckdb_manager.get_registered_datasets())
+        try:
+            # seluruh sheet Excel yang belum ter-cache di-parse sekaligus di process pool
+            self.catalog.prepare_excel(names)
+        except Exception:
+            # sheet yang gagal di-parse akan dicoba lagi (dan dilaporkan) saat load
+            logger.exception("Gagal mem-parse workbook Excel")
+
+        with ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="dataset-loader"
+        ) as threads:
+            # context disalin agar span load/profil menempel ke trace pemanggil
+            context = contextvars.copy_context()
+            loaded = list(
+                threads.map(lambda name: context.copy().run(self._load, name), names)
+            )
+        return [name for name, ok in zip(names, loaded) if ok]
+
+    def refresh(self) -> DatasetChanges:
+        """Bandingkan directory dengan polling sebelumnya dan terapkan perubahannya."""
+        with self._lock:
+            current = self._scan()
+            previous = self._snapshot
+            registered = set(self.duckdb_manager.get_registered_datasets())
+
+            changes = DatasetChanges(
+                added=sorted(
+                    name
+                    for name in current
+                    if name not in previous and name not in registered
+                ),
+                changed=sorted(
+                    name
+                    for name in current
+                    if name in previous
+                    and name in registered
+                    and current[name] != previous[name]
+                ),
+                removed=sorted(
+                    name
+                    for name in previous
+                    if name not in current and name in registered
+                ),
+            )
+            for table_name in changes.removed:
+                self.duckdb_manager.remove_dataset(table_name)
+            if changes.added:
+                self.duckdb_manager.register_datasets(changes.added)
+            if changes.added or changes.changed:
+                self.warm_up(changes.added + changes.changed)
+            self._snapshot = current
+
+        if not changes.is_empty() and self.on_change is not None:
+            self.on_change(changes)
+        return changes
+
+    def _run(self, warm_up: bool):
+        try:
+            # snapshot diambil sebelum warm-up agar file yang berubah selama warm-up
+            # tetap terdeteksi pada polling berikutnya
+            with self._lock:
+                self._snapshot = self._scan()
+            if warm_up:
+                self.warm_up()
+        except Exception:
+            logger.exception("Warm-up dataset gagal")
+        finally:
+            self._ready.set()
+
+        if self.poll_interval is None:
+            return
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception("Gagal memperbarui dataset dari directory")
+
+    def start(self, warm_up: bool = True) -> "DatasetLoader":
+        """Jalankan warm-up dan (jika `poll_interval` diisi) watcher di thread background."""
+        if self._thread is not None:
+            return self
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(warm_up,), name="dataset-loader", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        """Tunggu warm-up background selesai; False jika timeout."""
+        return self._ready.wait(timeout)
+
+    @property
+    def is_ready(self) -> bool:
+        return self._ready.is_set()
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
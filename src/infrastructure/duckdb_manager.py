@@ -1,96 +1,301 @@
-import os
+import json
+import threading
+from contextlib import contextmanager
+from typing import Iterable, Iterator, Optional
 
 import duckdb
 import pandas as pd
 from duckdb import CatalogException
 
+from src.base import trace_span
+
+from .dataset_catalog import DatasetCatalog, ScanMode, quote_identifier
+from .profile_store import ProfileStore
+from .query_result import QueryResult, QueryResultShaper, SqlValidationResult
+
+# table function yang membuka isi catalog (termasuk table metadata `_nlq_*`) ke SQL user
+BLOCKED_TABLE_FUNCTIONS = ("query", "query_table")
+BLOCKED_TABLE_FUNCTION_PREFIXES = ("duckdb_", "pragma_")
+
 
 class DuckDbManager:
-    def __init__(self, directory_path: str):
+    def __init__(
+        self,
+        directory_path: str,
+        max_connections: int = 8,
+        scan_mode: ScanMode = "materialize",
+        max_result_rows: int = 50,
+        max_result_chars: int = 8000,
+        summary_max_rows: Optional[int] = 1_000_000,
+    ):
         self.directory_path = directory_path
+        self.catalog = DatasetCatalog(
+            directory_path, max_cursors=max_connections, scan_mode=scan_mode
+        )
+        self.profile_store = ProfileStore(self.catalog)
+        self.result_shaper = QueryResultShaper(
+            max_result_rows, max_result_chars, summary_max_rows=summary_max_rows
+        )
 
-    def _get_dataframe(self, table_name: str) -> pd.DataFrame:
-        if os.path.exists(f"{self.directory_path}/{table_name}.csv"):
-            df = pd.read_csv(f"{self.directory_path}/{table_name}.csv")
-        elif os.path.exists(f"{self.directory_path}/{table_name}.xls"):
-            df = pd.read_excel(f"{self.directory_path}/{table_name}.xls")
-        elif os.path.exists(f"{self.directory_path}/{table_name}.xlsx"):
-            df = pd.read_excel(f"{self.directory_path}/{table_name}.xlsx")
-        else:
-            raise ValueError(
-                "Error while getting dataframe: Dataset file not found. Please enter the correct table name or directory folder path"
-            )
-        return df
+        self._registered_tables: list[str] = []
+        self._lock = threading.Lock()
 
-    def get_data(self, query: str, table_name: str):
-        try:
-            df = self._get_dataframe(table_name)
+    def register_datasets(self, table_names: Iterable[str]):
+        """
+        Daftarkan dataset yang tersedia ke database bersama.
+        Table di-ingest saat pertama kali dibutuhkan, lalu dipakai ulang oleh seluruh query.
+        """
+        with self._lock:
+            for table_name in table_names:
+                if table_name not in self._registered_tables:
+                    self._registered_tables.append(table_name)
+
+    def unregister_datasets(self, table_names: Iterable[str]):
+        with self._lock:
+            removed = set(table_names)
+            self._registered_tables = [
+                name for name in self._registered_tables if name not in removed
+            ]
+
+    def remove_dataset(self, table_name: str):
+        """Keluarkan dataset dari daftar terdaftar lalu hapus table dan profilnya."""
+        self.unregister_datasets([table_name])
+        self.catalog.remove_table(table_name)
+        self.profile_store.remove(table_name)
+
+    def get_registered_datasets(self) -> list[str]:
+        return list(self._registered_tables)
+
+    def _collect_base_tables(
+        self, node, referenced: set[str], cte_names: Optional[set[str]] = None
+    ):
+        if isinstance(node, dict):
+            if node.get("type") == "BASE_TABLE" and node.get("table_name"):
+                referenced.add(node["table_name"])
+            if cte_names is not None and isinstance(node.get("cte_map"), dict):
+                for cte in node["cte_map"].get("map", []):
+                    if cte.get("key"):
+                        cte_names.add(cte["key"])
+            for value in node.values():
+                self._collect_base_tables(value, referenced, cte_names)
+        elif isinstance(node, list):
+            for value in node:
+                self._collect_base_tables(value, referenced, cte_names)
+
+    def _collect_table_functions(self, node, function_names: set[str]):
+        if isinstance(node, dict):
+            if node.get("type") == "TABLE_FUNCTION":
+                function = node.get("function") or {}
+                if function.get("function_name"):
+                    function_names.add(function["function_name"].lower())
+            for value in node.values():
+                self._collect_table_functions(value, function_names)
+        elif isinstance(node, list):
+            for value in node:
+                self._collect_table_functions(value, function_names)
 
-            db_path = os.path.join(self.directory_path, f"{table_name}.db")
+    def _check_select(self, parsed: dict, table_names: Iterable[str]) -> list[str]:
+        """
+        Pastikan query adalah tepat satu statement SELECT yang hanya membaca table
+        dataset (`table_names`). Table metadata catalog dan table function yang membuka
+        isi catalog ditolak. Kembalikan daftar error, kosong jika aman dijalankan.
+        """
+        if parsed.get("error"):
+            if parsed.get("error_type") == "not implemented":
+                # json_serialize_sql hanya bisa men-serialize statement SELECT
+                return ["Parser Error: hanya statement SELECT yang boleh dijalankan"]
+            message = parsed.get("error_message", "query tidak dapat di-parse")
+            return [f"Parser Error: {message}"]
+        if len(parsed.get("statements", [])) != 1:
+            return ["Parser Error: hanya boleh ada satu statement SELECT per query"]
 
-            # Create directory if it doesn't exist
-            if not os.path.exists(db_path):
-                os.makedirs(os.path.dirname(db_path), exist_ok=True)
-                print("Database created")
-            else:
-                print("Database already exists")
+        referenced: set[str] = set()
+        cte_names: set[str] = set()
+        self._collect_base_tables(parsed, referenced, cte_names)
+        # nama table di DuckDB tidak case-sensitive
+        allowed_keys = {name.lower() for name in table_names} | {
+            name.lower() for name in cte_names
+        }
+        unknown = sorted(
+            name for name in referenced if name.lower() not in allowed_keys
+        )
+        if unknown:
+            return [
+                f"Catalog Error: table {', '.join(unknown)} tidak tersedia. Table yang tersedia: {', '.join(self.get_registered_datasets())}"
+            ]
 
-            # Always connect and register the table with dynamic name
-            connection = duckdb.connect(database=db_path)
-            connection.register(table_name, df)
+        function_names: set[str] = set()
+        self._collect_table_functions(parsed, function_names)
+        blocked = sorted(
+            name
+            for name in function_names
+            if name in BLOCKED_TABLE_FUNCTIONS
+            or name.startswith(BLOCKED_TABLE_FUNCTION_PREFIXES)
+        )
+        if blocked:
+            return [
+                f"Catalog Error: table function {', '.join(blocked)} tidak diizinkan"
+            ]
+        return []
 
+    @contextmanager
+    def _read_only_cursor(self) -> Iterator[duckdb.DuckDBPyConnection]:
+        """
+        Cursor untuk SQL dari LLM. DuckDB tidak bisa membuka file catalog yang sama
+        sebagai koneksi read-only di proses ini, jadi query dijalankan di dalam transaksi
+        `READ ONLY`: penulisan ke table dataset maupun metadata catalog ditolak DuckDB.
+        """
+        with self.catalog.pool.acquire() as cursor:
+            cursor.execute("BEGIN TRANSACTION READ ONLY")
             try:
-                result = connection.execute(query).df()
-            except CatalogException as e:
-                raise e
+                yield cursor
             finally:
-                connection.close()
+                cursor.execute("ROLLBACK")
 
-            return result.to_string()
-        except CatalogException as e:
-            raise e
-        except ValueError as e:
-            raise e
-        except Exception as e:
-            raise e
+    def _parse_query(self, query: str) -> dict:
+        with self.catalog.pool.acquire() as cursor:
+            serialized = cursor.execute(
+                "SELECT json_serialize_sql(?)", [query]
+            ).fetchone()
+        return json.loads(serialized[0]) if serialized else {"error": True}
 
-    def get_dataset_info(self, table_name: str) -> str:
-        try:
-            df = self._get_dataframe(table_name)
+    def get_tables_in_query(self, query: str) -> list[str]:
+        """Deteksi table dataset yang direferensikan oleh query SQL (hanya parsing, tanpa binding)."""
+        return self._resolve_tables(self._parse_query(query))
 
-            # Basic information
-            num_rows = len(df)
-            num_cols = len(df.columns)
+    def _resolve_tables(self, parsed: dict) -> list[str]:
+        if parsed.get("error"):
+            # Query tidak bisa di-parse dan akan ditolak, tidak ada table yang perlu disiapkan
+            return []
 
-            # Column information
-            columns_info = []
-            for col in df.columns:
-                dtype = str(df[col].dtype)
-                non_null_count = df[col].count()
-                null_count = num_rows - non_null_count
+        referenced: set[str] = set()
+        self._collect_base_tables(parsed, referenced)
 
-                # Get sample values for better understanding
-                sample_values = df[col].dropna().head(3).tolist()
-                sample_str = ", ".join([str(val) for val in sample_values])
+        # nama table di DuckDB tidak case-sensitive, petakan ke nama yang terdaftar
+        registered_by_key = {
+            name.lower(): name for name in self.get_registered_datasets()
+        }
+        table_names: set[str] = set()
+        for name in referenced:
+            registered_name = registered_by_key.get(name.lower())
+            if registered_name is not None:
+                table_names.add(registered_name)
+                continue
+            try:
+                self.catalog.resolve_source(name)
+            except ValueError:
+                # CTE, alias, atau table yang tidak ada di folder dataset
+                continue
+            table_names.add(name)
+        return sorted(table_names)
 
-                columns_info.append(
-                    f"- **{col}** ({dtype}): {non_null_count} non-null values, {null_count} null values. Sample values: {sample_str}"
-                )
+    def get_dataset_versions(
+        self, table_names: Iterable[str]
+    ) -> dict[str, Optional[tuple[int, int]]]:
+        return {name: self.catalog.get_source_version(name) for name in table_names}
+
+    def _ensure_tables(
+        self, table_names: list[str], table_name: Optional[str] = None
+    ) -> list[str]:
+        table_names = list(table_names)
+        if table_name and table_name.lower() not in {
+            name.lower() for name in table_names
+        }:
+            table_names.append(table_name)
 
-            # Create comprehensive description
-            description = f"""Table name: **{table_name}**
-        Total rows: **{num_rows}**
-        Total columns: **{num_cols}**
+        for name in table_names:
+            self.catalog.ensure_table(name)
+        return table_names
 
-        **Column Details:**
-        {chr(10).join(columns_info)}
+    def validate_query(self, query: str) -> SqlValidationResult:
+        """
+        Validasi query secara lokal tanpa menjalankannya: parsing, pengecekan nama table
+        terhadap dataset terdaftar, lalu binding nama kolom dengan `EXPLAIN`.
+        """
+        parsed = self._parse_query(query)
+        registered = self.get_registered_datasets()
+        errors = self._check_select(parsed, registered)
+        if errors:
+            return SqlValidationResult(query=query, errors=errors)
 
-        **Data Summary:**
-        - Memory usage: {df.memory_usage(deep=True).sum() / 1024:.2f} KB
-        - Duplicate rows: {df.duplicated().sum()}"""
+        referenced: set[str] = set()
+        cte_names: set[str] = set()
+        self._collect_base_tables(parsed, referenced, cte_names)
+        registered_by_key = {name.lower(): name for name in registered}
+        cte_keys = {name.lower() for name in cte_names}
+        table_keys = {name.lower() for name in referenced} - cte_keys
 
-            return description
+        try:
+            for key in sorted(table_keys):
+                self.catalog.ensure_table(registered_by_key[key])
+            with trace_span(
+                "duckdb.explain",
+                "duckdb",
+                **{"db.system": "duckdb", "db.statement": query},
+            ):
+                with self._read_only_cursor() as cursor:
+                    cursor.execute(f"EXPLAIN {query}")
+        except duckdb.Error as e:
+            return SqlValidationResult(query=query, errors=[str(e)])
+        except ValueError as e:
+            return SqlValidationResult(query=query, errors=[str(e)])
+        return SqlValidationResult(query=query)
+
+    def _get_dataframe(self, table_name: str) -> pd.DataFrame:
+        self.catalog.ensure_table(table_name)
+
+        with self.catalog.pool.acquire() as cursor:
+            df = cursor.execute(f"SELECT * FROM {quote_identifier(table_name)}").df()
+        return df
+
+    def execute_query(
+        self, query: str, table_name: Optional[str] = None
+    ) -> QueryResult:
+        """
+        Jalankan query ke database bersama dan kembalikan hasil yang sudah dibatasi.
+        Query boleh mereferensikan (JOIN) beberapa table sekaligus; table yang dipakai
+        dideteksi dari SQL, sedangkan `table_name` hanya sebagai petunjuk tambahan.
+        Hanya satu statement SELECT atas table dataset yang dijalankan, di dalam
+        transaksi read-only.
+        """
+        with trace_span(
+            "duckdb.query", "duckdb", **{"db.system": "duckdb", "db.statement": query}
+        ) as span:
+            parsed = self._parse_query(query)
+            table_names = self._resolve_tables(parsed)
+            errors = self._check_select(parsed, table_names)
+            if errors:
+                raise ValueError(errors[0])
+            self._ensure_tables(table_names, table_name)
+
+            with self._read_only_cursor() as cursor:
+                result = self.result_shaper.shape(cursor, query)
+            if span is not None:
+                span.set(
+                    **{
+                        "db.rows": result.total_rows,
+                        "db.result_bytes": len(result.render().encode()),
+                    }
+                )
+            return result
+
+    def get_data(self, query: str, table_name: Optional[str] = None):
+        try:
+            return self.execute_query(query, table_name).render()
+        except CatalogException as e:
+            raise e
+        except ValueError as e:
+            raise e
+        except Exception as e:
+            raise e
+
+    def get_dataset_info(self, table_name: str) -> str:
+        try:
+            return self.profile_store.get_description(table_name)
         except ValueError as e:
             raise e
         except Exception as e:
             raise e
+
+    def close(self):
+        self.catalog.close()
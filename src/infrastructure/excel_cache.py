@@ -0,0 +1,157 @@
+import logging
+import multiprocessing
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterable, Optional
+
+import pandas as pd
+
+from src.workers import convert_sheet, excel_engine
+
+logger = logging.getLogger(__name__)
+
+EXCEL_EXTENSIONS = (".xls", ".xlsx")
+# pemisah nama workbook dan sheet pada nama table, mis. `sales__januari`
+SHEET_SEPARATOR = "__"
+
+
+def list_sheets(source_path: str) -> list[str]:
+    with pd.ExcelFile(source_path, engine=excel_engine()) as workbook:
+        return [str(sheet) for sheet in workbook.sheet_names]
+
+
+def sheet_tables(workbook_name: str, sheets: Iterable[str]) -> dict[str, str]:
+    """Nama table `workbook__sheet` untuk setiap sheet (nama sheet dijadikan identifier)."""
+    tables: dict[str, str] = {}
+    for index, sheet in enumerate(sheets):
+        key = re.sub(r"\W+", "_", sheet).strip("_") or f"sheet{index + 1}"
+        table_name = f"{workbook_name}{SHEET_SEPARATOR}{key}"
+        if table_name in tables:
+            # dua sheet dengan nama yang sama setelah dinormalisasi
+            table_name = f"{table_name}_{index + 1}"
+        tables[table_name] = sheet
+    return tables
+
+
+class ExcelCache:
+    """
+    Cache Parquet per sheet untuk dataset Excel.
+
+    Setiap sheet di-parse sekali per versi workbook (mtime, size), hasilnya disimpan di
+    `<dataset>/.catalog/excel/<table>/<mtime>-<size>.parquet`, lalu dibaca DuckDB dengan
+    `read_parquet`. Sheet yang belum ter-cache di-parse paralel di process pool `spawn`
+    dengan entry point ringan `src.workers.convert_sheet`. Script pemanggil tetap perlu
+    guard `if __name__ == "__main__"`; jika process pool gagal, sheet di-parse di thread
+    pemanggil.
+    """
+
+    def __init__(self, cache_directory: str, max_workers: Optional[int] = None):
+        self.cache_directory = cache_directory
+        self.max_workers = max_workers or min(8, os.cpu_count() or 1)
+        self._lock = threading.Lock()
+        # satu konversi dalam satu waktu agar sheet yang sama tidak di-parse dua kali
+        self._convert_lock = threading.Lock()
+        self._sheets: dict[str, tuple[int, int, dict[str, str]]] = {}
+
+    def _version(self, source_path: str) -> tuple[int, int]:
+        stat = os.stat(source_path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def get_sheet_tables(self, source_path: str) -> dict[str, str]:
+        """Nama table -> nama sheet, di-cache per versi workbook."""
+        mtime_ns, size = self._version(source_path)
+        with self._lock:
+            cached = self._sheets.get(source_path)
+            if cached is not None and cached[:2] == (mtime_ns, size):
+                return cached[2]
+
+        workbook_name = os.path.splitext(os.path.basename(source_path))[0]
+        tables = sheet_tables(workbook_name, list_sheets(source_path))
+        with self._lock:
+            self._sheets[source_path] = (mtime_ns, size, tables)
+        return tables
+
+    def _sheet_table(self, source_path: str, table_name: str) -> str:
+        """Table sheet untuk `table_name`; nama workbook saja berarti sheet pertama."""
+        tables = self.get_sheet_tables(source_path)
+        if table_name in tables:
+            return table_name
+        workbook_name = os.path.splitext(os.path.basename(source_path))[0]
+        if table_name == workbook_name and tables:
+            return next(iter(tables))
+        raise ValueError(
+            f"Error while getting dataframe: sheet untuk table {table_name} tidak ditemukan di {os.path.basename(source_path)}"
+        )
+
+    def _target_path(self, source_path: str, sheet_table: str) -> str:
+        mtime_ns, size = self._version(source_path)
+        # satu folder per sheet; nama file berisi versi workbook
+        return os.path.join(
+            self.cache_directory, sheet_table, f"{mtime_ns}-{size}.parquet"
+        )
+
+    def _cleanup(self, target_path: str):
+        # hapus cache versi lama workbook yang sama
+        directory = os.path.dirname(target_path)
+        for file_name in os.listdir(directory):
+            path = os.path.join(directory, file_name)
+            if path != target_path and not file_name.endswith(".tmp"):
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+
+    def _stale(self, source_paths: Iterable[str]) -> list[tuple[str, str, str]]:
+        stale = []
+        for source_path in source_paths:
+            for sheet_table, sheet in self.get_sheet_tables(source_path).items():
+                target_path = self._target_path(source_path, sheet_table)
+                if not os.path.exists(target_path):
+                    stale.append((source_path, sheet, target_path))
+        return stale
+
+    def _convert_all(self, pending: list[tuple[str, str, str]]):
+        for _, _, target_path in pending:
+            os.makedirs(os.path.dirname(target_path), exist_ok=True)
+
+        if len(pending) <= 1 or self.max_workers <= 1:
+            for source_path, sheet, target_path in pending:
+                convert_sheet(source_path, sheet, target_path)
+        else:
+            try:
+                with ProcessPoolExecutor(
+                    max_workers=min(self.max_workers, len(pending)),
+                    # fork tidak aman dipakai bersama thread DuckDB
+                    mp_context=multiprocessing.get_context("spawn"),
+                ) as processes:
+                    futures = [
+                        processes.submit(convert_sheet, *item) for item in pending
+                    ]
+                    for future in futures:
+                        future.result()
+            except BrokenProcessPool:
+                # mis. entry point tanpa guard `if __name__ == "__main__"`
+                logger.warning("Process pool gagal, sheet Excel di-parse di thread ini")
+                for source_path, sheet, target_path in pending:
+                    if not os.path.exists(target_path):
+                        convert_sheet(source_path, sheet, target_path)
+
+        for _, _, target_path in pending:
+            self._cleanup(target_path)
+
+    def convert(self, source_paths: Iterable[str]):
+        """Parse paralel seluruh sheet yang belum ter-cache dari beberapa workbook sekaligus."""
+        with self._convert_lock:
+            self._convert_all(self._stale(set(source_paths)))
+
+    def get_parquet(self, source_path: str, table_name: str) -> str:
+        """Path Parquet untuk table sheet; workbook di-parse (paralel per sheet) jika perlu."""
+        target_path = self._target_path(
+            source_path, self._sheet_table(source_path, table_name)
+        )
+        if not os.path.exists(target_path):
+            self.convert([source_path])
+        return target_path
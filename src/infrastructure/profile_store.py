@@ -0,0 +1,200 @@
+import threading
+from typing import Optional
+
+from pydantic import BaseModel
+
+from src.base import trace_span
+
+from .dataset_catalog import CatalogEntry, DatasetCatalog, quote_identifier
+
+PROFILE_TABLE = "_nlq_profiles"
+
+
+class ColumnProfile(BaseModel):
+    name: str
+    dtype: str
+    non_null_count: int
+    null_count: int
+    sample_values: list[str] = []
+
+
+class TableProfile(BaseModel):
+    table_name: str
+    mtime_ns: int
+    size: int
+    num_rows: int
+    duplicate_rows: int
+    columns: list[ColumnProfile]
+
+    def is_fresh(self, entry: CatalogEntry) -> bool:
+        return self.mtime_ns == entry.mtime_ns and self.size == entry.size
+
+    def render(self, column_names: Optional[list[str]] = None) -> str:
+        """
+        Render profil table sebagai teks prompt.
+        Jika `column_names` diberikan, hanya kolom tersebut yang ditampilkan detailnya;
+        kolom lain cukup disebut namanya.
+        """
+        selected = set(column_names) if column_names is not None else None
+        columns_info = []
+        other_columns = []
+        for col in self.columns:
+            if selected is not None and col.name not in selected:
+                other_columns.append(col.name)
+                continue
+            sample_str = ", ".join(col.sample_values)
+            columns_info.append(
+                f"- **{col.name}** ({col.dtype}): {col.non_null_count} non-null values, {col.null_count} null values. Sample values: {sample_str}"
+            )
+        if other_columns:
+            columns_info.append(f"- Kolom lain: {', '.join(other_columns)}")
+
+        return f"""Table name: **{self.table_name}**
+        Total rows: **{self.num_rows}**
+        Total columns: **{len(self.columns)}**
+
+        **Column Details:**
+        {chr(10).join(columns_info)}
+
+        **Data Summary:**
+        - Source file size: {self.size / 1024:.2f} KB
+        - Duplicate rows: {self.duplicate_rows}"""
+
+
+class ProfileStore:
+    """
+    Menyimpan profil statistik tiap table per versi file sumber.
+
+    Profil dihitung sekali dengan SQL DuckDB, disimpan di file catalog, dan teks
+    deskripsinya di-cache di memory untuk dipakai ulang oleh prompt builder.
+    """
+
+    def __init__(self, catalog: DatasetCatalog, sample_size: int = 3):
+        self.catalog = catalog
+        self.sample_size = sample_size
+        self._lock = threading.RLock()
+        # lock per table agar profil table yang berbeda bisa dihitung paralel
+        self._table_locks: dict[str, threading.Lock] = {}
+        self._profiles: dict[str, TableProfile] = {}
+        self._descriptions: dict[str, str] = {}
+
+        with self.catalog.pool.acquire() as cursor:
+            cursor.execute(f"""
+                CREATE TABLE IF NOT EXISTS {PROFILE_TABLE} (
+                    table_name VARCHAR PRIMARY KEY,
+                    mtime_ns BIGINT,
+                    size BIGINT,
+                    profile VARCHAR
+                )
+                """)
+
+    def _load_persisted(self, entry: CatalogEntry) -> Optional[TableProfile]:
+        with self.catalog.pool.acquire() as cursor:
+            row = cursor.execute(
+                f"SELECT profile FROM {PROFILE_TABLE} WHERE table_name = ? AND mtime_ns = ? AND size = ?",
+                [entry.table_name, entry.mtime_ns, entry.size],
+            ).fetchone()
+
+        if row is None:
+            return None
+        return TableProfile.model_validate_json(row[0])
+
+    def _persist(self, profile: TableProfile):
+        with self.catalog.pool.acquire() as cursor:
+            cursor.execute(
+                f"INSERT OR REPLACE INTO {PROFILE_TABLE} (table_name, mtime_ns, size, profile) VALUES (?, ?, ?, ?)",
+                [
+                    profile.table_name,
+                    profile.mtime_ns,
+                    profile.size,
+                    profile.model_dump_json(),
+                ],
+            )
+
+    def _compute(self, entry: CatalogEntry) -> TableProfile:
+        table = quote_identifier(entry.table_name)
+        with self.catalog.pool.acquire() as cursor:
+            described = cursor.execute(f"DESCRIBE {table}").fetchall()
+            column_names = [row[0] for row in described]
+            column_types = [row[1] for row in described]
+
+            # Satu kali scan untuk jumlah baris dan non-null tiap kolom
+            count_exprs = ["COUNT(*)"] + [
+                f"COUNT({quote_identifier(name)})" for name in column_names
+            ]
+            counts = cursor.execute(
+                f"SELECT {', '.join(count_exprs)} FROM {table}"
+            ).fetchone()
+            num_rows = counts[0] if counts else 0
+
+            distinct_rows = cursor.execute(
+                f"SELECT COUNT(*) FROM (SELECT DISTINCT * FROM {table})"
+            ).fetchone()
+
+            columns = []
+            for idx, (name, dtype) in enumerate(zip(column_names, column_types)):
+                column = quote_identifier(name)
+                samples = cursor.execute(
+                    f"SELECT {column} FROM {table} WHERE {column} IS NOT NULL LIMIT {self.sample_size}"
+                ).fetchall()
+                non_null_count = counts[idx + 1] if counts else 0
+                columns.append(
+                    ColumnProfile(
+                        name=name,
+                        dtype=dtype,
+                        non_null_count=non_null_count,
+                        null_count=num_rows - non_null_count,
+                        sample_values=[str(sample[0]) for sample in samples],
+                    )
+                )
+
+        return TableProfile(
+            table_name=entry.table_name,
+            mtime_ns=entry.mtime_ns,
+            size=entry.size,
+            num_rows=num_rows,
+            duplicate_rows=num_rows - (distinct_rows[0] if distinct_rows else 0),
+            columns=columns,
+        )
+
+    def get_profile(self, table_name: str) -> TableProfile:
+        entry = self.catalog.ensure_table(table_name)
+
+        with self._lock:
+            table_lock = self._table_locks.setdefault(table_name, threading.Lock())
+
+        with table_lock:
+            profile = self._profiles.get(table_name)
+            if profile is not None and profile.is_fresh(entry):
+                return profile
+
+            profile = self._load_persisted(entry)
+            if profile is None:
+                with trace_span(
+                    "dataset.profile", "profile", table_name=table_name
+                ) as span:
+                    profile = self._compute(entry)
+                    if span is not None:
+                        span.set(rows=profile.num_rows, columns=len(profile.columns))
+                self._persist(profile)
+
+            self._profiles[table_name] = profile
+            self._descriptions[table_name] = profile.render()
+            return profile
+
+    def get_description(self, table_name: str) -> str:
+        profile = self.get_profile(table_name)
+        return self._descriptions[profile.table_name]
+
+    def invalidate(self, table_name: str):
+        with self._lock:
+            self._profiles.pop(table_name, None)
+            self._descriptions.pop(table_name, None)
+
+    def remove(self, table_name: str):
+        """Hapus profil dari memory dan file catalog, mis. karena file sumber dihapus."""
+        self.invalidate(table_name)
+        with self.catalog.pool.acquire() as cursor:
+            cursor.execute(
+                f"DELETE FROM {PROFILE_TABLE} WHERE table_name = ?", [table_name]
+            )
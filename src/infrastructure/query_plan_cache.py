@@ -0,0 +1,204 @@
+import json
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Optional
+
+import duckdb
+from pydantic import BaseModel
+
+from .answer_cache import normalize_text
+from .dataset_catalog import DatasetCatalog
+
+logger = logging.getLogger(__name__)
+
+QUERY_PLAN_TABLE = "_nlq_query_plans"
+
+
+class QueryPlan(BaseModel):
+    intent_key: str
+    intent: str
+    queries: list[dict[str, Optional[str]]]
+    tables_description: str = ""
+    hit_count: int = 0
+
+
+class QueryPlanCache:
+    """
+    Menyimpan pasangan (intent -> SQL yang sudah tervalidasi) secara persisten di file catalog.
+
+    Saat hit, SQL yang tersimpan langsung dijalankan ulang ke data terbaru sehingga
+    tahap analisis table, analisis kebutuhan query, dan generate query dapat dilewati.
+
+    `hit_count` dan `last_used_at` dikumpulkan di memori lalu ditulis per batch
+    (`flush_every` hit atau `flush_interval` detik), karena UPDATE baris yang sama dari
+    banyak request sekaligus memicu write conflict di DuckDB. Error DuckDB saat
+    lookup/store tidak menggagalkan request: lookup dianggap miss dan store dilewati.
+    """
+
+    def __init__(
+        self,
+        catalog: DatasetCatalog,
+        flush_every: int = 32,
+        flush_interval: float = 30.0,
+    ):
+        self.catalog = catalog
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        # hanya satu flush dalam satu waktu; request lain tidak menunggu flush
+        self._flush_lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        # intent_key -> (jumlah hit, waktu pemakaian terakhir) yang belum ditulis
+        self._pending: dict[str, tuple[int, datetime]] = {}
+        self._pending_hits = 0
+        self._last_flush = time.monotonic()
+
+        with self.catalog.pool.acquire() as cursor:
+            cursor.execute(f"""
+                CREATE TABLE IF NOT EXISTS {QUERY_PLAN_TABLE} (
+                    intent_key VARCHAR PRIMARY KEY,
+                    intent VARCHAR,
+                    queries VARCHAR,
+                    tables_description VARCHAR,
+                    hit_count BIGINT DEFAULT 0,
+                    created_at TIMESTAMP DEFAULT current_timestamp,
+                    last_used_at TIMESTAMP DEFAULT current_timestamp
+                )
+                """)
+
+    def lookup(self, intent: str) -> Optional[QueryPlan]:
+        intent_key = normalize_text(intent)
+        try:
+            with self.catalog.pool.acquire() as cursor:
+                row = cursor.execute(
+                    f"SELECT intent, queries, tables_description, hit_count FROM {QUERY_PLAN_TABLE} WHERE intent_key = ?",
+                    [intent_key],
+                ).fetchone()
+        except duckdb.Error as e:
+            logger.warning("Lookup query plan gagal, dianggap miss: %s", e)
+            row = None
+
+        if row is None:
+            with self._lock:
+                self._misses += 1
+            return None
+
+        with self._lock:
+            self._hits += 1
+            pending_hits, _ = self._pending.get(intent_key, (0, datetime.now()))
+            self._pending[intent_key] = (pending_hits + 1, datetime.now())
+            self._pending_hits += 1
+            should_flush = (
+                self._pending_hits >= self.flush_every
+                or time.monotonic() - self._last_flush >= self.flush_interval
+            )
+        if should_flush:
+            self.flush(blocking=False)
+
+        stored_intent, queries, tables_description, hit_count = row
+        return QueryPlan(
+            intent_key=intent_key,
+            intent=stored_intent,
+            queries=json.loads(queries),
+            tables_description=tables_description or "",
+            hit_count=hit_count + pending_hits + 1,
+        )
+
+    def flush(self, blocking: bool = True):
+        """Tulis `hit_count`/`last_used_at` yang masih di memori ke file catalog."""
+        if not self._flush_lock.acquire(blocking=blocking):
+            return
+        try:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                self._pending_hits = 0
+                self._last_flush = time.monotonic()
+            if not pending:
+                return
+            try:
+                with self.catalog.pool.acquire() as cursor:
+                    cursor.executemany(
+                        f"UPDATE {QUERY_PLAN_TABLE} SET hit_count = hit_count + ?, last_used_at = greatest(last_used_at, ?) WHERE intent_key = ?",
+                        [
+                            [hits, last_used_at, intent_key]
+                            for intent_key, (hits, last_used_at) in pending.items()
+                        ],
+                    )
+            except duckdb.Error as e:
+                logger.warning("Flush statistik query plan gagal: %s", e)
+                # kembalikan ke memori agar ikut ditulis pada flush berikutnya
+                with self._lock:
+                    for intent_key, (hits, last_used_at) in pending.items():
+                        current_hits, current_used_at = self._pending.get(
+                            intent_key, (0, last_used_at)
+                        )
+                        self._pending[intent_key] = (
+                            current_hits + hits,
+                            max(current_used_at, last_used_at),
+                        )
+                        self._pending_hits += hits
+        finally:
+            self._flush_lock.release()
+
+    def _discard_pending(self, intent_key: str):
+        with self._lock:
+            hits, _ = self._pending.pop(intent_key, (0, None))
+            self._pending_hits -= hits
+
+    def store(
+        self,
+        intent: str,
+        queries: list[dict[str, Optional[str]]],
+        tables_description: str = "",
+    ):
+        intent_key = normalize_text(intent)
+        # plan baru menggantikan statistik plan lama
+        self._discard_pending(intent_key)
+        try:
+            with self.catalog.pool.acquire() as cursor:
+                cursor.execute(
+                    f"""
+                    INSERT OR REPLACE INTO {QUERY_PLAN_TABLE}
+                        (intent_key, intent, queries, tables_description, hit_count, created_at, last_used_at)
+                    VALUES (?, ?, ?, ?, 0, current_timestamp, current_timestamp)
+                    """,
+                    [
+                        intent_key,
+                        intent,
+                        json.dumps(queries),
+                        tables_description,
+                    ],
+                )
+        except duckdb.Error as e:
+            # mis. request lain menyimpan plan untuk intent yang sama di saat bersamaan
+            logger.warning("Gagal menyimpan query plan: %s", e)
+
+    def invalidate(self, intent: str):
+        intent_key = normalize_text(intent)
+        self._discard_pending(intent_key)
+        try:
+            with self.catalog.pool.acquire() as cursor:
+                cursor.execute(
+                    f"DELETE FROM {QUERY_PLAN_TABLE} WHERE intent_key = ?",
+                    [intent_key],
+                )
+        except duckdb.Error as e:
+            logger.warning("Gagal menghapus query plan: %s", e)
+
+    def get_metrics(self) -> dict[str, float]:
+        self.flush()
+        with self.catalog.pool.acquire() as cursor:
+            row = cursor.execute(f"SELECT COUNT(*) FROM {QUERY_PLAN_TABLE}").fetchone()
+
+        with self._lock:
+            hits, misses = self._hits, self._misses
+        total = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / total, 4) if total else 0.0,
+            "stored_plans": row[0] if row else 0,
+        }
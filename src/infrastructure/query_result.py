@@ -0,0 +1,191 @@
+from typing import Any, Optional
+
+import duckdb
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from pydantic import BaseModel
+
+
+class QueryResult(BaseModel):
+    query: str
+    columns: list[str] = []
+    preview: str = ""
+    preview_rows: int = 0
+    total_rows: int = 0
+    truncated: bool = False
+    all_null: bool = False
+    summary: str = ""
+
+    @property
+    def is_empty(self) -> bool:
+        return self.total_rows == 0
+
+    def render(self) -> str:
+        if self.is_empty:
+            return f"Total rows: 0\n(query tidak mengembalikan data, kolom: {', '.join(self.columns)})"
+
+        lines = [f"Total rows: {self.total_rows}"]
+        # pemotongan karena batas karakter sudah ditandai di akhir preview
+        if self.preview_rows < self.total_rows:
+            lines.append(
+                f"[TRUNCATED] Hasil parsial: hanya {self.preview_rows} dari {self.total_rows} baris yang ditampilkan."
+            )
+        lines.append(self.preview)
+        if self.summary:
+            lines.append(f"Summary statistics (seluruh hasil):\n{self.summary}")
+        return "\n".join(lines)
+
+
+class SqlValidationResult(BaseModel):
+    query: str
+    errors: list[str] = []
+
+    @property
+    def is_valid(self) -> bool:
+        return not self.errors
+
+
+class ColumnSummary(BaseModel):
+    """Statistik satu kolom yang diperbarui per Arrow batch (memori konstan)."""
+
+    name: str
+    dtype: str
+    min_value: Any = None
+    max_value: Any = None
+    null_count: int = 0
+    value_count: int = 0
+    total: Optional[float] = None
+
+    def update(self, column: pa.Array):
+        self.null_count += column.null_count
+        self.value_count += len(column) - column.null_count
+        if self.value_count == 0:
+            return
+        try:
+            min_max = pc.min_max(column).as_py()
+        except (pa.ArrowNotImplementedError, pa.ArrowInvalid):
+            # mis. kolom LIST/STRUCT, cukup hitung NULL
+            return
+        if min_max["min"] is not None:
+            if self.min_value is None or min_max["min"] < self.min_value:
+                self.min_value = min_max["min"]
+            if self.max_value is None or min_max["max"] > self.max_value:
+                self.max_value = min_max["max"]
+        if (
+            pa.types.is_integer(column.type)
+            or pa.types.is_floating(column.type)
+            or pa.types.is_decimal(column.type)
+        ):
+            batch_total = pc.sum(column.cast(pa.float64())).as_py() or 0.0
+            self.total = (self.total or 0.0) + batch_total
+
+    def render(self, total_rows: int) -> str:
+        line = (
+            f"- {self.name} ({self.dtype}): min={self.min_value}, max={self.max_value}"
+        )
+        if self.total is not None and self.value_count:
+            line += f", avg={self.total / self.value_count}"
+        null_percentage = 100 * self.null_count / total_rows if total_rows else 0.0
+        return line + f", null={null_percentage:.2f}%"
+
+
+class QueryResultShaper:
+    """
+    Membatasi hasil query sebelum dikirim ke prompt.
+
+    Query hanya dijalankan sekali dan dibaca per Arrow batch dari cursor yang sama:
+    hanya baris preview (`max_rows`) yang disimpan, sisa baris dihitung dan diringkas
+    (min, max, avg, persentase NULL) batch demi batch tanpa di-materialize. Summary
+    dilewati jika total baris melebihi `summary_max_rows` (None = tanpa batas, 0 =
+    summary dimatikan).
+    """
+
+    def __init__(
+        self,
+        max_rows: int = 50,
+        max_chars: int = 8000,
+        batch_size: int = 10000,
+        summary_max_rows: Optional[int] = 1_000_000,
+    ):
+        self.max_rows = max_rows
+        self.max_chars = max_chars
+        self.batch_size = batch_size
+        self.summary_max_rows = summary_max_rows
+
+    def _summary_enabled(self, total_rows: int) -> bool:
+        if self.summary_max_rows is None:
+            return True
+        return 0 < total_rows <= self.summary_max_rows
+
+    def _drain(
+        self, cursor: duckdb.DuckDBPyConnection, limit: int
+    ) -> tuple[list[tuple[Any, ...]], int, list[ColumnSummary]]:
+        """Simpan hanya baris preview, lalu hitung dan ringkas seluruh batch."""
+        dtypes = [str(column[1]) for column in cursor.description or []]
+        to_reader = (
+            getattr(cursor, "to_arrow_reader", None) or cursor.fetch_record_batch
+        )
+        reader = to_reader(self.batch_size)
+        summaries: Optional[list[ColumnSummary]] = [
+            ColumnSummary(name=name, dtype=dtype)
+            for name, dtype in zip(reader.schema.names, dtypes)
+        ]
+        rows: list[tuple[Any, ...]] = []
+        total_rows = 0
+        for batch in reader:
+            if len(rows) < limit:
+                head = batch.slice(0, limit - len(rows))
+                rows.extend(zip(*(column.to_pylist() for column in head.columns)))
+            total_rows += batch.num_rows
+            if summaries is None:
+                continue
+            if not self._summary_enabled(total_rows):
+                summaries = None
+                continue
+            for summary, column in zip(summaries, batch.columns):
+                summary.update(column)
+        return rows, total_rows, summaries or []
+
+    def _render_preview(
+        self, columns: list[str], rows: list[tuple[Any, ...]]
+    ) -> tuple[str, bool]:
+        preview = pd.DataFrame.from_records(rows, columns=columns).to_string()
+        if len(preview) <= self.max_chars:
+            return preview, False
+        return (
+            preview[: self.max_chars]
+            + f"\n[TRUNCATED] Output dipotong pada {self.max_chars} karakter.",
+            True,
+        )
+
+    def shape(
+        self,
+        cursor: duckdb.DuckDBPyConnection,
+        query: str,
+        max_rows: Optional[int] = None,
+    ) -> QueryResult:
+        limit = max_rows or self.max_rows
+
+        cursor.execute(query)
+        columns = [column[0] for column in cursor.description or []]
+        rows, total_rows, summaries = self._drain(cursor, limit)
+
+        has_more_rows = total_rows > limit
+        preview, preview_cut = self._render_preview(columns, rows)
+        summary = (
+            "\n".join(summary.render(total_rows) for summary in summaries)
+            if has_more_rows
+            else ""
+        )
+
+        return QueryResult(
+            query=query,
+            columns=columns,
+            preview=preview,
+            preview_rows=len(rows),
+            total_rows=total_rows,
+            truncated=has_more_rows or preview_cut,
+            all_null=bool(rows) and all(value is None for row in rows for value in row),
+            summary=summary,
+        )
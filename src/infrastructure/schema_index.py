@@ -0,0 +1,190 @@
+import math
+import re
+import threading
+from collections import Counter
+from typing import Any, Iterable, Optional
+
+from pydantic import BaseModel
+
+from .profile_store import ProfileStore, TableProfile
+
+_TOKEN_PATTERN = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+")
+
+
+def tokenize(text: str) -> list[str]:
+    """Pecah teks menjadi token lowercase, termasuk camelCase dan snake_case."""
+    tokens = []
+    for word in re.findall(r"\w+", text):
+        parts = [part.lower() for part in _TOKEN_PATTERN.findall(word)]
+        tokens.extend(parts)
+        # simpan juga bentuk utuh agar nama kolom yang ditulis persis tetap cocok
+        if len(parts) > 1 or "_" in word:
+            tokens.append(word.lower())
+    return tokens
+
+
+class _Bm25:
+    def __init__(self, documents: list[list[str]], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.term_freqs = [Counter(document) for document in documents]
+        self.doc_lengths = [len(document) for document in documents]
+        self.avg_length = (
+            sum(self.doc_lengths) / len(self.doc_lengths) if documents else 0.0
+        )
+
+        doc_freqs: Counter[str] = Counter()
+        for document in documents:
+            doc_freqs.update(set(document))
+        total = len(documents)
+        self.idf = {
+            term: math.log(1 + (total - freq + 0.5) / (freq + 0.5))
+            for term, freq in doc_freqs.items()
+        }
+
+    def scores(self, query_tokens: list[str]) -> list[float]:
+        results = []
+        for term_freq, length in zip(self.term_freqs, self.doc_lengths):
+            score = 0.0
+            norm = self.k1 * (1 - self.b + self.b * length / (self.avg_length or 1))
+            for token in query_tokens:
+                freq = term_freq.get(token)
+                if not freq:
+                    continue
+                score += self.idf[token] * freq * (self.k1 + 1) / (freq + norm)
+            results.append(score)
+        return results
+
+
+class SchemaMatch(BaseModel):
+    table_name: str
+    score: float
+    column_names: list[str]
+
+
+class SchemaIndex:
+    """
+    Index BM25 lokal di atas nama table, nama kolom, contoh nilai, dan deskripsi dataset.
+
+    Dipakai prompt builder untuk memilih hanya table dan kolom yang relevan dengan
+    pertanyaan, sehingga prompt tidak berisi profil seluruh catalog.
+    """
+
+    def __init__(
+        self,
+        profile_store: ProfileStore,
+        top_k_tables: int = 5,
+        top_k_columns: int = 20,
+    ):
+        self.profile_store = profile_store
+        self.top_k_tables = top_k_tables
+        self.top_k_columns = top_k_columns
+        self._lock = threading.Lock()
+        self._fingerprint: Optional[tuple] = None
+        self._profiles: dict[str, TableProfile] = {}
+        self._table_names: list[str] = []
+        self._table_bm25: Optional[_Bm25] = None
+        self._column_keys: list[tuple[str, str]] = []
+        self._column_bm25: Optional[_Bm25] = None
+
+    def _build(
+        self,
+        profiles: dict[str, TableProfile],
+        descriptions: dict[str, Any],
+    ):
+        table_documents = []
+        column_documents = []
+        column_keys = []
+        for table_name, profile in profiles.items():
+            table_tokens = tokenize(table_name)
+            table_tokens += tokenize(str(descriptions.get(table_name, "")))
+            for column in profile.columns:
+                column_tokens = tokenize(column.name)
+                table_tokens += column_tokens
+                column_documents.append(
+                    column_tokens
+                    + tokenize(table_name)
+                    + tokenize(" ".join(column.sample_values))
+                )
+                column_keys.append((table_name, column.name))
+            table_documents.append(table_tokens)
+
+        self._profiles = profiles
+        self._table_names = list(profiles.keys())
+        self._table_bm25 = _Bm25(table_documents)
+        self._column_keys = column_keys
+        self._column_bm25 = _Bm25(column_documents)
+
+    def _refresh(self, table_names: Iterable[str], descriptions: dict[str, Any]):
+        profiles = {}
+        for table_name in table_names:
+            try:
+                profiles[table_name] = self.profile_store.get_profile(table_name)
+            except ValueError:
+                continue
+
+        fingerprint = tuple(
+            (name, profile.mtime_ns, profile.size) for name, profile in profiles.items()
+        ) + tuple(sorted((k, str(v)) for k, v in descriptions.items()))
+
+        with self._lock:
+            if fingerprint != self._fingerprint:
+                self._build(profiles, descriptions)
+                self._fingerprint = fingerprint
+
+    def search(
+        self,
+        query: str,
+        table_names: Iterable[str],
+        descriptions: Optional[dict[str, Any]] = None,
+    ) -> list[SchemaMatch]:
+        """Kembalikan top-k table beserta kolom yang relevan; kosong jika tidak ada yang cocok."""
+        self._refresh(table_names, descriptions or {})
+        query_tokens = tokenize(query)
+
+        with self._lock:
+            if (
+                not query_tokens
+                or self._table_bm25 is None
+                or self._column_bm25 is None
+            ):
+                return []
+
+            table_scores = dict(
+                zip(self._table_names, self._table_bm25.scores(query_tokens))
+            )
+            column_scores: dict[str, list[tuple[float, str]]] = {}
+            for (table_name, column_name), score in zip(
+                self._column_keys, self._column_bm25.scores(query_tokens)
+            ):
+                column_scores.setdefault(table_name, []).append((score, column_name))
+
+            ranked = []
+            for table_name in self._table_names:
+                columns = column_scores.get(table_name, [])
+                best_column = max((score for score, _ in columns), default=0.0)
+                score = table_scores[table_name] + best_column
+                if score > 0:
+                    ranked.append((score, table_name, columns))
+            ranked.sort(key=lambda item: item[0], reverse=True)
+
+            matches = []
+            for score, table_name, columns in ranked[: self.top_k_tables]:
+                profile = self._profiles[table_name]
+                if len(profile.columns) <= self.top_k_columns:
+                    column_names = [column.name for column in profile.columns]
+                else:
+                    # urutkan berdasarkan skor, kolom dengan skor sama tetap sesuai urutan asli
+                    ordered = sorted(
+                        enumerate(columns), key=lambda item: (-item[1][0], item[0])
+                    )
+                    column_names = [
+                        column_name
+                        for _, (_, column_name) in ordered[: self.top_k_columns]
+                    ]
+                matches.append(
+                    SchemaMatch(
+                        table_name=table_name, score=score, column_names=column_names
+                    )
+                )
+            return matches
@@ -0,0 +1,71 @@
+import json
+import threading
+from typing import Any, Sequence
+
+from src.base import Span, SpanExporter
+
+
+class JsonlSpanExporter(SpanExporter):
+    """Tulis setiap span sebagai satu baris JSON ke file lokal."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans: Sequence[Span]):
+        lines = "".join(
+            span.model_dump_json() + "\n"
+            for span in sorted(spans, key=lambda span: span.start_time_unix_nano)
+        )
+        with self._lock, open(self.path, "a", encoding="utf-8") as file:
+            file.write(lines)
+
+
+class OpenTelemetrySpanExporter(SpanExporter):
+    """
+    Teruskan span ke OpenTelemetry. Butuh `opentelemetry-api`; span baru benar-benar
+    dikirim jika aplikasi mengonfigurasi `TracerProvider` dari `opentelemetry-sdk`.
+    """
+
+    def __init__(self, tracer_provider: Any = None, name: str = "nlq-agent"):
+        try:
+            from opentelemetry import trace
+            from opentelemetry.trace import Status, StatusCode
+        except ImportError:
+            raise RuntimeError(
+                "opentelemetry belum terpasang, jalankan: pip install opentelemetry-api opentelemetry-sdk"
+            )
+        self._trace = trace
+        self._error_status = lambda message: Status(StatusCode.ERROR, message)
+        self._tracer = trace.get_tracer(name, tracer_provider=tracer_provider)
+
+    def _attributes(self, span: Span) -> dict[str, Any]:
+        attributes: dict[str, Any] = {"nlq.kind": span.kind}
+        for key, value in span.attributes.items():
+            if value is None:
+                continue
+            # OpenTelemetry hanya menerima tipe primitif
+            primitive = isinstance(value, (str, bool, int, float))
+            attributes[key] = value if primitive else json.dumps(value, default=str)
+        return attributes
+
+    def export(self, spans: Sequence[Span]):
+        ordered = sorted(spans, key=lambda span: span.start_time_unix_nano)
+        started: dict[str, Any] = {}
+        for span in ordered:
+            parent = started.get(span.parent_span_id or "")
+            started[span.span_id] = self._tracer.start_span(
+                span.name,
+                context=(
+                    self._trace.set_span_in_context(parent)
+                    if parent is not None
+                    else None
+                ),
+                start_time=span.start_time_unix_nano,
+                attributes=self._attributes(span),
+            )
+        for span in ordered:
+            otel_span = started[span.span_id]
+            if span.status == "error":
+                otel_span.set_status(self._error_status(span.error or ""))
+            otel_span.end(end_time=span.end_time_unix_nano)
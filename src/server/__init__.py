@@ -0,0 +1,10 @@
+from .app import NLQServer, RequestError, ServerBusyError, create_app
+from .config import ServerConfig
+
+__all__ = [
+    "NLQServer",
+    "ServerConfig",
+    "ServerBusyError",
+    "RequestError",
+    "create_app",
+]
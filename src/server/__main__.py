@@ -0,0 +1,32 @@
+"""
+Jalankan server NLQ dengan uvicorn.
+
+Contoh:
+    NLQ_LLM_PROVIDER=fake python -m src.server --port 8000
+"""
+
+import argparse
+
+from dotenv import load_dotenv
+
+from .app import create_app
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="NLQ agent server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    try:
+        import uvicorn
+    except ImportError:
+        raise RuntimeError("uvicorn belum terpasang, jalankan: pip install uvicorn")
+
+    # satu proses, satu agent: catalog DuckDB dan checkpointer dipakai bersama
+    uvicorn.run(create_app(), host=args.host, port=args.port, workers=1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,383 @@
+import asyncio
+import json
+import re
+from contextlib import asynccontextmanager, suppress
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional
+
+from src.agent import AgentNLQ
+from src.base import AgentStreamEvent, BaseAgentStateModel
+
+from .config import ServerConfig
+
+Scope = dict[str, Any]
+Receive = Callable[[], Awaitable[dict[str, Any]]]
+Send = Callable[[dict[str, Any]], Awaitable[None]]
+
+_ROUTE_PATTERN = re.compile(r"^/conversations/([\w.:-]{1,128})/(ask|stream|ws)$")
+
+
+class ServerBusyError(RuntimeError):
+    def __init__(self, message: str, status_code: int):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class RequestError(ValueError):
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class NLQServer:
+    """
+    Aplikasi ASGI yang melayani `AgentNLQ` lewat HTTP dan WebSocket.
+
+    Endpoint:
+    - GET  /health
+    - POST /conversations/{conversation_id}/ask     -> JSON jawaban akhir
+    - POST /conversations/{conversation_id}/stream  -> NDJSON `AgentStreamEvent`
+    - WS   /conversations/{conversation_id}/ws      -> event per pesan
+
+    Satu agent (catalog, cache, checkpointer) dipakai bersama seluruh request. Jumlah
+    request yang diproses dibatasi `max_workers`; jika antrean melebihi `max_queue`
+    request ditolak dengan 429. Request pada percakapan yang sama diproses berurutan.
+    """
+
+    def __init__(self, config: ServerConfig, agent: Optional[AgentNLQ] = None):
+        self.config = config
+        self.agent = agent
+        self._workers: Optional[asyncio.Semaphore] = None
+        self._idle: Optional[asyncio.Event] = None
+        self._accepting = False
+        self._admitted = 0
+        self._running = 0
+        self._conversation_locks: dict[str, asyncio.Lock] = {}
+        self._conversation_refs: dict[str, int] = {}
+
+    async def startup(self):
+        """Bangun agent (jika belum ada) dan warm-up catalog sebelum menerima request."""
+        if self.agent is None:
+            self.agent = await asyncio.to_thread(self.config.build_agent)
+        await asyncio.to_thread(self.agent.warm_up)
+
+        self._workers = asyncio.Semaphore(max(1, self.config.max_workers))
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._accepting = True
+
+    async def shutdown(self):
+        """Tolak request baru, tunggu request berjalan selesai, lalu tutup resource agent."""
+        self._accepting = False
+        if self._idle is not None:
+            with suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(
+                    self._idle.wait(), timeout=self.config.shutdown_timeout
+                )
+        if self.agent is not None:
+            await asyncio.to_thread(self.agent.close)
+
+    def get_status(self) -> dict[str, Any]:
+        if self._accepting:
+            status = "ok"
+        elif self._workers is None:
+            status = "starting"
+        else:
+            status = "stopping"
+        return {
+            "status": status,
+            "running": self._running,
+            "queued": self._admitted - self._running,
+            "max_workers": self.config.max_workers,
+            "max_queue": self.config.max_queue,
+        }
+
+    def _admit(self):
+        if not self._accepting:
+            raise ServerBusyError("Server belum siap atau sedang shutdown", 503)
+        if self._admitted >= self.config.max_workers + self.config.max_queue:
+            raise ServerBusyError("Antrean request penuh, coba lagi nanti", 429)
+        self._admitted += 1
+        if self._idle is not None:
+            self._idle.clear()
+
+    def _release(self):
+        self._admitted -= 1
+        if self._admitted == 0 and self._idle is not None:
+            self._idle.set()
+
+    @asynccontextmanager
+    async def _worker(self, conversation_id: str) -> AsyncIterator[AgentNLQ]:
+        # checkpointer menyimpan history per percakapan: jangan jalankan paralel
+        lock = self._conversation_locks.setdefault(conversation_id, asyncio.Lock())
+        self._conversation_refs[conversation_id] = (
+            self._conversation_refs.get(conversation_id, 0) + 1
+        )
+        try:
+            async with lock:
+                assert self._workers is not None and self.agent is not None
+                async with self._workers:
+                    self._running += 1
+                    try:
+                        yield self.agent
+                    finally:
+                        self._running -= 1
+        finally:
+            self._conversation_refs[conversation_id] -= 1
+            if self._conversation_refs[conversation_id] == 0:
+                del self._conversation_refs[conversation_id]
+                del self._conversation_locks[conversation_id]
+
+    async def ask(self, conversation_id: str, message: str) -> dict[str, Any]:
+        self._admit()
+        try:
+            async with self._worker(conversation_id) as agent:
+                async with asyncio.timeout(self.config.request_timeout):
+                    await agent.aexecute(
+                        BaseAgentStateModel(user_message=message), conversation_id
+                    )
+                return {
+                    "conversation_id": conversation_id,
+                    "response": agent.get_response(conversation_id),
+                    "total_token": agent.get_token_usage(conversation_id),
+                    "usage": agent.get_usage(conversation_id).model_dump(),
+                    "response_time": agent.get_response_time(conversation_id),
+                }
+        finally:
+            self._release()
+
+    async def stream(
+        self, conversation_id: str, message: str, admitted: bool = False
+    ) -> AsyncIterator[AgentStreamEvent]:
+        """Stream event agent. `admitted=True` jika `_admit` sudah dipanggil oleh caller."""
+        if not admitted:
+            self._admit()
+        try:
+            async with self._worker(conversation_id) as agent:
+                async with asyncio.timeout(self.config.request_timeout):
+                    async for event in agent.astream(
+                        BaseAgentStateModel(user_message=message), conversation_id
+                    ):
+                        yield event
+        finally:
+            self._release()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] == "lifespan":
+            await self._handle_lifespan(receive, send)
+        elif scope["type"] == "http":
+            await self._handle_http(scope, receive, send)
+        elif scope["type"] == "websocket":
+            await self._handle_websocket(scope, receive, send)
+
+    async def _handle_lifespan(self, receive: Receive, send: Send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    await self.startup()
+                except Exception as e:
+                    await send({"type": "lifespan.startup.failed", "message": str(e)})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.shutdown()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _send_json(
+        self,
+        send: Send,
+        status: int,
+        payload: dict[str, Any],
+        headers: Optional[list[tuple[bytes, bytes]]] = None,
+    ):
+        body = json.dumps(payload, default=str).encode()
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                ]
+                + (headers or []),
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
+
+    async def _send_error(self, send: Send, error: Exception):
+        status = getattr(error, "status_code", 500)
+        headers = [(b"retry-after", b"1")] if status in (429, 503) else []
+        await self._send_json(send, status, {"error": str(error)}, headers)
+
+    async def _read_message(self, receive: Receive) -> str:
+        body = b""
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                raise RequestError("Client terputus", 499)
+            body += message.get("body", b"")
+            if len(body) > self.config.max_body_bytes:
+                raise RequestError("Body request terlalu besar", 413)
+            if not message.get("more_body", False):
+                break
+        return self._parse_message(body)
+
+    def _parse_message(self, raw: bytes | str) -> str:
+        try:
+            payload = json.loads(raw or b"{}")
+        except json.JSONDecodeError:
+            raise RequestError("Body harus berupa JSON")
+        message = payload.get("message") if isinstance(payload, dict) else None
+        if not isinstance(message, str) or not message.strip():
+            raise RequestError('Field "message" wajib diisi')
+        return message
+
+    async def _handle_http(self, scope: Scope, receive: Receive, send: Send):
+        path = scope["path"].rstrip("/") or "/"
+        method = scope["method"]
+        if path == "/health":
+            status = self.get_status()
+            await self._send_json(
+                send, 200 if status["status"] == "ok" else 503, status
+            )
+            return
+
+        match = _ROUTE_PATTERN.match(path)
+        if match is None or match.group(2) == "ws":
+            await self._send_json(send, 404, {"error": "Not found"})
+            return
+        if method != "POST":
+            await self._send_json(send, 405, {"error": "Method not allowed"})
+            return
+
+        conversation_id, action = match.groups()
+        try:
+            message = await self._read_message(receive)
+            if action == "ask":
+                await self._send_json(
+                    send, 200, await self.ask(conversation_id, message)
+                )
+            else:
+                await self._stream_http(conversation_id, message, receive, send)
+        except (ServerBusyError, RequestError) as e:
+            await self._send_error(send, e)
+        except TimeoutError:
+            await self._send_error(send, RequestError("Request timeout", 504))
+        except Exception as e:
+            await self._send_error(send, e)
+
+    async def _stream_http(
+        self, conversation_id: str, message: str, receive: Receive, send: Send
+    ):
+        # tolak sebelum header dikirim agar client menerima status 429/503
+        self._admit()
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [
+                    (b"content-type", b"application/x-ndjson"),
+                    (b"cache-control", b"no-cache"),
+                ],
+            }
+        )
+
+        async def produce():
+            try:
+                async for event in self.stream(conversation_id, message, admitted=True):
+                    line = event.model_dump_json() + "\n"
+                    await send(
+                        {
+                            "type": "http.response.body",
+                            "body": line.encode(),
+                            "more_body": True,
+                        }
+                    )
+            except TimeoutError:
+                line = json.dumps({"type": "error", "message": "Request timeout"})
+                await send(
+                    {
+                        "type": "http.response.body",
+                        "body": f"{line}\n".encode(),
+                        "more_body": True,
+                    }
+                )
+            except Exception as e:
+                line = json.dumps({"type": "error", "message": str(e)})
+                await send(
+                    {
+                        "type": "http.response.body",
+                        "body": f"{line}\n".encode(),
+                        "more_body": True,
+                    }
+                )
+
+        async def wait_disconnect():
+            while (await receive())["type"] != "http.disconnect":
+                pass
+
+        producer = asyncio.ensure_future(produce())
+        watcher = asyncio.ensure_future(wait_disconnect())
+        done, _ = await asyncio.wait(
+            {producer, watcher}, return_when=asyncio.FIRST_COMPLETED
+        )
+        if producer not in done:
+            # client terputus: hentikan workflow agar worker segera bebas
+            producer.cancel()
+            with suppress(asyncio.CancelledError):
+                await producer
+            return
+
+        watcher.cancel()
+        with suppress(asyncio.CancelledError):
+            await watcher
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+    async def _handle_websocket(self, scope: Scope, receive: Receive, send: Send):
+        match = _ROUTE_PATTERN.match(scope["path"])
+        if match is None or match.group(2) != "ws":
+            await send({"type": "websocket.close", "code": 1008})
+            return
+        conversation_id = match.group(1)
+
+        if (await receive())["type"] != "websocket.connect":
+            return
+        await send({"type": "websocket.accept"})
+
+        async def send_payload(payload: dict[str, Any]):
+            await send(
+                {"type": "websocket.send", "text": json.dumps(payload, default=str)}
+            )
+
+        while True:
+            message = await receive()
+            if message["type"] == "websocket.disconnect":
+                return
+            if not self._accepting:
+                await send({"type": "websocket.close", "code": 1001})
+                return
+
+            try:
+                user_message = self._parse_message(
+                    message.get("text") or message.get("bytes") or b""
+                )
+                async for event in self.stream(conversation_id, user_message):
+                    await send_payload(event.model_dump())
+            except (ServerBusyError, RequestError) as e:
+                await send_payload(
+                    {"type": "error", "status": e.status_code, "message": str(e)}
+                )
+            except TimeoutError:
+                await send_payload(
+                    {"type": "error", "status": 504, "message": "Request timeout"}
+                )
+            except Exception as e:
+                await send_payload({"type": "error", "status": 500, "message": str(e)})
+
+
+def create_app(
+    config: Optional[ServerConfig] = None, agent: Optional[AgentNLQ] = None
+) -> NLQServer:
+    """Factory ASGI, contoh: `uvicorn --factory src.server:create_app`."""
+    return NLQServer(config or ServerConfig.from_env(), agent)
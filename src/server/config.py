@@ -0,0 +1,122 @@
+import json
+import os
+from typing import Any, Optional
+
+from pydantic import BaseModel
+
+from src.agent import AgentNLQ
+from src.base import SpanExporter, Tracer
+from src.infrastructure import (
+    JsonlSpanExporter,
+    OpenTelemetrySpanExporter,
+    SqliteCheckpointSaver,
+)
+from src.infrastructure.dataset_catalog import discover_sources
+from src.schema import DatasetDetailInformation
+from src.tools import LlmValidationMode, WorkflowMode
+
+
+class ServerConfig(BaseModel):
+    dataset_dir: str = "dataset"
+    # kosong: seluruh file dataset yang didukung di `dataset_dir`
+    datasets: list[str] = []
+    dataset_descriptions: dict[str, Any] = {}
+    llm_provider: str = "openai"
+    llm_model: str = "gpt-4o-mini"
+    workflow_mode: WorkflowMode = "multi_stage"
+    llm_validation: LlmValidationMode = "always"
+    max_concurrent_queries: int = 4
+    # jumlah request agent yang diproses bersamaan
+    max_workers: int = 4
+    # request yang boleh menunggu worker; lebih dari ini ditolak (429)
+    max_queue: int = 32
+    request_timeout: float = 120.0
+    shutdown_timeout: float = 30.0
+    # percakapan yang tidak aktif lebih lama dari ini dihapus dari checkpoint store
+    checkpoint_ttl_seconds: float = 7 * 24 * 3600
+    max_body_bytes: int = 1_000_000
+    # span per request (node, LLM, DuckDB, load file) ditulis ke file JSONL ini
+    trace_file: Optional[str] = None
+    # teruskan span ke OpenTelemetry (butuh opentelemetry-api + TracerProvider dari SDK)
+    trace_otel: bool = False
+    # polling directory dataset (detik); file baru/berubah/terhapus diterapkan tanpa restart
+    watch_interval: Optional[float] = None
+
+    @classmethod
+    def from_env(cls) -> "ServerConfig":
+        """Baca konfigurasi dari environment variable `NLQ_*`."""
+        values: dict[str, Any] = {}
+        fields = {
+            "NLQ_DATASET_DIR": "dataset_dir",
+            "NLQ_LLM_PROVIDER": "llm_provider",
+            "NLQ_LLM_MODEL": "llm_model",
+            "NLQ_WORKFLOW_MODE": "workflow_mode",
+            "NLQ_LLM_VALIDATION": "llm_validation",
+            "NLQ_MAX_CONCURRENT_QUERIES": "max_concurrent_queries",
+            "NLQ_MAX_WORKERS": "max_workers",
+            "NLQ_MAX_QUEUE": "max_queue",
+            "NLQ_REQUEST_TIMEOUT": "request_timeout",
+            "NLQ_SHUTDOWN_TIMEOUT": "shutdown_timeout",
+            "NLQ_CHECKPOINT_TTL": "checkpoint_ttl_seconds",
+            "NLQ_TRACE_FILE": "trace_file",
+            "NLQ_TRACE_OTEL": "trace_otel",
+            "NLQ_WATCH_INTERVAL": "watch_interval",
+        }
+        for env_name, field_name in fields.items():
+            if os.getenv(env_name):
+                values[field_name] = os.environ[env_name]
+
+        if os.getenv("NLQ_DATASETS"):
+            values["datasets"] = [
+                name.strip()
+                for name in os.environ["NLQ_DATASETS"].split(",")
+                if name.strip()
+            ]
+        # path file JSON berisi {"nama_table": "deskripsi"}
+        if os.getenv("NLQ_DATASET_DESCRIPTIONS"):
+            with open(os.environ["NLQ_DATASET_DESCRIPTIONS"]) as file:
+                values["dataset_descriptions"] = json.load(file)
+
+        return cls.model_validate(values)
+
+    def discover_datasets(self) -> list[str]:
+        if self.datasets:
+            return list(self.datasets)
+
+        # workbook Excel dengan beberapa sheet menjadi satu table per sheet
+        return list(discover_sources(self.dataset_dir))
+
+    def build_tracer(self) -> Tracer:
+        exporters: list[SpanExporter] = []
+        if self.trace_file:
+            exporters.append(JsonlSpanExporter(self.trace_file))
+        if self.trace_otel:
+            exporters.append(OpenTelemetrySpanExporter())
+        return Tracer(exporters)
+
+    def build_agent(self, table_names: Optional[list[str]] = None) -> AgentNLQ:
+        table_names = table_names or self.discover_datasets()
+        if not table_names:
+            raise ValueError(f"Tidak ada dataset di directory {self.dataset_dir}")
+
+        dataset = DatasetDetailInformation(
+            available_datasets=table_names,
+            dataset_descriptions={
+                table_name: self.dataset_descriptions.get(table_name, table_name)
+                for table_name in table_names
+            },
+        )
+        return AgentNLQ(
+            dataset,
+            self.dataset_dir,
+            self.llm_provider,
+            self.llm_model,
+            max_concurrent_queries=self.max_concurrent_queries,
+            workflow_mode=self.workflow_mode,
+            llm_validation=self.llm_validation,
+            checkpointer=SqliteCheckpointSaver.for_directory(
+                self.dataset_dir, ttl_seconds=self.checkpoint_ttl_seconds
+            ),
+            tracer=self.build_tracer(),
+            watch_interval=self.watch_interval,
+        )
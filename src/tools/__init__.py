@@ -1,3 +1,4 @@
+from .retrieve_dataset.models import LlmValidationMode, WorkflowMode
 from .retrieve_dataset.retrieve_datasets import RetrieveDatasetTool
 
-__all__ = ["RetrieveDatasetTool"]
+__all__ = ["RetrieveDatasetTool", "WorkflowMode", "LlmValidationMode"]
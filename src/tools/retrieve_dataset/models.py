@@ -1,7 +1,11 @@
-from typing import Optional
+from typing import Literal, Optional
 
 from pydantic import BaseModel, Field
 
+WorkflowMode = Literal["multi_stage", "fast"]
+LlmValidationMode = Literal["always", "auto"]
+QueryStatusType = Literal["pending", "success", "error", "invalid"]
+
 
 class StructuredOutputValidateTableExist(BaseModel):
     is_table_exist: bool = Field(
@@ -36,9 +40,12 @@ class StructuredOutputQueryNeeded(BaseModel):
 
 
 class Query(BaseModel):
-    table_name: str = Field(description="Nama table yang akan digunakan.")
+    table_name: Optional[str] = Field(
+        description="Nama table utama yang digunakan. Jika query melakukan JOIN beberapa table, isi dengan salah satu table.",
+        default=None,
+    )
     query: str = Field(
-        description="Query SQL yang akan digunakan untuk menjawab pertanyaan"
+        description="Query SQL yang akan digunakan untuk menjawab pertanyaan. Boleh melakukan JOIN beberapa table yang tersedia dalam satu query."
     )
 
 
@@ -48,6 +55,23 @@ class StructuredOutputGenerateQuery(BaseModel):
     )
 
 
+class StructuredOutputFastQuery(BaseModel):
+    is_table_exist: bool = Field(
+        description="Apakah minimal ada satu table dari data yang diminta tersedia di TABLE YANG TERSEDIA."
+    )
+    description_analyst_result: str = Field(
+        description="Deskripsi singkat hasil analisis. Harus memuat kategori 'Table to query (exists)' dan 'Table not available (skip or need action)'."
+    )
+    query_needed: Optional[StructuredOutputQueryNeeded] = Field(
+        description="Reasoning langkah-langkah pengambilan data beserta table dan kolom yang dibutuhkan.",
+        default=None,
+    )
+    list_queries: list[Query] = Field(
+        description="Kumpulan dari query yang akan digunakan. Kosongkan jika tidak ada table yang tersedia.",
+        default_factory=list,
+    )
+
+
 class StructuredOutputValidationResult(BaseModel):
     is_valid: bool = Field(
         description="Apakah data result sudah sesuai dengan yang diminta."
@@ -56,6 +80,19 @@ class StructuredOutputValidationResult(BaseModel):
         description="Langkah-langkah query selanjutnya yang akan dilakukan, jika data kurang/tidak sesuai yang diminta.",
         default=None,
     )
+    invalid_queries: list[int] = Field(
+        description="Nomor query (sesuai label [Query N] di DATA_RESULT) yang hasilnya salah atau tidak sesuai. Kosongkan jika seluruh query perlu dibuat ulang.",
+        default_factory=list,
+    )
+
+
+class QueryStatus(BaseModel):
+    query: Query
+    status: QueryStatusType = "pending"
+    result: str = ""
+    error: Optional[str] = None
+    is_empty: bool = False
+    total_rows: int = 0
 
 
 class RetreiveDatasetModel(BaseModel):
@@ -64,5 +101,13 @@ class RetreiveDatasetModel(BaseModel):
     tables_description: str = ""
     analyst_query_needed_result: Optional[StructuredOutputQueryNeeded] = None
     list_queries: Optional[StructuredOutputGenerateQuery] = None
+    query_statuses: list[QueryStatus] = []
     result: list[str] = []
     is_valid: bool = False
+    plan_cache_hit: bool = False
+    fast_path: bool = False
+    query_error: bool = False
+    empty_result: bool = False
+    sql_errors: list[str] = []
+    sql_repair_count: int = 0
+    retry_count: int = 0
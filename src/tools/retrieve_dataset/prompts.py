@@ -2,7 +2,7 @@ from typing import Optional
 
 from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
 
-from src.infrastructure import DuckDbManager
+from src.infrastructure import DuckDbManager, SchemaIndex
 from src.schema import DatasetDetailInformation
 
 from .models import StructuredOutputQueryNeeded
@@ -13,19 +13,53 @@ class RetrieveDatasetPrompt:
         self,
         dataset_information: DatasetDetailInformation,
         duckdb_manager: DuckDbManager,
+        schema_index: Optional[SchemaIndex] = None,
     ):
         self.dataset_information = dataset_information
         self.duckdb_manager = duckdb_manager
-
-    def _get_detail_data_parts(self) -> str:
+        self.schema_index = schema_index or SchemaIndex(duckdb_manager.profile_store)
+
+    def _get_detail_data_parts(self, query: Optional[str] = None) -> str:
+        """
+        Detail table untuk prompt. Jika `query` diberikan dan jumlah table melebihi
+        `top_k_tables`, hanya table dan kolom yang relevan menurut SchemaIndex yang
+        ditampilkan detailnya. Jika tidak ada yang cocok, profil seluruh table dipakai.
+        """
         try:
-            detail_dataparts = []
-            for i in self.dataset_information.available_datasets:
-                detail_datapart = self.duckdb_manager.get_dataset_info(i)
-                detail_dataparts.append(detail_datapart)
-
-            detail_data_parts_str = "\n\n".join(detail_dataparts)
-            return detail_data_parts_str
+            available_datasets = self.dataset_information.available_datasets
+            matches = []
+            if (
+                query is not None
+                and len(available_datasets) > self.schema_index.top_k_tables
+            ):
+                matches = self.schema_index.search(
+                    query,
+                    available_datasets,
+                    self.dataset_information.dataset_descriptions,
+                )
+            if not matches:
+                detail_dataparts = []
+                for i in available_datasets:
+                    detail_datapart = self.duckdb_manager.get_dataset_info(i)
+                    detail_dataparts.append(detail_datapart)
+
+                detail_data_parts_str = "\n\n".join(detail_dataparts)
+                return detail_data_parts_str
+
+            detail_dataparts = [
+                self.duckdb_manager.profile_store.get_profile(match.table_name).render(
+                    match.column_names
+                )
+                for match in matches
+            ]
+            other_tables = [
+                table_name
+                for table_name in self.dataset_information.available_datasets
+                if table_name not in {match.table_name for match in matches}
+            ]
+            if other_tables:
+                detail_dataparts.append(f"Table lain: {', '.join(other_tables)}")
+            return "\n\n".join(detail_dataparts)
         except ValueError as e:
             return "Tidak ada table yang tersedia"
 
@@ -44,7 +78,7 @@ class RetrieveDatasetPrompt:
         return "\n".join(list_data_desc)
 
     def analyst_table_exist(self, main_instruction: str) -> list[BaseMessage]:
-        detail_data = self._get_detail_data_parts()
+        detail_data = self._get_detail_data_parts(main_instruction)
 
         return [
             SystemMessage(
@@ -81,7 +115,9 @@ MAIN INSTRUCTION:
     def analyst_query_needed(
         self, main_instruction: str, tables_description: str
     ) -> list[BaseMessage]:
-        detail_data = self._get_detail_data_parts()
+        detail_data = self._get_detail_data_parts(
+            f"{main_instruction}\n{tables_description}"
+        )
         return [
             SystemMessage(
                 content=f"""
@@ -113,6 +149,7 @@ JANGAN MEMBUAT QUERY SQL. Kamu hanya memberikan reasoning.
    - apakah butuh sorting?
    - apakah butuh aggregasi?
    - apakah butuh group-by?
+   - apakah butuh JOIN antar table? jika ya, sebutkan kolom penghubungnya.
 4. **Validasi kolom**:
    - semua kolom yang kamu sebutkan harus ada dalam struktur data.
    - jangan menebak nama kolom.
@@ -139,9 +176,9 @@ Berikut adalah tambahan informasi tentang table:
     def generate_query(
         self,
         query_needed: Optional[StructuredOutputQueryNeeded] = None,
+        sql_errors: Optional[list[str]] = None,
+        succeeded_queries: Optional[list[str]] = None,
     ) -> list[BaseMessage]:
-        detail_data = self._get_detail_data_parts()
-
         detail_query = []
         problem = ""
         problem_solving = ""
@@ -153,6 +190,24 @@ Berikut adalah tambahan informasi tentang table:
                     f"*Table name: {i.table_name}\n Required column: {', '.join(i.required_colums)}\n Filters: {i.filters}"
                 )
 
+        detail_data = self._get_detail_data_parts(
+            f"{problem}\n{problem_solving}\n{' '.join(detail_query)}"
+        )
+
+        repair_instruction = ""
+        if sql_errors:
+            # hanya sebut query lain berhasil jika memang ada query yang sukses dijalankan
+            succeeded_instruction = ""
+            if succeeded_queries:
+                succeeded_instruction = f"""Query berikut sudah berhasil dan hasilnya tetap dipakai, JANGAN dibuat ulang:
+{"\n".join(f"- {query}" for query in succeeded_queries)}
+"""
+            repair_instruction = f"""
+## QUERY SEBELUMNYA GAGAL:
+{succeeded_instruction}Buat HANYA query pengganti untuk query yang gagal di bawah ini, sesuai pesan error-nya. Gunakan hanya table dan kolom yang disebutkan di pesan error atau informasi data.
+{"\n\n".join(sql_errors)}
+"""
+
         return [
             SystemMessage(
                 content=f"""
@@ -162,6 +217,7 @@ Kamu adalah agent yang bertugas untuk men-generate query database berdasarkan an
 1. Analisis problem dan problem_solving yang diberikan
 2. Generate query SQL yang sesuai untuk menjawab pertanyaan pengguna
 3. Pastikan query menggunakan nama kolom yang EXACT sesuai dengan struktur database
+4. Jika data yang dibutuhkan berasal dari beberapa table, gabungkan dengan JOIN dalam SATU query (jangan dipecah menjadi beberapa query yang hasilnya harus digabung manual)
 
 ## CARA KERJA:
 1. **Baca Problem**: Pahami apa yang ingin diselesaikan
@@ -186,6 +242,37 @@ Generate query SQL berdasarkan problem dan solusi yang telah dianalisis.
 
 Berikut adalah deskripsi query yang dapat membantu kamu untuk menghasilkan query yang sesuai:
 {"\n\n".join(detail_query)}
+{repair_instruction}"""
+            ),
+        ]
+
+    def fast_query(self, main_instruction: str) -> list[BaseMessage]:
+        detail_data = self._get_detail_data_parts(main_instruction)
+        return [
+            SystemMessage(
+                content=f"""
+Kamu adalah *Query Agent* yang dalam SATU langkah melakukan analisis table, reasoning kebutuhan data, dan membuat query SQL.
+
+## TUGAS:
+1. **Analisis Table:** Tentukan table yang dibutuhkan dan cocokkan dengan `TABLE YANG TERSEDIA`. Isi description_analyst_result dengan kategori "Table to query (exists)" dan "Table not available (skip or need action)". Jika tidak ada table yang tersedia, isi is_table_exist dengan false dan kosongkan list_queries.
+2. **Reasoning:** Isi query_needed dengan problem, problem_solving, serta table dan kolom yang dibutuhkan (nama EXACT).
+3. **Generate Query:** Buat query SQL berdasarkan reasoning tersebut. Jika data berasal dari beberapa table, gabungkan dengan JOIN dalam SATU query.
+
+## ATURAN:
+- JANGAN mengarang nama table atau kolom. Gunakan nama EXACT seperti di `TABLE YANG TERSEDIA`.
+- Query harus bisa langsung dijalankan di DuckDB.
+
+## DESKRIPSI DATA YANG TERSEDIA:
+{self._get_data_descriptions()}
+
+## TABLE YANG TERSEDIA:
+{detail_data}
+"""
+            ),
+            HumanMessage(
+                content=f"""
+Berikut adalah deskripsi data yang perlu diambil dari database:
+{main_instruction}
 """
             ),
         ]
@@ -197,7 +284,9 @@ Berikut adalah deskripsi query yang dapat membantu kamu untuk menghasilkan query
         tables_description: str,
         previous_problem_solve: Optional[str] = None,
     ) -> list[BaseMessage]:
-        detail_data = self._get_detail_data_parts()
+        detail_data = self._get_detail_data_parts(
+            f"{main_instruction}\n{previous_problem_solve or ''}"
+        )
         data_result_str = "\n\n".join(data_result)
 
         return [
@@ -211,6 +300,7 @@ Tugas:
 4. Jangan membuat nama kolom atau tabel yang tidak ada. Seluruh nama kolom yang disebut harus ada di {detail_data}.
 
 - Gunakan nama kolom EXACT seperti yang ada di detail tabel. Jangan menebak.
+- Setiap hasil query diawali `Total rows`. Jika terdapat penanda [TRUNCATED], data_result hanya berisi sebagian baris (preview) dan ringkasan statistik seluruh hasil; jangan anggap data kurang hanya karena tidak semua baris ditampilkan.
 
 BERIKUT DESKRIPSI DATA YANG TERSEDIA:
 {self._get_data_descriptions()}
@@ -1,7 +1,12 @@
-from src.infrastructure import DuckDbManager
+from typing import Any, Optional
+
+from langchain_core.tools import StructuredTool
+
+from src.base import RunnableRegistry, UsageTracker, trace_span
+from src.infrastructure import AnswerCache, DuckDbManager, QueryPlanCache
 from src.schema import DatasetDetailInformation
 
-from .models import RetreiveDatasetModel
+from .models import LlmValidationMode, RetreiveDatasetModel, WorkflowMode
 from .prompts import RetrieveDatasetPrompt
 from .tool_nodes import RetrieveDatasetNodes
 from .tool_workflow import RetrieveDatasetWorkflow
@@ -14,15 +19,67 @@ class RetrieveDatasetTool:
         llm_provider: str,
         llm_model: str,
         duckdb_manager: DuckDbManager,
+        max_concurrent_queries: int = 4,
+        answer_cache: Optional[AnswerCache] = None,
+        query_plan_cache: Optional[QueryPlanCache] = None,
+        workflow_mode: WorkflowMode = "multi_stage",
+        llm_validation: LlmValidationMode = "always",
+        usage_tracker: Optional[UsageTracker] = None,
+        runnable_registry: Optional[RunnableRegistry] = None,
     ):
         self.duckdb_manager = duckdb_manager
+        self.duckdb_manager.register_datasets(
+            detail_dataset_information.available_datasets
+        )
+        self.answer_cache = answer_cache or AnswerCache(
+            self.duckdb_manager.get_dataset_versions
+        )
         self.tool_prompt = RetrieveDatasetPrompt(
             detail_dataset_information, self.duckdb_manager
         )
         self.tool_nodes = RetrieveDatasetNodes(
-            self.tool_prompt, self.duckdb_manager, llm_provider, llm_model
+            self.tool_prompt,
+            self.duckdb_manager,
+            llm_provider,
+            llm_model,
+            max_concurrent_queries,
+            query_plan_cache or QueryPlanCache(self.duckdb_manager.catalog),
+            llm_validation,
+            usage_tracker=usage_tracker,
+            runnable_registry=runnable_registry,
+        )
+        self.tool_workflow = RetrieveDatasetWorkflow(self.tool_nodes, workflow_mode)
+        # Satu tool dengan implementasi sync dan async untuk ToolNode dan bind_tools
+        self.read_dataset_tool = StructuredTool.from_function(
+            func=self.read_dataset,
+            coroutine=self.aread_dataset,
+            name="read_dataset",
+        )
+
+    def close(self):
+        self.tool_nodes.close()
+
+    def get_query_plan_metrics(self) -> dict[str, float]:
+        if self.tool_nodes.query_plan_cache is None:
+            return {}
+        return self.tool_nodes.query_plan_cache.get_metrics()
+
+    def _store_answer(self, data_description_needed: str, result: dict[str, Any]):
+        state = RetreiveDatasetModel.model_validate(result)
+        if not state.is_valid or state.list_queries is None:
+            return
+
+        queries = [query_item.query for query_item in state.list_queries.list_queries]
+        table_names: set[str] = set()
+        for query in queries:
+            table_names.update(self.duckdb_manager.get_tables_in_query(query))
+
+        self.answer_cache.put(
+            data_description_needed,
+            table_names or self.duckdb_manager.get_registered_datasets(),
+            queries,
+            state.result,
         )
-        self.tool_workflow = RetrieveDatasetWorkflow(self.tool_nodes)
 
     def read_dataset(self, data_description_needed) -> list[str] | None:
         """
@@ -30,10 +87,44 @@ class RetrieveDatasetTool:
         Params:
             - data_description_needed: Deskripsikan secara detail data apa yang harus diambil/query.
         """
-        try:
-            result = self.tool_workflow.run(
-                RetreiveDatasetModel(data_description_needed=data_description_needed)
-            )
-        except RuntimeError as e:
-            return [str(e)]
-        return result.get("result", None)
+        with trace_span("read_dataset", "tool") as span:
+            cached = self.answer_cache.get(data_description_needed)
+            if span is not None:
+                span.set(answer_cache_hit=cached is not None)
+            if cached is not None:
+                return cached.result
+
+            try:
+                result = self.tool_workflow.run(
+                    RetreiveDatasetModel(
+                        data_description_needed=data_description_needed
+                    )
+                )
+            except RuntimeError as e:
+                return [str(e)]
+            self._store_answer(data_description_needed, result)
+            return result.get("result", None)
+
+    async def aread_dataset(self, data_description_needed) -> list[str] | None:
+        """
+        Tool ini digunakan untuk mengambil data dari database.
+        Params:
+            - data_description_needed: Deskripsikan secara detail data apa yang harus diambil/query.
+        """
+        with trace_span("read_dataset", "tool") as span:
+            cached = self.answer_cache.get(data_description_needed)
+            if span is not None:
+                span.set(answer_cache_hit=cached is not None)
+            if cached is not None:
+                return cached.result
+
+            try:
+                result = await self.tool_workflow.arun(
+                    RetreiveDatasetModel(
+                        data_description_needed=data_description_needed
+                    )
+                )
+            except RuntimeError as e:
+                return [str(e)]
+            self._store_answer(data_description_needed, result)
+            return result.get("result", None)
@@ -1,10 +1,19 @@
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
 from duckdb import CatalogException
 
-from src.base import BaseNode
-from src.infrastructure import DuckDbManager
+from src.base import BaseNode, RunnableRegistry, UsageTracker
+from src.infrastructure import DuckDbManager, QueryPlanCache, QueryResult
 
 from .models import (
+    LlmValidationMode,
+    Query,
+    QueryStatus,
     RetreiveDatasetModel,
+    StructuredOutputFastQuery,
     StructuredOutputGenerateQuery,
     StructuredOutputQueryNeeded,
     StructuredOutputValidateTableExist,
@@ -20,26 +29,133 @@ class RetrieveDatasetNodes(BaseNode):
         duckdb_manager: DuckDbManager,
         llm_provicer: str,
         llm_model: str,
+        max_concurrent_queries: int = 4,
+        query_plan_cache: Optional[QueryPlanCache] = None,
+        llm_validation: LlmValidationMode = "always",
+        max_sql_repairs: int = 2,
+        max_retries: int = 3,
+        usage_tracker: Optional[UsageTracker] = None,
+        runnable_registry: Optional[RunnableRegistry] = None,
     ):
         self.prompts = prompt
         self.duckdb_manager = duckdb_manager
+        self.query_plan_cache = query_plan_cache
+        # "auto": hasil query yang lolos heuristik lokal tidak divalidasi ulang oleh LLM
+        self.llm_validation: LlmValidationMode = llm_validation
+        self.max_sql_repairs = max_sql_repairs
+        self.max_retries = max_retries
+        self.max_concurrent_queries = max(1, max_concurrent_queries)
+        self._query_executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrent_queries,
+            thread_name_prefix="nlq-query",
+        )
+        super().__init__(llm_model, llm_provicer, usage_tracker, runnable_registry)
 
-        self._retry = 0
-        super().__init__(llm_model, llm_provicer)
+    def plan_cache_lookup(self, state: RetreiveDatasetModel):
+        if self.query_plan_cache is None:
+            return {"plan_cache_hit": False}
 
-    def analyst_table_exits(self, state: RetreiveDatasetModel):
-        prompt = self.prompts.analyst_table_exist(state.data_description_needed)
+        plan = self.query_plan_cache.lookup(state.data_description_needed)
+        if plan is None:
+            return {"plan_cache_hit": False}
+
+        return {
+            "plan_cache_hit": True,
+            "is_table_exist": True,
+            "tables_description": plan.tables_description,
+            **self._merge_queries(
+                [], [Query.model_validate(query) for query in plan.queries]
+            ),
+        }
+
+    async def aplan_cache_lookup(self, state: RetreiveDatasetModel):
+        return await asyncio.to_thread(self.plan_cache_lookup, state)
+
+    def plan_cache_router(self, state: RetreiveDatasetModel):
+        if state.plan_cache_hit:
+            return "hit"
+        return "miss"
+
+    def _merge_queries(
+        self, query_statuses: list[QueryStatus], new_queries: list[Query]
+    ) -> dict:
+        """
+        Pertahankan query yang sudah berhasil (beserta hasilnya), ganti query yang gagal
+        atau tidak valid dengan query baru yang belum dijalankan.
+        """
+        kept = [status for status in query_statuses if status.status == "success"]
+        statuses = kept + [QueryStatus(query=query) for query in new_queries]
+        return {
+            "query_statuses": statuses,
+            "list_queries": StructuredOutputGenerateQuery(
+                list_queries=[status.query for status in statuses]
+            ),
+        }
+
+    def _fast_query_update(self, response: StructuredOutputFastQuery):
+        if not response.is_table_exist:
+            raise RuntimeError(response.description_analyst_result)
+
+        return {
+            "is_table_exist": response.is_table_exist,
+            "tables_description": response.description_analyst_result,
+            "analyst_query_needed_result": response.query_needed,
+            "fast_path": True,
+            **self._merge_queries([], response.list_queries),
+        }
+
+    def fast_query(self, state: RetreiveDatasetModel):
+        prompt = self.prompts.fast_query(state.data_description_needed)
         response = self.call_llm_with_structured_output(
-            prompt, StructuredOutputValidateTableExist, "dict"
+            prompt, StructuredOutputFastQuery
+        )
+        return self._fast_query_update(response)
+
+    async def afast_query(self, state: RetreiveDatasetModel):
+        prompt = self.prompts.fast_query(state.data_description_needed)
+        response = await self.acall_llm_with_structured_output(
+            prompt, StructuredOutputFastQuery
         )
+        return self._fast_query_update(response)
+
+    def _analyst_table_update(self, response: dict):
         if not response["is_table_exist"]:
             raise RuntimeError(response["description_analyst_result"])
 
         return {
             "is_table_exist": response["is_table_exist"],
             "tables_description": response["description_analyst_result"],
+            # reset hasil dari query plan cache / fast path jika sebelumnya gagal
+            "plan_cache_hit": False,
+            "fast_path": False,
+            "query_error": False,
+            "sql_errors": [],
+            "sql_repair_count": 0,
+            "query_statuses": [],
+            "result": [],
         }
 
+    def _invalidate_plan(self, state: RetreiveDatasetModel):
+        # fallback dari query plan cache, SQL yang tersimpan sudah tidak bisa dipakai
+        if state.plan_cache_hit and self.query_plan_cache is not None:
+            self.query_plan_cache.invalidate(state.data_description_needed)
+
+    def analyst_table_exits(self, state: RetreiveDatasetModel):
+        self._invalidate_plan(state)
+        prompt = self.prompts.analyst_table_exist(state.data_description_needed)
+        response = self.call_llm_with_structured_output(
+            prompt, StructuredOutputValidateTableExist, "dict"
+        )
+        return self._analyst_table_update(response)
+
+    async def aanalyst_table_exits(self, state: RetreiveDatasetModel):
+        await asyncio.to_thread(self._invalidate_plan, state)
+        prompt = self.prompts.analyst_table_exist(state.data_description_needed)
+        response = await self.acall_llm_with_structured_output(
+            prompt, StructuredOutputValidateTableExist, "dict"
+        )
+        return self._analyst_table_update(response)
+
     def analyst_table_router(self, state: RetreiveDatasetModel):
         if state.is_table_exist:
             return "next"
@@ -55,58 +171,299 @@ class RetrieveDatasetNodes(BaseNode):
 
         return {"analyst_query_needed_result": response}
 
+    async def aanalyst_query_needed(self, state: RetreiveDatasetModel):
+        prompt = self.prompts.analyst_query_needed(
+            state.data_description_needed, state.tables_description
+        )
+        response = await self.acall_llm_with_structured_output(
+            prompt, StructuredOutputQueryNeeded
+        )
+
+        return {"analyst_query_needed_result": response}
+
     def generate_query(self, state: RetreiveDatasetModel):
-        prompt = self.prompts.generate_query(state.analyst_query_needed_result)
+        prompt = self.prompts.generate_query(
+            state.analyst_query_needed_result,
+            state.sql_errors,
+            self._succeeded_queries(state.query_statuses),
+        )
         response = self.call_llm_with_structured_output(
             prompt, StructuredOutputGenerateQuery, "dict"
         )
-        return {"list_queries": response}
+        return self._merge_queries(
+            state.query_statuses,
+            StructuredOutputGenerateQuery.model_validate(response).list_queries,
+        )
+
+    async def agenerate_query(self, state: RetreiveDatasetModel):
+        prompt = self.prompts.generate_query(
+            state.analyst_query_needed_result,
+            state.sql_errors,
+            self._succeeded_queries(state.query_statuses),
+        )
+        response = await self.acall_llm_with_structured_output(
+            prompt, StructuredOutputGenerateQuery, "dict"
+        )
+        return self._merge_queries(
+            state.query_statuses,
+            StructuredOutputGenerateQuery.model_validate(response).list_queries,
+        )
+
+    def _format_sql_error(self, query: str, error: str) -> str:
+        return f"Query: {query}\nError: {error}"
+
+    def _succeeded_queries(self, query_statuses: list[QueryStatus]) -> list[str]:
+        return [
+            status.query.query
+            for status in query_statuses
+            if status.status == "success"
+        ]
+
+    def _failed_query_errors(self, query_statuses: list[QueryStatus]) -> list[str]:
+        return [
+            self._format_sql_error(status.query.query, status.error or "")
+            for status in query_statuses
+            if status.status in ("error", "invalid")
+        ]
+
+    def validate_query(self, state: RetreiveDatasetModel):
+        """Validasi SQL secara lokal (parse, nama table, binding kolom) sebelum dijalankan."""
+        if not state.query_statuses:
+            errors = ["Tidak ada query yang dihasilkan."]
+            return {
+                "sql_errors": errors,
+                "sql_repair_count": state.sql_repair_count + 1,
+            }
+
+        # hanya query yang belum dijalankan yang perlu divalidasi
+        statuses = []
+        for status in state.query_statuses:
+            if status.status == "pending":
+                validation = self.duckdb_manager.validate_query(status.query.query)
+                if not validation.is_valid:
+                    error = "\n".join(validation.errors)
+                    # error validasi menjadi hasil query; query ini tidak akan dijalankan
+                    status = status.model_copy(
+                        update={"status": "error", "result": error, "error": error}
+                    )
+            statuses.append(status)
+
+        errors = self._failed_query_errors(statuses)
+        return {
+            "query_statuses": statuses,
+            "sql_errors": errors,
+            "sql_repair_count": state.sql_repair_count + (1 if errors else 0),
+        }
+
+    async def avalidate_query(self, state: RetreiveDatasetModel):
+        return await asyncio.to_thread(self.validate_query, state)
+
+    def _can_repair(self, state: RetreiveDatasetModel) -> bool:
+        return (
+            state.sql_repair_count <= self.max_sql_repairs
+            and state.analyst_query_needed_result is not None
+        )
+
+    def sql_validation_router(self, state: RetreiveDatasetModel):
+        if not state.sql_errors:
+            return "execute"
+        if state.plan_cache_hit:
+            return "fallback"
+        if self._can_repair(state):
+            return "repair"
+        # batas perbaikan habis: hanya query yang lolos validasi yang dijalankan,
+        # error query lain terlihat di hasil
+        return "execute"
+
+    def _run_query(self, query_item: Query) -> tuple[str, Optional[QueryResult]]:
+        """Jalankan satu query, kembalikan (teks hasil, QueryResult atau None jika error)."""
+        try:
+            query_result = self.duckdb_manager.execute_query(
+                query_item.query, query_item.table_name
+            )
+            return query_result.render(), query_result
+        except CatalogException as e:
+            return str(e), None
+        except ValueError as e:
+            return str(e), None
+        except Exception as e:
+            return str(e), None
+
+    def _execute_status(self, status: QueryStatus) -> QueryStatus:
+        text, query_result = self._run_query(status.query)
+        if query_result is None:
+            return status.model_copy(
+                update={"status": "error", "result": text, "error": text}
+            )
+        return status.model_copy(
+            update={
+                "status": "success",
+                "result": text,
+                "error": None,
+                "is_empty": query_result.is_empty or query_result.all_null,
+                "total_rows": query_result.total_rows,
+            }
+        )
 
     def query_to_db(self, state: RetreiveDatasetModel):
-        if state.list_queries is None:
-            return {"result": []}
-
-        results: list[str] = []
-        for query_item in state.list_queries.list_queries:
-            try:
-                query_result = self.duckdb_manager.get_data(
-                    query_item.query, query_item.table_name
+        if not state.query_statuses:
+            return {"result": [], "query_error": True, "empty_result": True}
+
+        # Hanya query yang lolos validasi lokal dan belum dijalankan yang dieksekusi.
+        # Query yang ditolak validasi tidak pernah dijalankan; error validasinya sudah
+        # menjadi hasil query dan diteruskan ke validator atau pengguna
+        to_run = [
+            index
+            for index, status in enumerate(state.query_statuses)
+            if status.status == "pending"
+        ]
+        pending = [state.query_statuses[index] for index in to_run]
+        if len(pending) <= 1 or self.max_concurrent_queries <= 1:
+            executed = [self._execute_status(status) for status in pending]
+        else:
+            # Query independen dijalankan paralel, urutan hasil tetap sesuai urutan query.
+            # Context disalin agar span trace query tetap menempel ke node ini
+            context = contextvars.copy_context()
+            executed = list(
+                self._query_executor.map(
+                    lambda status: context.copy().run(self._execute_status, status),
+                    pending,
                 )
-                results.append(str(query_result))
-            except CatalogException as e:
-                results.append(str(e))
-            except ValueError as e:
-                results.append(str(e))
-            except Exception as e:
-                results.append(str(e))
+            )
 
-        combined_result = state.result + ["\n".join(results)]
-        return {"result": combined_result}
+        statuses = list(state.query_statuses)
+        for index, status in zip(to_run, executed):
+            statuses[index] = status
 
-    def query_result_validation(self, state: RetreiveDatasetModel):
+        sql_errors = self._failed_query_errors(statuses)
+        # jatah perbaikan hanya terpakai oleh error baru dari database; error validasi
+        # lokal sudah dihitung di validate_query
+        new_errors = any(status.status == "error" for status in executed)
+        return {
+            "query_statuses": statuses,
+            "result": [status.result for status in statuses],
+            "query_error": bool(sql_errors),
+            "empty_result": any(
+                status.status == "success" and status.is_empty for status in statuses
+            ),
+            "sql_errors": sql_errors,
+            "sql_repair_count": state.sql_repair_count + (1 if new_errors else 0),
+        }
+
+    async def aquery_to_db(self, state: RetreiveDatasetModel):
+        # DuckDB bersifat blocking, jalankan di thread agar event loop tidak tertahan
+        return await asyncio.to_thread(self.query_to_db, state)
+
+    def query_result_router(self, state: RetreiveDatasetModel):
+        """Heuristik lokal untuk menentukan apakah hasil query perlu divalidasi oleh LLM."""
+        if state.query_error:
+            # Query dari fast path / plan cache error, langsung jalankan alur multi-stage
+            if state.fast_path or state.plan_cache_hit:
+                return "fallback"
+            # Error database sudah cukup jelas untuk diperbaiki tanpa validasi LLM
+            if self._can_repair(state):
+                return "repair"
+            return "validate"
+        # Hasil kosong atau seluruhnya NULL tetap dicek LLM, bisa jadi memang jawabannya
+        if state.empty_result or self.llm_validation == "always":
+            return "validate"
+        return "accept"
+
+    def accept_result(self, state: RetreiveDatasetModel):
+        self._update_query_plan_cache(state, True)
+        return {"is_valid": True}
+
+    async def aaccept_result(self, state: RetreiveDatasetModel):
+        return await asyncio.to_thread(self.accept_result, state)
+
+    def _validation_prompt(self, state: RetreiveDatasetModel):
         if state.analyst_query_needed_result is not None:
             problem_solve = state.analyst_query_needed_result.problem_solving
         else:
             problem_solve = None
-        prompt = self.prompts.validation_result(
+        # beri nomor setiap hasil agar validator bisa menunjuk query yang salah
+        data_result = [
+            f"[Query {index}] {status.query.query}\n{status.result}"
+            for index, status in enumerate(state.query_statuses)
+        ]
+        return self.prompts.validation_result(
             state.data_description_needed,
-            state.result,
+            data_result,
             state.tables_description,
             problem_solve,
         )
+
+    def _update_query_plan_cache(self, state: RetreiveDatasetModel, is_valid: bool):
+        if self.query_plan_cache is None:
+            return
+
+        if state.plan_cache_hit and not is_valid:
+            self.query_plan_cache.invalidate(state.data_description_needed)
+        elif not state.plan_cache_hit and is_valid and state.list_queries is not None:
+            self.query_plan_cache.store(
+                state.data_description_needed,
+                [query.model_dump() for query in state.list_queries.list_queries],
+                state.tables_description,
+            )
+
+    def _validation_update(self, state: RetreiveDatasetModel, response: dict):
+        response_data = StructuredOutputValidationResult.model_validate(response)
+        self._update_query_plan_cache(state, response_data.is_valid)
+        if response_data.is_valid:
+            return {"is_valid": True}
+
+        # tandai query yang tidak sesuai, query lain tetap dipakai hasilnya
+        invalid_indexes = set(response_data.invalid_queries) & set(
+            range(len(state.query_statuses))
+        ) or set(range(len(state.query_statuses)))
+        statuses = [
+            (
+                status.model_copy(
+                    update={
+                        "status": "invalid",
+                        "error": "Hasil query tidak sesuai dengan permintaan (validator).",
+                    }
+                )
+                if index in invalid_indexes
+                else status
+            )
+            for index, status in enumerate(state.query_statuses)
+        ]
+        return {
+            "is_valid": False,
+            # counter retry disimpan di state agar tiap request punya hitungan sendiri
+            "retry_count": state.retry_count + 1,
+            "query_statuses": statuses,
+            "sql_errors": self._failed_query_errors(statuses),
+            "analyst_query_needed_result": response_data.next_step_query
+            or state.analyst_query_needed_result,
+        }
+
+    def query_result_validation(self, state: RetreiveDatasetModel):
+        prompt = self._validation_prompt(state)
         response = self.call_llm_with_structured_output(
             prompt, StructuredOutputValidationResult, "dict"
         )
-        response_data = StructuredOutputValidationResult(
-            is_valid=response["is_valid"], next_step_query=response["next_step_query"]
+        return self._validation_update(state, response)
+
+    async def aquery_result_validation(self, state: RetreiveDatasetModel):
+        prompt = self._validation_prompt(state)
+        response = await self.acall_llm_with_structured_output(
+            prompt, StructuredOutputValidationResult, "dict"
         )
-        return {
-            "is_valid": response_data.is_valid,
-            "analyst_query_needed_result": response_data.next_step_query,
-        }
+        return self._validation_update(state, response)
 
     def validation_router(self, state: RetreiveDatasetModel):
-        if state.is_valid or self._retry >= 3:
+        if state.is_valid:
+            return "next"
+        # SQL dari query plan cache atau fast path tidak valid, jalankan alur lengkap
+        if state.plan_cache_hit or state.fast_path:
+            return "fallback"
+        if state.retry_count >= self.max_retries:
             return "next"
-        self._retry += 1
         return "query_again"
+
+    def close(self):
+        self._query_executor.shutdown(wait=True)
+        if self.query_plan_cache is not None:
+            self.query_plan_cache.flush()
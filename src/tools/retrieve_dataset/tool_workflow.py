@@ -1,39 +1,164 @@
+from typing import Any, AsyncIterator
+
 from langgraph.graph import END, START, StateGraph
 from langgraph.graph.state import CompiledStateGraph
 
-from .models import RetreiveDatasetModel
+from src.base import traced_runnable
+
+from .models import RetreiveDatasetModel, WorkflowMode
 from .tool_nodes import RetrieveDatasetNodes
 
 
 class RetrieveDatasetWorkflow:
-    def __init__(self, tool_nodes: RetrieveDatasetNodes):
+    """
+    Workflow retrieve dataset.
+
+    - `multi_stage`: analisis table, analisis kebutuhan query, lalu generate query (3 panggilan LLM).
+    - `fast`: satu panggilan LLM langsung menghasilkan table, reasoning, dan query. Alur
+      multi-stage hanya dijalankan sebagai fallback jika query error atau gagal validasi.
+    """
+
+    def __init__(
+        self, tool_nodes: RetrieveDatasetNodes, mode: WorkflowMode = "multi_stage"
+    ):
+        if mode not in ("multi_stage", "fast"):
+            raise ValueError(f"Unsupported workflow mode: {mode}")
         self.tool_nodes = tool_nodes
+        self.mode: WorkflowMode = mode
         self.build = self._build_workflow()
 
     def _build_workflow(self) -> CompiledStateGraph[RetreiveDatasetModel]:
         graph: StateGraph = StateGraph(RetreiveDatasetModel)
-        graph.add_node("analyst_table", self.tool_nodes.analyst_table_exits)
-        graph.add_node("analyst_query_needed", self.tool_nodes.analyst_query_needed)
-        graph.add_node("generate_query", self.tool_nodes.generate_query)
-        graph.add_node("query_to_db", self.tool_nodes.query_to_db)
-        graph.add_node("validation_result", self.tool_nodes.query_result_validation)
+        # Setiap node punya versi sync dan async, sehingga graph bisa dijalankan
+        # dengan invoke maupun ainvoke/astream
+        graph.add_node(
+            "plan_cache_lookup",
+            traced_runnable(
+                "plan_cache_lookup",
+                self.tool_nodes.plan_cache_lookup,
+                self.tool_nodes.aplan_cache_lookup,
+            ),
+        )
+        graph.add_node(
+            "fast_query",
+            traced_runnable(
+                "fast_query", self.tool_nodes.fast_query, self.tool_nodes.afast_query
+            ),
+        )
+        graph.add_node(
+            "analyst_table",
+            traced_runnable(
+                "analyst_table",
+                self.tool_nodes.analyst_table_exits,
+                self.tool_nodes.aanalyst_table_exits,
+            ),
+        )
+        graph.add_node(
+            "analyst_query_needed",
+            traced_runnable(
+                "analyst_query_needed",
+                self.tool_nodes.analyst_query_needed,
+                self.tool_nodes.aanalyst_query_needed,
+            ),
+        )
+        graph.add_node(
+            "generate_query",
+            traced_runnable(
+                "generate_query",
+                self.tool_nodes.generate_query,
+                self.tool_nodes.agenerate_query,
+            ),
+        )
+        graph.add_node(
+            "validate_query",
+            traced_runnable(
+                "validate_query",
+                self.tool_nodes.validate_query,
+                self.tool_nodes.avalidate_query,
+            ),
+        )
+        graph.add_node(
+            "query_to_db",
+            traced_runnable(
+                "query_to_db", self.tool_nodes.query_to_db, self.tool_nodes.aquery_to_db
+            ),
+        )
+        graph.add_node(
+            "accept_result",
+            traced_runnable(
+                "accept_result",
+                self.tool_nodes.accept_result,
+                self.tool_nodes.aaccept_result,
+            ),
+        )
+        graph.add_node(
+            "validation_result",
+            traced_runnable(
+                "validation_result",
+                self.tool_nodes.query_result_validation,
+                self.tool_nodes.aquery_result_validation,
+            ),
+        )
 
-        graph.add_edge(START, "analyst_table")
+        graph.add_edge(START, "plan_cache_lookup")
+        graph.add_conditional_edges(
+            "plan_cache_lookup",
+            self.tool_nodes.plan_cache_router,
+            {
+                "hit": "validate_query",
+                "miss": "fast_query" if self.mode == "fast" else "analyst_table",
+            },
+        )
+        graph.add_edge("fast_query", "validate_query")
         graph.add_conditional_edges(
             "analyst_table",
             self.tool_nodes.analyst_table_router,
             {"next": "analyst_query_needed", "end": END},
         )
         graph.add_edge("analyst_query_needed", "generate_query")
-        graph.add_edge("generate_query", "query_to_db")
-        graph.add_edge("query_to_db", "validation_result")
+        graph.add_edge("generate_query", "validate_query")
+        graph.add_conditional_edges(
+            "validate_query",
+            self.tool_nodes.sql_validation_router,
+            {
+                "execute": "query_to_db",
+                "repair": "generate_query",
+                "fallback": "analyst_table",
+            },
+        )
+        graph.add_conditional_edges(
+            "query_to_db",
+            self.tool_nodes.query_result_router,
+            {
+                "validate": "validation_result",
+                "accept": "accept_result",
+                "repair": "generate_query",
+                "fallback": "analyst_table",
+            },
+        )
+        graph.add_edge("accept_result", END)
         graph.add_conditional_edges(
             "validation_result",
             self.tool_nodes.validation_router,
-            {"query_again": "generate_query", "next": END},
+            {
+                "query_again": "generate_query",
+                "fallback": "analyst_table",
+                "next": END,
+            },
         )
 
-        return graph.compile()
+        # state workflow ini hanya hidup selama satu pemanggilan tool: jangan ikut
+        # menyimpan checkpoint ke checkpointer milik graph agent
+        return graph.compile(checkpointer=False)
 
     def run(self, state: RetreiveDatasetModel):
         return self.build.invoke(state)
+
+    async def arun(self, state: RetreiveDatasetModel):
+        return await self.build.ainvoke(state)
+
+    async def astream(
+        self, state: RetreiveDatasetModel, stream_mode: str = "updates"
+    ) -> AsyncIterator[Any]:
+        async for chunk in self.build.astream(state, stream_mode=stream_mode):
+            yield chunk
@@ -0,0 +1,3 @@
+from .excel import convert_sheet, excel_engine
+
+__all__ = ["convert_sheet", "excel_engine"]
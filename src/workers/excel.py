@@ -0,0 +1,51 @@
+"""
+Konversi sheet Excel ke Parquet yang dijalankan di worker process.
+
+Modul ini sengaja hanya bergantung pada pandas dan duckdb (bukan `src.infrastructure`)
+agar worker `spawn` tidak ikut mengimpor agent, LangGraph, dan catalog saat start.
+"""
+
+import importlib.util
+import os
+from typing import Optional
+
+import duckdb
+import pandas as pd
+
+
+def excel_engine() -> Optional[str]:
+    """Pakai calamine (jauh lebih cepat dari openpyxl/xlrd) jika `python-calamine` terpasang."""
+    return "calamine" if importlib.util.find_spec("python_calamine") else None
+
+
+def _typed_frame(df: pd.DataFrame) -> pd.DataFrame:
+    df.columns = [str(column) for column in df.columns]
+    df = df.convert_dtypes()
+    for column in df.columns:
+        if df[column].dtype != object:
+            continue
+        # kolom dengan tipe campuran (mis. angka dan teks) disimpan sebagai teks
+        values = df[column].dropna()
+        if values.map(type).nunique() > 1:
+            df[column] = df[column].map(
+                lambda value: None if pd.isna(value) else str(value)
+            )
+    return df
+
+
+def convert_sheet(source_path: str, sheet: str, target_path: str) -> str:
+    """Parse satu sheet dan simpan hasil bertipe sebagai Parquet."""
+    df = _typed_frame(
+        pd.read_excel(source_path, sheet_name=sheet, engine=excel_engine())
+    )
+    temp_path = f"{target_path}.{os.getpid()}.tmp"
+    escaped_path = temp_path.replace("'", "''")
+    connection = duckdb.connect()
+    try:
+        connection.register("sheet_frame", df)
+        connection.execute(f"COPY sheet_frame TO '{escaped_path}' (FORMAT parquet)")
+    finally:
+        connection.close()
+    # rename atomik agar pembaca tidak pernah melihat file Parquet setengah jadi
+    os.replace(temp_path, target_path)
+    return target_path
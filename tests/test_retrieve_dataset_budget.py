@@ -0,0 +1,125 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from collections import Counter
+from typing import Any
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.runnables import RunnableLambda
+
+from src.base import RunnableRegistry
+from src.infrastructure import DuckDbManager
+from src.schema import DatasetDetailInformation
+from src.tools import RetrieveDatasetTool
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class AlwaysFailingChatModel(BaseChatModel):
+    """Chat model yang selalu menghasilkan SQL `query` dan selalu menolak hasilnya."""
+
+    query: str
+    calls: Any = None
+    lock: Any = None
+
+    def model_post_init(self, __context: Any):
+        self.calls = Counter()
+        self.lock = threading.Lock()
+
+    @property
+    def _llm_type(self) -> str:
+        return "always-failing"
+
+    def _count(self, name: str):
+        with self.lock:
+            self.calls[name] += 1
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self._count("chat")
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=""))])
+
+    def with_structured_output(self, schema, **kwargs):
+        def respond(messages):
+            name = schema.__name__
+            self._count(name)
+            if name == "StructuredOutputValidateTableExist":
+                return schema(
+                    is_table_exist=True,
+                    description_analyst_result="Table to query (exists): customers",
+                )
+            if name == "StructuredOutputQueryNeeded":
+                return schema(
+                    problem="jumlah customer",
+                    problem_solving="hitung seluruh baris",
+                    table_required=[
+                        {"table_name": "customers", "required_colums": ["Email"]}
+                    ],
+                )
+            if name == "StructuredOutputGenerateQuery":
+                return schema(
+                    list_queries=[{"table_name": "customers", "query": self.query}]
+                )
+            if name == "StructuredOutputValidationResult":
+                return schema(is_valid=False, invalid_queries=[0])
+            raise ValueError(f"Unexpected schema: {name}")
+
+        return RunnableLambda(respond)
+
+
+class RetrieveDatasetBudgetTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        shutil.copy(os.path.join(ROOT, "dataset", "customers.csv"), self.directory)
+        self.duckdb_manager = DuckDbManager(self.directory)
+
+    def tearDown(self):
+        self.duckdb_manager.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _run(self, query: str) -> tuple[Counter, Any]:
+        llm = AlwaysFailingChatModel(query=query)
+        registry = RunnableRegistry()
+        registry.get_llm("openai", "gpt-4o-mini", lambda: llm)
+        tool = RetrieveDatasetTool(
+            DatasetDetailInformation(
+                available_datasets=["customers"],
+                dataset_descriptions={"customers": "Data customer"},
+            ),
+            "openai",
+            "gpt-4o-mini",
+            self.duckdb_manager,
+            runnable_registry=registry,
+        )
+        try:
+            result = tool.read_dataset("berapa jumlah customer?")
+        finally:
+            tool.close()
+        return llm.calls, result
+
+    def test_always_failing_query_has_bounded_llm_calls(self):
+        calls, result = self._run("SELECT missing_column FROM customers")
+
+        # 1 analisis table + 1 analisis kebutuhan query
+        # + 5 generate (1 awal, 2 perbaikan SQL, 2 putaran retry) + 3 validasi
+        self.assertEqual(calls["StructuredOutputGenerateQuery"], 5)
+        self.assertEqual(calls["StructuredOutputValidationResult"], 3)
+        self.assertEqual(sum(calls.values()), 10)
+        self.assertIn("missing_column", result[0])
+
+    def test_rejected_query_is_never_executed(self):
+        calls, result = self._run("DROP TABLE _nlq_profiles")
+
+        self.assertEqual(sum(calls.values()), 10)
+        self.assertIn("SELECT", result[0])
+        with self.duckdb_manager.catalog.pool.acquire() as cursor:
+            self.assertIsNotNone(
+                cursor.execute("SELECT COUNT(*) FROM _nlq_profiles").fetchone()
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()